@@ -0,0 +1,271 @@
+"""
+Contas - Várias contas do Instagram atendidas pelo mesmo processo
+Cada entrada do webhook (`entry[].id`) é direcionada para a sua conta, com
+token, pool de conexões, orçamento de rate limit e campanhas próprios.
+As contas ficam no accounts.json e são recarregadas quando o arquivo muda.
+
+Formato do accounts.json:
+
+    {
+        "17841400000000001": {
+            "name": "loja_a",
+            "access_token_env": "LOJA_A_TOKEN",
+            "campaigns_file": "campanhas/loja_a.json",
+            "rate_limits": {"replies": 2}
+        }
+    }
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+from campaigns import CampaignStore
+
+logger = logging.getLogger(__name__)
+
+# Arquivo padrão com as contas
+ACCOUNTS_FILE = 'accounts.json'
+
+
+class Account:
+    """Uma conta do Instagram: token, campanhas e ajustes do rate limit"""
+
+    __slots__ = ('account_id', 'name', 'access_token', 'campaigns', 'rate_limits', 'enabled', 'settings')
+
+    def __init__(
+        self,
+        account_id: str,
+        access_token: str,
+        campaigns: CampaignStore,
+        name: str = None,
+        rate_limits: dict = None,
+        enabled: bool = True,
+        settings: dict = None
+    ):
+        self.account_id = account_id
+        self.access_token = access_token
+        self.campaigns = campaigns
+        self.name = name or account_id
+        self.rate_limits = rate_limits or {}
+        self.enabled = enabled
+        # Configuração de origem (para saber se a conta mudou no arquivo)
+        self.settings = settings
+
+    def __repr__(self):
+        return f"Account({self.account_id!r}, name={self.name!r})"
+
+
+def load_accounts_file(path: str = ACCOUNTS_FILE) -> dict:
+    """Carrega as contas de um arquivo JSON ({} se não existir)"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class ClientCache:
+    """
+    Um cliente da Graph API por conta, criado no primeiro uso
+
+    Contas que não recebem comentários não abrem pool de conexões nem
+    ocupam memória com orçamento de rate limit. Se a conta for trocada
+    no accounts.json (ex: token novo), o cliente é recriado.
+    """
+
+    def __init__(self, factory: Callable[[Account], object], initial: Dict[Account, object] = None):
+        self.factory = factory
+        # ID da conta -> (conta, cliente)
+        self._clients = {account.account_id: (account, client) for account, client in (initial or {}).items()}
+        self._lock = threading.Lock()
+
+    def get(self, account: Account):
+        """Cliente da conta (criado na primeira chamada)"""
+        entry = self._clients.get(account.account_id)
+        if entry is not None and entry[0] is account:
+            return entry[1]
+        with self._lock:
+            entry = self._clients.get(account.account_id)
+            if entry is None or entry[0] is not account:
+                entry = (account, self.factory(account))
+                self._clients[account.account_id] = entry
+            return entry[1]
+
+    def items(self) -> list:
+        """Pares (conta, cliente) dos clientes já criados"""
+        return list(self._clients.values())
+
+    def __len__(self):
+        return len(self._clients)
+
+
+class AccountRegistry:
+    """
+    Direciona cada entrada do webhook para a sua conta
+
+    Sem accounts.json o bot atende só a conta padrão (ACCESS_TOKEN e
+    INSTAGRAM_ACCOUNT_ID do .env), como antes, sem conferir o ID da
+    entrada. Com o arquivo, cada entrada vai para a conta de mesmo ID;
+    entradas de contas desconhecidas ou desativadas são ignoradas.
+
+    Uma única thread verifica o accounts.json e os arquivos de campanha de
+    todas as contas; as consultas apenas leem o dicionário atual, sem lock.
+    `on_reload(registry)` é chamado depois de cada carga (inclusive a primeira).
+    """
+
+    def __init__(
+        self,
+        path: str = ACCOUNTS_FILE,
+        default: Account = None,
+        check_interval: float = 2.0,
+        on_reload: Callable[['AccountRegistry'], None] = None
+    ):
+        self.path = path
+        self.default = default
+        self.check_interval = check_interval
+        self.on_reload = on_reload
+
+        self.accounts: Dict[str, Account] = {}
+        self.reloads = 0
+        self._stores: Dict[str, CampaignStore] = {}
+        self._signature = None
+        self._reload_lock = threading.Lock()
+        self._watcher_pid = None
+
+        self.reload()
+
+    def _file_signature(self) -> Optional[tuple]:
+        """Identifica a versão do arquivo (mtime + tamanho)"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _campaigns(self, path: Optional[str], stores: Dict[str, CampaignStore]) -> Optional[CampaignStore]:
+        """Campanhas da conta (sem arquivo próprio: as da conta padrão)"""
+        if not path:
+            return self.default.campaigns if self.default else None
+        store = stores.get(path) or self._stores.get(path)
+        if store is None:
+            store = CampaignStore(path, check_interval=self.check_interval, watch=False)
+        stores[path] = store
+        return store
+
+    def _build(self, account_id: str, settings: dict, stores: Dict[str, CampaignStore]) -> Optional[Account]:
+        """Cria a conta a partir do accounts.json (None se incompleta)"""
+        token = settings.get('access_token') or os.getenv(settings.get('access_token_env') or '', '')
+        if not token:
+            logger.error(f"❌ Conta {account_id} sem access_token no {self.path} - ignorada")
+            return None
+        return Account(
+            account_id,
+            token,
+            self._campaigns(settings.get('campaigns_file'), stores),
+            name=settings.get('name'),
+            rate_limits=settings.get('rate_limits'),
+            enabled=settings.get('enabled', True),
+            settings=settings
+        )
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Recarrega o accounts.json se ele mudou
+
+        Returns:
+            True se as contas foram recarregadas
+        """
+        with self._reload_lock:
+            signature = self._file_signature()
+            if signature == self._signature and not force:
+                return False
+
+            try:
+                file_accounts = load_accounts_file(self.path) if signature else {}
+            except (OSError, ValueError) as e:
+                logger.error(f"❌ Erro ao carregar {self.path}: {e} - mantendo as contas atuais")
+                self._signature = signature
+                return False
+
+            accounts = {}
+            stores = {}
+            for account_id, settings in file_accounts.items():
+                account_id = str(account_id)
+                previous = self.accounts.get(account_id)
+                if previous is not None and previous.settings == settings:
+                    # Mesmo objeto: o cliente (pool e rate limit) é mantido
+                    self._campaigns(settings.get('campaigns_file'), stores)
+                    accounts[account_id] = previous
+                    continue
+                account = self._build(account_id, settings, stores)
+                if account is not None:
+                    accounts[account_id] = account
+
+            # Troca atômica: webhooks em andamento continuam com o dicionário antigo
+            self.accounts = accounts
+            self._stores = stores
+            self._signature = signature
+            self.reloads += 1
+
+            if signature:
+                logger.info(f"👥 {len(accounts)} contas carregadas de {self.path}")
+            if self.on_reload is not None:
+                self.on_reload(self)
+            return True
+
+    def _ensure_watching(self):
+        """Inicia a thread de verificação no processo atual (uma vez por PID)"""
+        pid = os.getpid()
+        if self._watcher_pid == pid:
+            return
+        with self._reload_lock:
+            if self._watcher_pid == pid:
+                return
+            threading.Thread(target=self._watch, name='account-watcher', daemon=True).start()
+            self._watcher_pid = pid
+
+    def _watch(self):
+        while True:
+            time.sleep(self.check_interval)
+            try:
+                self.reload()
+                for store in list(self._stores.values()):
+                    store.reload()
+            except Exception as e:
+                logger.error(f"Erro ao recarregar contas: {e}")
+
+    def resolve(self, entry_id: Optional[str]) -> Optional[Account]:
+        """
+        Conta que deve tratar uma entrada do webhook
+
+        Args:
+            entry_id: `entry[].id` do webhook (None = conta padrão)
+
+        Returns:
+            A conta, ou None se ela não está configurada (ou está desativada)
+        """
+        self._ensure_watching()
+        if entry_id is None:
+            return self.default
+        account = self.accounts.get(str(entry_id))
+        if account is not None:
+            return account if account.enabled else None
+        if not self.accounts or (self.default is not None and str(entry_id) == self.default.account_id):
+            return self.default
+        return None
+
+    @property
+    def multi_account(self) -> bool:
+        """True quando há contas configuradas no accounts.json"""
+        return bool(self.accounts)
+
+    def all(self) -> List[Account]:
+        """Todas as contas ativas (a padrão primeiro)"""
+        accounts = [self.default] if self.default is not None and self.default.account_id not in self.accounts else []
+        return accounts + [account for account in self.accounts.values() if account.enabled]
+
+    def __len__(self):
+        return len(self.all())
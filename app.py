@@ -3,25 +3,49 @@ Instagram Comment Bot - Aplicação Principal
 Monitora comentários e envia respostas automáticas + DMs
 """
 
+# Primeiro import: o perfil de inicialização começa a contar aqui
+import startup
+import gc
 import os
-import hmac
-import hashlib
+import functools
+import importlib
+import time
 import logging
-import random
+import threading
+import logs
+import metrics
 from flask import Flask, request, jsonify
 from dotenv import load_dotenv
-from instagram_api import InstagramAPI
+from instagram_api import CircuitBreaker, ConcurrencyLimiter, InstagramAPI, RetryPolicy
+from accounts import Account, AccountRegistry, ClientCache
+from job_queue import HoldingQueue, JobQueue
+from dedup import create_dedup_cache
+from outbox import Outbox
+from suppression import SuppressionIndex
+from campaigns import CampaignStore
+from templates import render
+from signature import BodyRejected, SignatureVerifier
+from webhook_parser import InvalidPayload, iter_comment_changes, parse_comment_changes
+
+startup.PROFILE.mark('imports')
 
 # Carregar variáveis de ambiente
 load_dotenv()
 
-# Configuração de logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
+# Configuração de logging: os registros vão para uma fila e são escritos por
+# uma thread separada (LOG_FORMAT=json para um objeto JSON por linha)
+logs.configure(
+    level=os.getenv('LOG_LEVEL', 'INFO'),
+    fmt=os.getenv('LOG_FORMAT', 'text'),
+    sample_rates=logs.parse_sample_rates(os.getenv('LOG_SAMPLE_RATES', '')),
+    queue_size=int(os.getenv('LOG_QUEUE_SIZE', 10000))
 )
 logger = logging.getLogger(__name__)
 
+# Tempo máximo do início do worker (import ou fork) até o primeiro request
+# antes de um aviso no log (STARTUP_BUDGET_MS=0 desativa)
+startup.PROFILE.budget = float(os.getenv('STARTUP_BUDGET_MS', 1000)) / 1000
+
 # Inicializar Flask
 app = Flask(__name__)
 
@@ -31,8 +55,155 @@ APP_SECRET = os.getenv('APP_SECRET', '')
 ACCESS_TOKEN = os.getenv('ACCESS_TOKEN', '')
 INSTAGRAM_ACCOUNT_ID = os.getenv('INSTAGRAM_ACCOUNT_ID', '')
 
-# Inicializar API do Instagram
-instagram = InstagramAPI(ACCESS_TOKEN, INSTAGRAM_ACCOUNT_ID)
+# Configurações comuns dos clientes da Graph API (de todas as contas)
+GRAPH_API_URL = os.getenv('GRAPH_API_URL') or None
+HTTP_TIMEOUTS = {
+    'connect_timeout': float(os.getenv('HTTP_CONNECT_TIMEOUT', 5)),
+    'read_timeout': float(os.getenv('HTTP_READ_TIMEOUT', 30))
+}
+RATE_LIMITS = {
+    'replies': float(os.getenv('RATE_REPLIES_PER_SEC', 5)),
+    'messages': float(os.getenv('RATE_MESSAGES_PER_SEC', 10))
+}
+RETRY_POLICY = RetryPolicy(
+    max_retries=int(os.getenv('RETRY_MAX_ATTEMPTS', 5)),
+    max_total_time=float(os.getenv('RETRY_MAX_TIME', 60))
+)
+
+# Chamadas simultâneas à Graph API por processo, ajustadas pela latência e
+# pelos erros observados (GRAPH_MAX_CONCURRENCY=0 desativa)
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 10))
+GRAPH_MAX_CONCURRENCY = int(os.getenv('GRAPH_MAX_CONCURRENCY', HTTP_POOL_SIZE))
+graph_limiter = ConcurrencyLimiter(
+    initial=int(os.getenv('GRAPH_INITIAL_CONCURRENCY', 4)),
+    min_limit=int(os.getenv('GRAPH_MIN_CONCURRENCY', 1)),
+    max_limit=GRAPH_MAX_CONCURRENCY,
+    tolerance=float(os.getenv('GRAPH_LATENCY_TOLERANCE', 2)),
+    queue_timeout=HTTP_TIMEOUTS['read_timeout']
+) if GRAPH_MAX_CONCURRENCY > 0 else None
+
+# Circuit breaker por endpoint: com a Graph API fora do ar as chamadas falham
+# na hora e os comentários esperam à parte, sem prender os workers
+# (CIRCUIT_FAILURE_THRESHOLD=0 desativa)
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', 5))
+
+
+def create_breaker():
+    """
+    Circuit breaker de uma conta (None se desativado)
+    Cada conta tem o seu: falhas de token, permissão ou throttling de uma
+    conta não abrem o circuito das outras
+    """
+    if CIRCUIT_FAILURE_THRESHOLD <= 0:
+        return None
+    return CircuitBreaker(
+        failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout=float(os.getenv('CIRCUIT_RESET_TIMEOUT', 30)),
+        max_reset_timeout=float(os.getenv('CIRCUIT_MAX_RESET_TIMEOUT', 300)),
+        half_open_calls=int(os.getenv('CIRCUIT_HALF_OPEN_CALLS', 1))
+    )
+
+
+# Circuitos da conta padrão
+graph_breaker = create_breaker()
+
+# Inicializar API do Instagram (conta padrão)
+instagram = InstagramAPI(
+    ACCESS_TOKEN,
+    INSTAGRAM_ACCOUNT_ID,
+    pool_size=HTTP_POOL_SIZE,
+    rate_limits=RATE_LIMITS,
+    base_url=GRAPH_API_URL,
+    retry_policy=RETRY_POLICY,
+    limiter=graph_limiter,
+    breaker=graph_breaker,
+    **HTTP_TIMEOUTS
+)
+
+# Modo batch: agrupa respostas e DMs de vários comentários (0 = desativado)
+GRAPH_BATCH_SIZE = int(os.getenv('GRAPH_BATCH_SIZE', 0))
+GRAPH_BATCH_WINDOW = float(os.getenv('GRAPH_BATCH_WINDOW_MS', 50)) / 1000
+if GRAPH_BATCH_SIZE > 0:
+    instagram.enable_batching(max_size=GRAPH_BATCH_SIZE, window=GRAPH_BATCH_WINDOW)
+
+# Fila de processamento dos comentários (workers em background). Com várias
+# contas, cada uma ocupa no máximo QUEUE_MAX_PER_ACCOUNT workers ao mesmo
+# tempo: uma conta em throttling não trava as demais (padrão: os workers
+# divididos pelo número de contas, ver update_account_share)
+QUEUE_WORKERS = int(os.getenv('QUEUE_WORKERS', 4))
+QUEUE_MAX_PER_ACCOUNT = int(os.getenv('QUEUE_MAX_PER_ACCOUNT', 0))
+comment_queue = JobQueue(
+    num_workers=QUEUE_WORKERS,
+    max_size=int(os.getenv('QUEUE_MAX_SIZE', 1000)),
+    name='comments',
+    max_per_key=QUEUE_MAX_PER_ACCOUNT or max(1, QUEUE_WORKERS // 2)
+)
+
+# Cache de comentários já recebidos (o Meta reenvia webhooks lentos)
+dedup = create_dedup_cache(
+    os.getenv('DEDUP_BACKEND', 'memory'),
+    ttl=float(os.getenv('DEDUP_TTL', 86400)),
+    max_size=int(os.getenv('DEDUP_MAX_SIZE', 100000))
+)
+
+# Outbox: respostas e DMs planejadas ficam gravadas até serem enviadas, e são
+# reenviadas se o worker morrer no meio do caminho (OUTBOX_FILE vazio desativa)
+OUTBOX_FILE = os.getenv('OUTBOX_FILE', 'outbox.db')
+outbox = Outbox(
+    OUTBOX_FILE,
+    lease_seconds=float(os.getenv('OUTBOX_LEASE', 60)),
+    commit_window=float(os.getenv('OUTBOX_COMMIT_WINDOW_MS', 0)) / 1000
+) if OUTBOX_FILE else None
+
+# Quem já recebeu a DM de cada post não recebe de novo durante o cooldown
+# (a resposta pública continua sendo enviada). DM_COOLDOWN_HOURS=0 desativa
+dm_suppression = SuppressionIndex(
+    cooldown=float(os.getenv('DM_COOLDOWN_HOURS', 24)) * 3600,
+    path=os.getenv('DM_SUPPRESSION_FILE', 'dm_suppression.bin') or None,
+    capacity=int(os.getenv('DM_SUPPRESSION_CAPACITY', 1000000))
+)
+
+# Métricas: cada worker publica as suas em METRICS_DIR e a rota /metrics soma
+# todas (padrão: um diretório temporário por master do gunicorn)
+metrics.REGISTRY.directory = os.getenv('METRICS_DIR') or None
+metrics.REGISTRY.interval = float(os.getenv('METRICS_INTERVAL', 5))
+
+WEBHOOK_DURATION = metrics.REGISTRY.histogram(
+    'igbot_webhook_duration_seconds',
+    'Tempo para receber, verificar e enfileirar um webhook'
+)
+WEBHOOK_REQUESTS = metrics.REGISTRY.counter(
+    'igbot_webhook_requests_total',
+    'Webhooks recebidos por status da resposta',
+    ('status',)
+)
+OUTBOX_RECORD_DURATION = metrics.REGISTRY.histogram(
+    'igbot_outbox_record_seconds',
+    'Tempo esperando as ações de um webhook chegarem ao disco'
+)
+COMMENTS_SKIPPED = metrics.REGISTRY.counter(
+    'igbot_comments_skipped_total',
+    'Comentários ignorados antes de qualquer chamada à API, por motivo',
+    ('reason',)
+)
+COMMENT_DURATION = metrics.REGISTRY.histogram(
+    'igbot_comment_duration_seconds',
+    'Tempo para enviar a resposta e a DM de um comentário'
+)
+metrics.REGISTRY.gauge(
+    'igbot_queue_depth',
+    'Trabalhos esperando na fila',
+    ('queue',),
+    function=lambda: {(comment_queue.name,): comment_queue.stats()['depth']}
+)
+metrics.REGISTRY.gauge(
+    'igbot_queue_in_flight',
+    'Trabalhos sendo executados pelos workers da fila',
+    ('queue',),
+    function=lambda: {(comment_queue.name,): comment_queue.stats()['in_flight']}
+)
+
+startup.PROFILE.mark('clients')
 
 # =============================================================================
 # CONFIGURAÇÃO DE RESPOSTAS AUTOMÁTICAS
@@ -90,58 +261,166 @@ DEFAULT_RESPONSE = {
     "enabled": False
 }
 
+# Campanhas: MONITORED_POSTS + monitored_posts.json (recarregado automaticamente
+# quando o manage_posts.py salva alterações - sem precisar reiniciar)
+campaign_store = CampaignStore(
+    os.getenv('MONITORED_POSTS_FILE', 'monitored_posts.json'),
+    base=MONITORED_POSTS,
+    check_interval=float(os.getenv('CAMPAIGNS_RELOAD_INTERVAL', 2))
+)
+
+startup.PROFILE.mark('campaigns')
+
+# =============================================================================
+# CONTAS
+# =============================================================================
+
+def update_account_share(registry: AccountRegistry):
+    """
+    Workers que cada conta pode ocupar: a fila dividida entre as contas
+    (no mínimo em duas), para que contas em throttling esperando o rate
+    limit não tomem os workers das demais
+    """
+    if not QUEUE_MAX_PER_ACCOUNT:
+        comment_queue.max_per_key = max(1, QUEUE_WORKERS // max(2, len(registry)))
+
+
+# Contas atendidas por este processo: a do .env e as do accounts.json (cada
+# uma com token, pool de conexões, rate limit e campanhas próprios)
+accounts = AccountRegistry(
+    os.getenv('ACCOUNTS_FILE', 'accounts.json'),
+    default=Account(INSTAGRAM_ACCOUNT_ID, ACCESS_TOKEN, campaign_store, name='padrão'),
+    check_interval=float(os.getenv('CAMPAIGNS_RELOAD_INTERVAL', 2)),
+    on_reload=update_account_share
+)
+
+# Conexões por conta do accounts.json (o pool só é aberto no primeiro uso)
+ACCOUNT_POOL_SIZE = int(os.getenv('ACCOUNT_POOL_SIZE', 4))
+
+
+def create_client(account: Account) -> InstagramAPI:
+    """Cliente da Graph API de uma conta do accounts.json"""
+    breaker = create_breaker()
+    watch_breaker(account.account_id, breaker)
+    client = InstagramAPI(
+        account.access_token,
+        account.account_id,
+        pool_size=ACCOUNT_POOL_SIZE,
+        rate_limits={**RATE_LIMITS, **account.rate_limits},
+        base_url=GRAPH_API_URL,
+        retry_policy=RETRY_POLICY,
+        # IDs de comentário são únicos: um registro só para todas as contas
+        idempotency=instagram.idempotency,
+        limiter=graph_limiter,
+        breaker=breaker,
+        **HTTP_TIMEOUTS
+    )
+    if GRAPH_BATCH_SIZE > 0:
+        client.enable_batching(max_size=GRAPH_BATCH_SIZE, window=GRAPH_BATCH_WINDOW)
+    return client
+
+
+# Um cliente por conta, criado quando a conta recebe o primeiro comentário
+clients = ClientCache(create_client, {accounts.default: instagram})
+
+startup.PROFILE.mark('accounts')
+
+# Cada worker tem o seu rate limit: a soma conta (conta, worker) pausados
+metrics.REGISTRY.gauge(
+    'igbot_accounts_throttled',
+    'Contas com algum orçamento de rate limit pausado pelo Meta',
+    function=lambda: len(throttled_accounts())
+)
+
 
-def get_post_config(post_id: str) -> dict:
+# Limite de concorrência atual (somado entre os workers) e chamadas na fila
+if graph_limiter is not None:
+    metrics.REGISTRY.gauge(
+        'igbot_graph_concurrency_limit',
+        'Chamadas simultâneas à Graph API permitidas agora pelo limite adaptativo',
+        function=lambda: int(graph_limiter.limit)
+    )
+    metrics.REGISTRY.gauge(
+        'igbot_graph_concurrency_waiting',
+        'Chamadas à Graph API esperando uma vaga no limite de concorrência',
+        function=lambda: graph_limiter.waiting
+    )
+
+
+def throttled_accounts() -> list:
+    """IDs das contas com algum orçamento pausado após erro de rate limit"""
+    return [account.account_id for account, client in clients.items() if client.scheduler.paused_for() > 0]
+
+
+def get_post_config(post_id: str, account: Account = None) -> dict:
     """Retorna a configuração para um post específico"""
-    # Tenta encontrar pelo ID completo ou pelo shortcode
-    if post_id in MONITORED_POSTS:
-        return MONITORED_POSTS[post_id]
-    
-    # Procura pelo shortcode em qualquer parte do ID
-    for shortcode, config in MONITORED_POSTS.items():
-        if shortcode in post_id:
-            return config
+    # Tenta encontrar pelo ID completo, pelo shortcode/permalink ou por trecho do ID
+    config = (account or accounts.default).campaigns.lookup(post_id)
+    if config is not None:
+        return config
     
     return DEFAULT_RESPONSE
 
 
-def get_random_reply(config: dict) -> str:
-    """Retorna uma resposta aleatória da lista de respostas"""
-    replies = config.get('comment_replies', [])
-    if replies:
-        return random.choice(replies)
-    return None
+def get_random_reply(config: dict, username: str = 'usuário', user_id: str = None) -> str:
+    """Retorna uma das respostas da campanha, já com o nome do usuário"""
+    return render(config, 'reply', username, user_id)
+
+
+def get_dm_message(config: dict, username: str = 'usuário', user_id: str = None) -> str:
+    """Retorna a DM da campanha (ou uma das variações), já com o nome do usuário"""
+    return render(config, 'dm', username, user_id)
 
 
 # =============================================================================
 # VERIFICAÇÃO DE ASSINATURA (SEGURANÇA)
 # =============================================================================
 
+# Chave HMAC preparada uma única vez (cada requisição só copia o estado)
+signature_verifier = SignatureVerifier(
+    APP_SECRET,
+    max_body_size=int(os.getenv('WEBHOOK_MAX_BODY', 1024 * 1024))
+)
+
+
 def verify_signature(payload: bytes, signature: str) -> bool:
     """Verifica se a requisição realmente veio do Meta/Instagram"""
-    if not APP_SECRET:
-        logger.warning("APP_SECRET não configurado - pulando verificação")
-        return True
-    
-    expected_signature = hmac.new(
-        APP_SECRET.encode('utf-8'),
-        payload,
-        hashlib.sha256
-    ).hexdigest()
-    
-    return hmac.compare_digest(f"sha256={expected_signature}", signature)
+    return signature_verifier.verify(payload, signature)
 
 
 # =============================================================================
 # ROTAS DA APLICAÇÃO
 # =============================================================================
 
+@app.before_request
+def track_first_request():
+    """Mede o tempo até o primeiro request do worker (ver startup.py)"""
+    startup.PROFILE.request_started()
+
+
 @app.route('/', methods=['GET'])
 def home():
     """Rota inicial - verifica se o servidor está rodando"""
     return jsonify({
         "status": "online",
-        "message": "Instagram Bot está rodando! 🤖"
+        "message": "Instagram Bot está rodando! 🤖",
+        "queue": comment_queue.stats(),
+        "connections": instagram.connection_stats(),
+        "batch": instagram.batcher.stats() if instagram.batcher else None,
+        "rate_limit": instagram.rate_limit_budget(),
+        "retries": instagram.retry_stats(),
+        "concurrency": graph_limiter.stats() if graph_limiter else None,
+        "circuits": circuit_stats() if graph_breaker else None,
+        "held": held_plans.stats(),
+        "dedup": dedup.stats(),
+        "outbox": outbox.stats() if outbox else None,
+        "dm_suppression": dm_suppression.stats(),
+        "startup": startup.PROFILE.stats(),
+        "accounts": {
+            "configured": len(accounts),
+            "active": len(clients),
+            "throttled": throttled_accounts()
+        }
     })
 
 
@@ -163,93 +442,515 @@ def webhook_verify():
         return 'Forbidden', 403
 
 
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Métricas de todos os workers no formato de texto do Prometheus"""
+    return metrics.REGISTRY.render(), 200, {'Content-Type': metrics.CONTENT_TYPE}
+
+
 @app.route('/webhook', methods=['POST'])
 def webhook_handler():
     """
     Handler principal do Webhook (POST)
     Recebe notificações de comentários do Instagram
     """
-    # Verificar assinatura
+    metrics.REGISTRY.start()
+    started = time.perf_counter()
+    # ID de correlação presente em todos os logs desta entrega
+    with logs.context(delivery=logs.new_delivery_id()):
+        body, status = receive_webhook()
+    WEBHOOK_DURATION.observe(time.perf_counter() - started)
+    WEBHOOK_REQUESTS.inc(str(status))
+    return body, status
+
+
+def receive_webhook():
+    """
+    Verifica, decodifica e enfileira o webhook recebido
+    
+    Returns:
+        (corpo, status) da resposta para o Meta
+    """
+    # Verificar assinatura enquanto o corpo é lido (sem assinatura ou grande demais: recusa antes)
     signature = request.headers.get('X-Hub-Signature-256', '')
-    if not verify_signature(request.data, signature):
-        logger.warning("❌ Assinatura inválida!")
-        return 'Invalid signature', 403
+    try:
+        payload = signature_verifier.read_verified(request.stream, request.content_length, signature)
+    except BodyRejected as e:
+        logger.warning(f"❌ Webhook recusado: {e.reason}")
+        return 'Invalid signature' if e.status == 403 else 'Payload too large', e.status
+    
+    # Extrair só as mudanças de comentário (demais tipos são ignorados sem decodificar)
+    try:
+        comments = parse_comment_changes(payload)
+    except InvalidPayload as e:
+        logger.warning(f"❌ Payload inválido: {e}")
+        return 'Invalid payload', 400
     
-    # Processar payload
-    data = request.json
-    logger.info(f"📩 Webhook recebido: {data}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("📩 Webhook recebido: %s", payload.decode('utf-8', 'replace'))
+    logger.info(
+        "📩 Webhook recebido: %d bytes, %d comentários", len(payload), len(comments),
+        extra={'event': 'webhook_received'}
+    )
     
     try:
-        process_webhook(data)
+        accepted = process_comments(comments)
     except Exception as e:
         logger.error(f"Erro ao processar webhook: {e}")
+        accepted = True
+    
+    # Fila cheia: pedir para o Meta reenviar mais tarde
+    if not accepted:
+        return 'Busy', 503
     
     # Sempre retornar 200 rapidamente para o Meta
     return 'OK', 200
 
 
-def process_webhook(data: dict):
-    """Processa os dados recebidos do webhook"""
+def process_webhook(data: dict) -> bool:
+    """
+    Processa os dados (já decodificados) recebidos do webhook
     
-    # Verificar se é do Instagram
-    if data.get('object') != 'instagram':
-        return
+    Returns:
+        False se algum comentário não coube na fila
+    """
+    return process_comments(iter_comment_changes(data))
+
+
+def process_comments(comments, submit_timeout: float = 0) -> bool:
+    """
+    Enfileira as mudanças de comentário do webhook
+    As ações são gravadas no outbox antes de o webhook ser confirmado e
+    executadas pelos workers em background
+    
+    Args:
+        comments: Pares (ID da conta, dados do comentário)
+        submit_timeout: Tempo máximo esperando vaga na fila (0 = não esperar)
+    
+    Returns:
+        False se algum comentário não coube na fila (ou não foi gravado)
+    """
+    accepted = True
+    plans = []
+    
+    for entry_id, value in comments:
+        comment_id = value.get('id')
+        
+        account = accounts.resolve(entry_id)
+        if account is None:
+            logger.warning("👤 Conta %s não configurada - comentário %s ignorado", entry_id, comment_id)
+            continue
+        
+        # Ignorar reentregas de comentários já recebidos
+        if comment_id and dedup.seen(str(comment_id)):
+            logger.info(
+                "♻️ Comentário %s já recebido - ignorando duplicata", comment_id,
+                extra={'event': 'duplicate'}
+            )
+            continue
+        
+        # Um comentário com erro não derruba os outros da entrega; liberado
+        # no dedup para que a reentrega do Meta seja processada
+        try:
+            plan = plan_comment(value, account)
+        except Exception as e:
+            logger.error(f"Erro ao planejar o comentário {comment_id}: {e}")
+            if comment_id:
+                dedup.forget(str(comment_id))
+            continue
+        if plan is not None:
+            plans.append(plan)
     
-    # Iterar sobre as entradas
-    for entry in data.get('entry', []):
-        # Processar mudanças (comentários, etc.)
-        for change in entry.get('changes', []):
-            if change.get('field') == 'comments':
-                handle_comment(change.get('value', {}))
+    # Sem gravação no disco não há garantia: o Meta reenvia mais tarde
+    if outbox is not None and plans:
+        started = time.perf_counter()
+        recorded = outbox.record(plans)
+        OUTBOX_RECORD_DURATION.observe(time.perf_counter() - started)
+    else:
+        recorded = True
+    if not recorded:
+        for plan in plans:
+            if plan['comment_id']:
+                dedup.forget(str(plan['comment_id']))
+        return False
+    
+    for plan in plans:
+        if not comment_queue.submit(execute_plan, plan, timeout=submit_timeout, key=queue_key(plan)):
+            # Liberar para que a reentrega do Meta seja processada
+            comment_id = plan['comment_id']
+            if comment_id:
+                dedup.forget(str(comment_id))
+            if outbox is not None:
+                outbox.cancel(comment_id)
+            accepted = False
+    
+    return accepted
 
 
-def handle_comment(comment_data: dict):
+def queue_key(plan: dict):
+    """Chave do limite por conta na fila (só com várias contas)"""
+    return plan.get('account_id') if accounts.multi_account else None
+
+
+def plan_comment(comment_data: dict, account: Account = None):
     """
-    Processa um novo comentário
+    Decide o que responder a um comentário (sem chamar a API)
+    Usado tanto pelo app Flask quanto pela versão assíncrona (asgi_app.py)
+    
+    Args:
+        comment_data: `value` da mudança de comentário
+        account: Conta que recebeu o comentário (padrão: a do .env)
+    
+    Returns:
+        Dicionário com comment_id, username, reply_text e dm_text,
+        ou None se o post não está configurado
     """
+    account = account or accounts.default
     comment_id = comment_data.get('id')
-    post_id = comment_data.get('media', {}).get('id')
-    user_id = comment_data.get('from', {}).get('id')
-    username = comment_data.get('from', {}).get('username', 'usuário')
-    comment_text = comment_data.get('text', '')
+    # `media` e `from` podem vir como null em payloads incompletos
+    media = comment_data.get('media') or {}
+    author = comment_data.get('from') or {}
+    post_id = media.get('id')
+    user_id = author.get('id')
+    username = author.get('username') or 'usuário'
+    comment_text = comment_data.get('text') or ''
     
-    logger.info(f"💬 Novo comentário de @{username}: {comment_text}")
-    logger.info(f"📌 Post ID: {post_id}")
+    # Formatação adiada: com amostragem, as linhas descartadas não custam nada
+    logger.info(
+        "💬 Novo comentário de @%s: %s (post %s)", username, comment_text, post_id,
+        extra={'event': 'comment_received'}
+    )
     
     # Verificar se devemos responder este post
-    config = get_post_config(str(post_id))
+    config = get_post_config(str(post_id), account)
     
     if not config.get('enabled'):
-        logger.info(f"Post {post_id} não está configurado para respostas automáticas")
-        return
+        logger.info(
+            "Post %s não está configurado para respostas automáticas", post_id,
+            extra={'event': 'not_monitored'}
+        )
+        COMMENTS_SKIPPED.inc('not_monitored')
+        return None
     
-    # Responder o comentário (se configurado) - com variação aleatória
-    reply_text = get_random_reply(config)
-    if reply_text:
-        success = instagram.reply_to_comment(comment_id, reply_text)
-        if success:
-            logger.info(f"✅ Comentário respondido para @{username}: {reply_text[:50]}...")
-        else:
-            logger.error(f"❌ Falha ao responder comentário")
+    # Gatilhos da campanha (palavras-chave, regex, exclusões): sem chamar a API
+    trigger = config.get('trigger')
+    if trigger is not None and not trigger.matches(comment_text):
+        logger.info(
+            "🙈 Comentário %s não corresponde aos gatilhos do post %s - ignorado", comment_id, post_id,
+            extra={'event': 'not_triggered'}
+        )
+        COMMENTS_SKIPPED.inc('not_triggered')
+        return None
+    
+    # Resposta e DM (templates já compilados: só o nome do usuário é inserido)
+    return {
+        'comment_id': comment_id,
+        'account_id': account.account_id,
+        'post_id': post_id,
+        'user_id': user_id,
+        'username': username,
+        'reply_text': get_random_reply(config, username, user_id),
+        'dm_text': get_dm_message(config, username, user_id),
+        # Reenvios pelo outbox continuam com o ID de correlação original
+        'delivery_id': logs.current_context().get('delivery')
+    }
+
+
+def report_comment(plan: dict, replied, sent):
+    """Registra o resultado da resposta e da DM (None = não enviado)"""
+    username = plan['username']
+    
+    if replied:
+        logger.info(
+            "✅ Comentário respondido para @%s: %s...", username, plan['reply_text'][:50],
+            extra={'event': 'replied'}
+        )
+    elif replied is not None:
+        logger.error("❌ Falha ao responder comentário")
+    
+    if sent:
+        logger.info("✅ DM enviada para @%s", username, extra={'event': 'dm_sent'})
+    elif sent is not None:
+        logger.error("❌ Falha ao enviar DM")
+
+
+def reserve_dm(plan: dict):
+    """
+    Confere no índice de supressão se a DM do plano deve ser enviada
+    
+    Returns:
+        Texto da DM, ou None se a pessoa já a recebeu dentro do cooldown
+    """
+    dm_text = plan['dm_text']
+    if dm_text and not dm_suppression.reserve(plan['post_id'], plan['user_id']):
+        logger.info(
+            "🔕 @%s já recebeu a DM do post %s - enviando só a resposta", plan['username'], plan['post_id'],
+            extra={'event': 'dm_suppressed'}
+        )
+        return None
+    return dm_text
+
+
+def finish_dm(plan: dict, dm_text, sent):
+    """Libera a reserva feita por reserve_dm (registrando a DM se enviada)"""
+    if dm_text:
+        dm_suppression.finish(plan['post_id'], plan['user_id'], bool(sent))
+
+
+def plan_account(plan: dict):
+    """
+    Conta do plano (planos gravados antes das várias contas: a padrão)
     
-    # Enviar DM (se configurado)
-    if config.get('dm_message'):
-        dm_text = config['dm_message']
+    Returns:
+        A conta, ou None se ela foi removida do accounts.json (a ação é
+        descartada do outbox)
+    """
+    account = accounts.resolve(plan.get('account_id'))
+    if account is None:
+        logger.error(f"❌ Conta {plan.get('account_id')} não configurada - ação do comentário {plan['comment_id']} descartada")
+        if outbox is not None:
+            outbox.complete(plan['comment_id'], None, None)
+    return account
+
+
+def execute_plan(plan: dict):
+    """
+    Envia a resposta e a DM planejadas e marca a ação como concluída
+    """
+    account = plan_account(plan)
+    if account is None:
+        return
+    
+    # O ID da conta só aparece nos logs quando há mais de uma
+    account_field = account.account_id if accounts.multi_account else None
+    with logs.context(account=account_field, comment=plan['comment_id']):
+        # Circuito aberto: o comentário espera à parte, sem ocupar o worker
+        blocked = circuit_blocked(account, plan_endpoints(plan))
+        if blocked:
+            hold_plan(plan, blocked)
+            return
+        
+        started = time.perf_counter()
+        dm_text = reserve_dm(plan)
+        sent = None
+        
+        # No modo batch as duas chamadas saem na mesma requisição
+        try:
+            replied, sent = clients.get(account).reply_and_send_private(
+                plan['comment_id'],
+                plan['reply_text'],
+                dm_text,
+                check_existing=plan.get('replayed', False)
+            )
+        except Exception:
+            # Devolver ao outbox para uma nova tentativa
+            if outbox is not None:
+                outbox.release(plan['comment_id'])
+            raise
+        finally:
+            finish_dm(plan, dm_text, sent)
+            COMMENT_DURATION.observe(time.perf_counter() - started)
+        
+        # Falhou porque o circuito abriu no meio do caminho: tentar de novo
+        # quando ele fechar (conferindo o que já foi publicado)
+        blocked = circuit_blocked(account, [
+            endpoint for endpoint, result in (('replies', replied), ('messages', sent)) if result is False
+        ], closed_ok=False)
+        if blocked:
+            plan['replayed'] = True
+            hold_plan(plan, blocked)
+            return
+        
+        if outbox is not None:
+            outbox.complete(plan['comment_id'], replied, sent)
         
-        success = instagram.send_private_reply(comment_id, dm_text)
-        if success:
-            logger.info(f"✅ DM enviada para @{username}")
+        report_comment(plan, replied, sent)
+
+
+# =============================================================================
+# GRAPH API FORA DO AR (CIRCUIT BREAKER)
+# =============================================================================
+
+def plan_endpoints(plan: dict) -> list:
+    """Endpoints da Graph API que o plano usa"""
+    endpoints = []
+    if plan['reply_text']:
+        endpoints.append('replies')
+    if plan['dm_text']:
+        endpoints.append('messages')
+    return endpoints
+
+
+def circuit_blocked(account: Account, endpoints: list, closed_ok: bool = True) -> list:
+    """
+    Endpoints da conta com o circuito aberto
+    
+    Args:
+        closed_ok: Com False, vale qualquer estado diferente de fechado
+            (inclusive meio-aberto com a chamada de teste livre)
+    """
+    breaker = clients.get(account).breaker
+    if breaker is None:
+        return []
+    if closed_ok:
+        return [endpoint for endpoint in endpoints if breaker.blocked(endpoint)]
+    return [endpoint for endpoint in endpoints if breaker.state(endpoint) != CircuitBreaker.CLOSED]
+
+
+def circuit_stats() -> dict:
+    """Estado dos circuitos de cada conta com cliente criado"""
+    return {
+        account.account_id: client.breaker.stats()
+        for account, client in clients.items() if client.breaker is not None
+    }
+
+
+def resubmit_plan(plan: dict) -> bool:
+    """Devolve para a fila um plano que estava em espera"""
+    return comment_queue.submit(execute_plan, plan, key=queue_key(plan))
+
+
+# Comentários esperando o circuito fechar (o outbox mantém a ação pendente;
+# se o processo cair, outro worker os reenvia)
+held_plans = HoldingQueue(resubmit_plan, max_size=int(os.getenv('HOLDING_QUEUE_SIZE', 10000)), name='graph')
+
+
+def hold_plan(plan: dict, endpoints: list):
+    """Coloca o plano em espera até a Graph API voltar"""
+    if held_plans.hold(plan):
+        logger.warning(
+            "⏸️ Graph API indisponível (%s) - comentário em espera", ', '.join(endpoints),
+            extra={'event': 'held'}
+        )
+        return
+    if outbox is not None:
+        logger.error("❌ Espera cheia - comentário %s volta para o outbox", plan['comment_id'])
+        outbox.release(plan['comment_id'])
+    else:
+        logger.error("❌ Espera cheia - comentário %s descartado", plan['comment_id'])
+
+
+def held_for(account_id: str, plan: dict, endpoint: str = None) -> bool:
+    """True se o plano em espera é da conta (e chama o endpoint, se dado)"""
+    return plan.get('account_id') == account_id and (endpoint is None or endpoint in plan_endpoints(plan))
+
+
+def on_circuit_change(account_id: str, breaker: CircuitBreaker, endpoint: str, old: str, new: str):
+    """Registra a mudança do circuito da conta e libera os comentários dela em espera"""
+    match = functools.partial(held_for, account_id)
+    with logs.context(account=account_id if accounts.multi_account else None):
+        if new == CircuitBreaker.OPEN:
+            retry_in = breaker.retry_in(endpoint)
+            logger.warning(
+                "⚡ Circuito de %s aberto - Graph API indisponível, novo teste em %.0fs", endpoint, retry_in,
+                extra={'event': 'circuit_open'}
+            )
+            # Um comentário em espera que usa o endpoint serve de chamada de
+            # teste quando o circuito meio-abrir
+            probe = functools.partial(held_for, account_id, endpoint=endpoint)
+            timer = threading.Timer(retry_in, held_plans.release, kwargs={'limit': 1, 'match': probe})
+            timer.daemon = True
+            timer.start()
+        elif new == CircuitBreaker.HALF_OPEN:
+            logger.info("🔌 Circuito de %s meio-aberto - testando a Graph API", endpoint, extra={'event': 'circuit_half_open'})
         else:
-            logger.error(f"❌ Falha ao enviar DM")
+            released = held_plans.release(match=match)
+            logger.info(
+                "✅ Circuito de %s fechado - %d comentário(s) em espera de volta à fila", endpoint, released,
+                extra={'event': 'circuit_closed'}
+            )
+
+
+def watch_breaker(account_id: str, breaker: CircuitBreaker):
+    """Liga as mudanças do circuito da conta à espera de comentários"""
+    if breaker is not None:
+        breaker.add_listener(functools.partial(on_circuit_change, account_id, breaker))
+
+
+def open_circuits() -> dict:
+    """Contas com o circuito aberto ou meio-aberto, por endpoint"""
+    counts = {}
+    for _, client in clients.items():
+        if client.breaker is None:
+            continue
+        for endpoint, circuit in client.breaker.stats().items():
+            counts[(endpoint,)] = counts.get((endpoint,), 0) + int(circuit['state'] != CircuitBreaker.CLOSED)
+    return counts
+
+
+if graph_breaker is not None:
+    watch_breaker(INSTAGRAM_ACCOUNT_ID, graph_breaker)
+    metrics.REGISTRY.gauge(
+        'igbot_graph_circuit_open',
+        'Contas com o circuito do endpoint aberto ou meio-aberto (somadas entre os workers)',
+        ('endpoint',),
+        function=open_circuits
+    )
+    metrics.REGISTRY.gauge(
+        'igbot_held_comments',
+        'Comentários esperando a Graph API voltar',
+        function=lambda: len(held_plans)
+    )
+
+
+def handle_comment(comment_data: dict):
+    """
+    Processa um novo comentário
+    """
+    plan = plan_comment(comment_data)
+    if plan is None:
+        return
+    
+    execute_plan(plan)
+
+
+def replay_plan(plan: dict) -> bool:
+    """Recoloca na fila uma ação pendente do outbox (worker anterior caiu)"""
+    # A fila leva o contexto para o worker: os logs mantêm a entrega original
+    with logs.context(delivery=plan.get('delivery_id')):
+        logger.info("📤 Reenviando ação pendente do comentário %s", plan['comment_id'])
+        # A resposta pode ter sido publicada antes da queda: conferir antes de reenviar
+        plan['replayed'] = True
+        return comment_queue.submit(execute_plan, plan, key=queue_key(plan))
+
+
+def start_outbox():
+    """Inicia o outbox no processo atual (reenvia as ações pendentes)"""
+    if outbox is not None:
+        outbox.start(replay_plan)
 
 
 # =============================================================================
 # INICIALIZAÇÃO
 # =============================================================================
 
+def prepare_fork():
+    """
+    Prepara o master do gunicorn para criar os workers (só com `--preload`)
+    
+    Os objetos do bot (clientes, fila, outbox, campanhas compiladas...) já
+    foram criados no import deste módulo, uma vez só no master. Importa as bibliotecas que os workers carregariam só no primeiro uso e
+    congela os objetos já criados: o coletor de lixo dos workers não mexe
+    mais neles, então as páginas de memória continuam compartilhadas por
+    copy-on-write em vez de serem copiadas para cada worker.
+    """
+    # Adiado no instagram_api.py até a primeira chamada à API
+    importlib.import_module('requests')
+    gc.collect()
+    gc.freeze()
+    logger.info(
+        "❄️ App pré-carregado em %.0f ms - %d objetos compartilhados com os workers",
+        startup.PROFILE.import_seconds * 1000, gc.get_freeze_count()
+    )
+
+
+startup.PROFILE.mark('routes')
+
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 5000))
     debug = os.getenv('FLASK_DEBUG', 'false').lower() == 'true'
     
     logger.info(f"🚀 Iniciando servidor na porta {port}")
+    start_outbox()
+    metrics.REGISTRY.start()
     app.run(host='0.0.0.0', port=port, debug=debug)
@@ -0,0 +1,379 @@
+"""
+Instagram Comment Bot - Versão assíncrona (ASGI)
+Mesmas rotas do app.py (/ e /webhook GET/POST), mas cada comentário vira
+uma task asyncio e as chamadas à Graph API usam a AsyncInstagramAPI,
+sem ocupar uma thread por chamada
+
+Execute: uvicorn asgi_app:app --port 5000
+Ou com gunicorn: gunicorn asgi_app:app -k uvicorn.workers.UvicornWorker
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+import functools
+from urllib.parse import parse_qs
+
+import app as bot
+import logs
+import metrics
+from accounts import Account, ClientCache
+from dedup import MemoryBackend
+from async_instagram_api import AsyncInstagramAPI
+from signature import BodyRejected
+from webhook_parser import InvalidPayload, parse_comment_changes
+
+logger = logging.getLogger(__name__)
+
+# O httpx registra cada requisição em INFO
+logging.getLogger('httpx').setLevel(logging.WARNING)
+
+# Máximo de comentários sendo processados ao mesmo tempo (acima disso: 503)
+MAX_PENDING = int(os.getenv('ASYNC_MAX_PENDING', 10000))
+# Com várias contas, máximo por conta: uma conta em throttling não ocupa todas as vagas
+MAX_PENDING_PER_ACCOUNT = int(os.getenv('ASYNC_MAX_PENDING_PER_ACCOUNT', 0)) or max(1, MAX_PENDING // 2)
+# Conexões por conta do accounts.json
+ACCOUNT_POOL_SIZE = int(os.getenv('ASYNC_ACCOUNT_POOL_SIZE', 16))
+
+# Cliente assíncrono da Graph API (mesmas configurações do app.py)
+instagram = AsyncInstagramAPI(
+    bot.ACCESS_TOKEN,
+    bot.INSTAGRAM_ACCOUNT_ID,
+    pool_size=int(os.getenv('ASYNC_POOL_SIZE', 128)),
+    rate_limits=bot.RATE_LIMITS,
+    base_url=bot.GRAPH_API_URL,
+    retry_policy=bot.RETRY_POLICY,
+    **bot.HTTP_TIMEOUTS
+)
+
+
+def create_client(account: Account) -> AsyncInstagramAPI:
+    """Cliente assíncrono de uma conta do accounts.json"""
+    return AsyncInstagramAPI(
+        account.access_token,
+        account.account_id,
+        pool_size=ACCOUNT_POOL_SIZE,
+        rate_limits={**bot.RATE_LIMITS, **account.rate_limits},
+        base_url=bot.GRAPH_API_URL,
+        retry_policy=bot.RETRY_POLICY,
+        **bot.HTTP_TIMEOUTS
+    )
+
+
+# Um cliente por conta, criado quando a conta recebe o primeiro comentário
+clients = ClientCache(create_client, {bot.accounts.default: instagram})
+
+# Tasks de comentários em andamento (total e por conta)
+pending = set()
+pending_by_account = {}
+
+metrics.REGISTRY.gauge(
+    'igbot_async_pending',
+    'Comentários sendo processados como tasks asyncio',
+    function=lambda: len(pending)
+)
+
+
+async def dedup_call(method, *args):
+    """Chamada ao cache de deduplicação: SQLite/Redis bloqueiam, então rodam em uma thread"""
+    if isinstance(bot.dedup.backend, MemoryBackend):
+        return method(*args)
+    return await asyncio.to_thread(method, *args)
+
+
+async def execute_plan(plan: dict):
+    """Versão assíncrona do execute_plan do app.py"""
+    account = bot.plan_account(plan)
+    if account is None:
+        return
+
+    account_field = account.account_id if bot.accounts.multi_account else None
+    with logs.context(account=account_field, comment=plan['comment_id']):
+        started = time.perf_counter()
+        dm_text = bot.reserve_dm(plan)
+        sent = None
+
+        try:
+            replied, sent = await clients.get(account).reply_and_send_private(
+                plan['comment_id'],
+                plan['reply_text'],
+                dm_text
+            )
+        except Exception:
+            if bot.outbox is not None:
+                bot.outbox.release(plan['comment_id'])
+            raise
+        finally:
+            bot.finish_dm(plan, dm_text, sent)
+            bot.COMMENT_DURATION.observe(time.perf_counter() - started)
+
+        if bot.outbox is not None:
+            bot.outbox.complete(plan['comment_id'], replied, sent)
+
+        bot.report_comment(plan, replied, sent)
+
+
+async def process_comments(comments) -> bool:
+    """
+    Grava as ações no outbox e cria uma task para cada comentário novo
+
+    Returns:
+        False se algum comentário foi recusado (excesso de tasks ou falha na gravação)
+    """
+    accepted = True
+    plans = []
+    # Planos desta entrega por conta (somados às tasks em andamento)
+    planned = {}
+
+    for entry_id, value in comments:
+        comment_id = value.get('id')
+
+        account = bot.accounts.resolve(entry_id)
+        if account is None:
+            logger.warning("👤 Conta %s não configurada - comentário %s ignorado", entry_id, comment_id)
+            continue
+
+        # Ignorar reentregas de comentários já recebidos
+        if comment_id and await dedup_call(bot.dedup.seen, str(comment_id)):
+            logger.info(
+                "♻️ Comentário %s já recebido - ignorando duplicata", comment_id,
+                extra={'event': 'duplicate'}
+            )
+            continue
+
+        account_pending = pending_by_account.get(account.account_id, 0) + planned.get(account.account_id, 0)
+        if len(pending) + len(plans) >= MAX_PENDING or (
+            bot.accounts.multi_account and account_pending >= MAX_PENDING_PER_ACCOUNT
+        ):
+            if comment_id:
+                await dedup_call(bot.dedup.forget, str(comment_id))
+            accepted = False
+            continue
+
+        try:
+            plan = bot.plan_comment(value, account)
+        except Exception as e:
+            logger.error(f"Erro ao planejar o comentário {comment_id}: {e}")
+            if comment_id:
+                await dedup_call(bot.dedup.forget, str(comment_id))
+            continue
+        if plan is not None:
+            plans.append(plan)
+            planned[account.account_id] = planned.get(account.account_id, 0) + 1
+
+    # O group commit do outbox roda em outra thread; o loop continua livre
+    if bot.outbox is not None and plans:
+        recorded = await asyncio.get_running_loop().run_in_executor(None, bot.outbox.record, plans)
+        if not recorded:
+            for plan in plans:
+                if plan['comment_id']:
+                    await dedup_call(bot.dedup.forget, str(plan['comment_id']))
+            return False
+
+    # Cada task herda o contexto (ID de correlação) do request
+    for plan in plans:
+        task = asyncio.ensure_future(execute_plan(plan))
+        pending.add(task)
+        account_id = plan['account_id']
+        pending_by_account[account_id] = pending_by_account.get(account_id, 0) + 1
+        task.add_done_callback(functools.partial(_task_done, account_id))
+
+    return accepted
+
+
+def _task_done(account_id: str, task: asyncio.Task):
+    pending.discard(task)
+    pending_by_account[account_id] -= 1
+    if not pending_by_account[account_id]:
+        del pending_by_account[account_id]
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Erro ao processar comentário: {task.exception()}")
+
+
+# =============================================================================
+# ASGI
+# =============================================================================
+
+async def _respond(send, status: int, body, content_type: str = 'text/plain; charset=utf-8'):
+    """Envia uma resposta HTTP completa"""
+    if isinstance(body, (dict, list)):
+        body = json.dumps(body, ensure_ascii=False)
+        content_type = 'application/json'
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', content_type.encode('latin-1')),
+            (b'content-length', str(len(body)).encode('latin-1'))
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _read_body(receive, limit: int) -> bytes:
+    """Lê o corpo da requisição respeitando o tamanho máximo"""
+    chunks = []
+    total = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise BodyRejected(400, 'cliente desconectou')
+        chunk = message.get('body', b'')
+        total += len(chunk)
+        if total > limit:
+            raise BodyRejected(413, 'corpo excede o limite')
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+async def home(scope, receive, send):
+    """Rota inicial - verifica se o servidor está rodando"""
+    await _respond(send, 200, {
+        'status': 'online',
+        'message': 'Instagram Bot está rodando! 🤖',
+        'pending': len(pending),
+        'rate_limit': instagram.scheduler.budget(),
+        'dedup': bot.dedup.stats(),
+        'outbox': bot.outbox.stats() if bot.outbox else None,
+        'dm_suppression': bot.dm_suppression.stats(),
+        'accounts': {
+            'configured': len(bot.accounts),
+            'active': len(clients),
+            'throttled': [
+                account.account_id for account, client in clients.items() if client.scheduler.paused_for() > 0
+            ]
+        }
+    })
+
+
+async def webhook_verify(scope, receive, send):
+    """Verificação do Webhook (GET)"""
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    mode = query.get('hub.mode', [None])[0]
+    token = query.get('hub.verify_token', [None])[0]
+    challenge = query.get('hub.challenge', [''])[0]
+
+    if mode == 'subscribe' and token == bot.VERIFY_TOKEN:
+        logger.info("✅ Webhook verificado com sucesso!")
+        await _respond(send, 200, challenge)
+    else:
+        logger.warning("❌ Falha na verificação do webhook")
+        await _respond(send, 403, 'Forbidden')
+
+
+async def prometheus_metrics(scope, receive, send):
+    """Métricas de todos os workers no formato de texto do Prometheus"""
+    # Lê os arquivos dos outros workers: fora do loop
+    body = await asyncio.get_running_loop().run_in_executor(None, metrics.REGISTRY.render)
+    await _respond(send, 200, body, metrics.CONTENT_TYPE)
+
+
+async def webhook_handler(scope, receive, send):
+    """Handler principal do Webhook (POST)"""
+    started = time.perf_counter()
+    with logs.context(delivery=logs.new_delivery_id()):
+        status = await receive_webhook(scope, receive, send)
+    bot.WEBHOOK_DURATION.observe(time.perf_counter() - started)
+    bot.WEBHOOK_REQUESTS.inc(str(status))
+
+
+async def receive_webhook(scope, receive, send) -> int:
+    """Verifica, decodifica e enfileira o webhook (retorna o status enviado)"""
+    headers = dict(scope.get('headers') or [])
+    signature = headers.get(b'x-hub-signature-256', b'').decode('latin-1')
+    content_length = headers.get(b'content-length')
+    content_length = int(content_length) if content_length and content_length.isdigit() else None
+
+    verifier = bot.signature_verifier
+    try:
+        verifier.check_headers(content_length, signature)
+        payload = await _read_body(receive, verifier.max_body_size)
+    except BodyRejected as e:
+        logger.warning(f"❌ Webhook recusado: {e.reason}")
+        await _respond(send, e.status, 'Invalid signature' if e.status == 403 else e.reason)
+        return e.status
+
+    if not verifier.verify(payload, signature):
+        logger.warning("❌ Webhook recusado: assinatura inválida")
+        await _respond(send, 403, 'Invalid signature')
+        return 403
+
+    try:
+        comments = parse_comment_changes(payload)
+    except InvalidPayload as e:
+        logger.warning(f"❌ Payload inválido: {e}")
+        await _respond(send, 400, 'Invalid payload')
+        return 400
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("📩 Webhook recebido: %s", payload.decode('utf-8', 'replace'))
+    logger.info(
+        "📩 Webhook recebido: %d bytes, %d comentários", len(payload), len(comments),
+        extra={'event': 'webhook_received'}
+    )
+
+    try:
+        accepted = await process_comments(comments)
+    except Exception as e:
+        logger.error(f"Erro ao processar webhook: {e}")
+        accepted = True
+
+    if not accepted:
+        await _respond(send, 503, 'Busy')
+        return 503
+    await _respond(send, 200, 'OK')
+    return 200
+
+
+ROUTES = {
+    ('GET', '/'): home,
+    ('GET', '/metrics'): prometheus_metrics,
+    ('GET', '/webhook'): webhook_verify,
+    ('POST', '/webhook'): webhook_handler
+}
+
+
+async def _lifespan(receive, send):
+    """Inicialização e encerramento (aguarda os comentários pendentes)"""
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            instagram.clients  # abre os pools antes do primeiro webhook
+            # Ações pendentes de um processo anterior são reenviadas pela fila do app.py
+            bot.start_outbox()
+            metrics.REGISTRY.start()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if pending:
+                logger.info(f"⏳ Aguardando {len(pending)} comentários pendentes")
+                await asyncio.wait(set(pending), timeout=float(os.getenv('QUEUE_DRAIN_TIMEOUT', 25)))
+            for _, client in clients.items():
+                await client.close()
+            if bot.outbox is not None:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, bot.comment_queue.drain)
+                await loop.run_in_executor(None, bot.outbox.close)
+            metrics.REGISTRY.publish()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    """Aplicação ASGI"""
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+
+    handler = ROUTES.get((scope['method'], scope['path']))
+    if handler is None:
+        allowed = any(path == scope['path'] for _, path in ROUTES)
+        return await _respond(send, 405 if allowed else 404, 'Method Not Allowed' if allowed else 'Not Found')
+
+    await handler(scope, receive, send)
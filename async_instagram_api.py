@@ -0,0 +1,398 @@
+"""
+Instagram API Assíncrona - Versão asyncio do módulo instagram_api
+Usa um pool de conexões httpx compartilhado, permitindo milhares de
+chamadas simultâneas à Graph API em um único processo
+"""
+
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+import httpx
+
+from instagram_api import (
+    BASE_URL,
+    GRAPH_IN_FLIGHT,
+    MEDIA_FIELDS,
+    RATE_LIMIT_WAIT,
+    GraphResponse,
+    RateLimitScheduler,
+    RetryPolicy,
+    classify_error,
+    endpoint_kind,
+    endpoint_label,
+    observe_call
+)
+
+logger = logging.getLogger(__name__)
+
+# Configurações padrão do pool de conexões assíncrono
+POOL_SIZE = 128
+# Conexões por pool do httpx (ver AsyncInstagramAPI.clients)
+SHARD_SIZE = 16
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 30
+
+# Quantidade de ações concluídas lembradas para idempotência
+IDEMPOTENCY_MAX_SIZE = 100000
+
+
+class AsyncInstagramAPI:
+    """
+    Classe assíncrona para interagir com a API do Instagram (via Meta Graph API)
+    Mesmos métodos e retornos da InstagramAPI, mas com `await`
+    """
+
+    def __init__(
+        self,
+        access_token: str,
+        instagram_account_id: str,
+        pool_size: int = POOL_SIZE,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        read_timeout: float = READ_TIMEOUT,
+        rate_limits: dict = None,
+        max_throttle_wait: float = 300,
+        base_url: str = None,
+        retry_policy: RetryPolicy = None
+    ):
+        self.access_token = access_token
+        self.instagram_account_id = instagram_account_id
+        self.pool_size = pool_size
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout, pool=None)
+        self.base_url = base_url or BASE_URL
+
+        self.scheduler = RateLimitScheduler(rate_limits)
+        self.max_throttle_wait = max_throttle_wait
+        self.retry_policy = retry_policy or RetryPolicy()
+
+        # Ações já concluídas e em andamento, por (comment_id, ação)
+        self._done = OrderedDict()
+        self._inflight = {}
+
+        self._clients = None
+        self._load = None
+        self._slots = None
+
+    @property
+    def clients(self) -> List[httpx.AsyncClient]:
+        """
+        Clientes HTTP com pools keep-alive (criados no primeiro uso)
+
+        O pool do httpx percorre todas as suas conexões a cada requisição,
+        então um pool único de centenas de conexões gasta mais CPU
+        gerenciando o pool do que fazendo I/O. As conexões são divididas em
+        vários pools de até SHARD_SIZE, e cada requisição usa o menos ocupado.
+        """
+        if self._clients is None:
+            shards = max(1, -(-self.pool_size // SHARD_SIZE))
+            per_shard = -(-self.pool_size // shards)
+            self._clients = [
+                httpx.AsyncClient(
+                    timeout=self.timeout,
+                    limits=httpx.Limits(max_connections=per_shard, max_keepalive_connections=per_shard)
+                )
+                for _ in range(shards)
+            ]
+            self._load = [0] * shards
+            # Requisições excedentes esperam aqui, e não na fila interna do httpx
+            self._slots = asyncio.Semaphore(self.pool_size)
+        return self._clients
+
+    async def close(self):
+        """Fecha as conexões do pool"""
+        if self._clients is not None:
+            for client in self._clients:
+                await client.aclose()
+            self._clients = None
+            self._slots = None
+
+    async def _send(self, method: str, endpoint: str, params: dict = None, data: dict = None) -> GraphResponse:
+        """Executa uma única requisição HTTP para a API do Meta"""
+        url = f"{self.base_url}/{endpoint}"
+        params = dict(params or {})
+        params['access_token'] = self.access_token
+
+        if method not in ('GET', 'POST'):
+            raise ValueError(f"Método não suportado: {method}")
+
+        clients = self.clients
+        label = endpoint_label(endpoint)
+        # A latência inclui a espera por uma conexão livre (como no pool do requests)
+        GRAPH_IN_FLIGHT.inc(label)
+        started = time.perf_counter()
+        try:
+            async with self._slots:
+                shard = self._load.index(min(self._load))
+                self._load[shard] += 1
+                try:
+                    if method == 'GET':
+                        response = await clients[shard].get(url, params=params)
+                    else:
+                        response = await clients[shard].post(url, params=params, json=data)
+                except httpx.HTTPError as e:
+                    result = GraphResponse(error=str(e) or type(e).__name__)
+                    observe_call(label, time.perf_counter() - started, result)
+                    return result
+                finally:
+                    self._load[shard] -= 1
+        finally:
+            GRAPH_IN_FLIGHT.dec(label)
+
+        try:
+            body = response.json()
+        except ValueError:
+            body = response.text
+
+        result = GraphResponse(status=response.status_code, headers=response.headers, body=body)
+        observe_call(label, time.perf_counter() - started, result)
+        return result
+
+    async def _make_request(
+        self,
+        method: str,
+        endpoint: str,
+        params: dict = None,
+        data: dict = None,
+        verify: Callable[[], Awaitable[Optional[dict]]] = None,
+        retry: bool = True
+    ) -> Optional[dict]:
+        """
+        Faz uma requisição para a API do Meta
+        Mesma política da versão síncrona: rate limit, retentativas e backoff
+        (e `verify` antes de repetir uma requisição de resultado incerto;
+        com `retry=False`, erros temporários não são repetidos)
+        """
+        kind = endpoint_kind(endpoint)
+        policy = self.retry_policy
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = started + self.max_throttle_wait
+        attempt = 0
+
+        while True:
+            # Esperar orçamento no rate limit
+            waiting_since = loop.time()
+            while True:
+                wait = self.scheduler.try_acquire(kind)
+                if wait <= 0:
+                    break
+                if loop.time() + wait > deadline:
+                    logger.error(f"❌ Rate limit: sem orçamento para {endpoint} após {self.max_throttle_wait}s")
+                    RATE_LIMIT_WAIT.observe(loop.time() - waiting_since, kind)
+                    return None
+                await asyncio.sleep(wait)
+            RATE_LIMIT_WAIT.observe(loop.time() - waiting_since, kind)
+
+            response = await self._send(method, endpoint, params, data)
+            self.scheduler.update(kind, response.headers)
+
+            if response.ok:
+                return response.body
+
+            error_class = classify_error(response)
+
+            if error_class == 'throttled' and loop.time() < deadline:
+                logger.warning(f"⏳ Rate limit atingido em {endpoint} - aguardando orçamento")
+                self.scheduler.throttled(kind)
+                continue
+
+            attempt += 1
+            delay = policy.backoff(attempt)
+            if (
+                error_class != 'transient'
+                or not retry
+                or attempt > policy.max_retries
+                or loop.time() + delay - started > policy.max_total_time
+            ):
+                break
+
+            logger.warning(
+                f"🔁 Erro temporário em {endpoint} ({response.describe()}) - "
+                f"tentativa {attempt}/{policy.max_retries} em {delay:.1f}s"
+            )
+            await asyncio.sleep(delay)
+
+            # A requisição anterior pode ter sido processada mesmo sem resposta
+            if verify is not None and method == 'POST':
+                existing = await verify()
+                if existing is not None:
+                    logger.info(f"♻️ {endpoint} já havia sido processado - não reenviando")
+                    return existing
+
+        logger.error(f"Erro na requisição para {endpoint}: {response.describe()}")
+        return None
+
+    async def _once(self, key: tuple, coro_func) -> bool:
+        """Executa a ação uma única vez por chave (idempotência)"""
+        if key in self._done:
+            logger.info(f"♻️ Ação {key} já executada - ignorando repetição")
+            return True
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        task = asyncio.ensure_future(coro_func())
+        self._inflight[key] = task
+        try:
+            result = await task
+        finally:
+            del self._inflight[key]
+        if result:
+            self._done[key] = True
+            if len(self._done) > IDEMPOTENCY_MAX_SIZE:
+                self._done.popitem(last=False)
+        return result
+
+    # =========================================================================
+    # MÉTODOS DE COMENTÁRIOS
+    # =========================================================================
+
+    async def reply_to_comment(self, comment_id: str, message: str) -> bool:
+        """
+        Responde a um comentário específico
+
+        Args:
+            comment_id: ID do comentário a ser respondido
+            message: Texto da resposta
+
+        Returns:
+            True se sucesso, False se falhou
+        """
+        async def send() -> bool:
+            result = await self._make_request(
+                method='POST',
+                endpoint=f"{comment_id}/replies",
+                data={'message': message},
+                verify=lambda: self._find_own_reply(comment_id, message)
+            )
+            return result is not None and 'id' in result
+
+        return await self._once((comment_id, 'reply'), send)
+
+    async def _find_own_reply(self, comment_id: str, message: str) -> Optional[dict]:
+        """Procura uma resposta nossa com o mesmo texto (evita resposta duplicada)"""
+        replies = await self._make_request(
+            'GET', f"{comment_id}/replies", params={'fields': 'id,text,from'}, retry=False
+        )
+        if not isinstance(replies, dict):
+            return None
+        for reply in replies.get('data', []):
+            author = (reply.get('from') or {}).get('id')
+            if author == self.instagram_account_id and reply.get('text') == message:
+                return {'id': reply['id']}
+        return None
+
+    async def send_private_reply(self, comment_id: str, message: str) -> bool:
+        """
+        Envia uma mensagem privada (DM) em resposta a um comentário
+
+        Args:
+            comment_id: ID do comentário
+            message: Texto da DM
+
+        Returns:
+            True se sucesso, False se falhou
+        """
+        async def send() -> bool:
+            result = await self._make_request(
+                method='POST',
+                endpoint=f"{self.instagram_account_id}/messages",
+                data={
+                    'recipient': {'comment_id': comment_id},
+                    'message': {'text': message}
+                }
+            )
+            return result is not None and 'message_id' in result
+
+        return await self._once((comment_id, 'private_reply'), send)
+
+    async def reply_and_send_private(
+        self,
+        comment_id: str,
+        reply_text: Optional[str],
+        dm_text: Optional[str]
+    ) -> Tuple[Optional[bool], Optional[bool]]:
+        """
+        Responde o comentário e envia a DM ao mesmo tempo
+
+        Returns:
+            (resultado da resposta, resultado da DM) - None quando não enviado
+        """
+        async def skip():
+            return None
+
+        return tuple(await asyncio.gather(
+            self.reply_to_comment(comment_id, reply_text) if reply_text else skip(),
+            self.send_private_reply(comment_id, dm_text) if dm_text else skip()
+        ))
+
+    async def get_comment_details(self, comment_id: str) -> Optional[dict]:
+        """Obtém detalhes de um comentário específico"""
+        return await self._make_request(
+            method='GET',
+            endpoint=comment_id,
+            params={'fields': 'id,text,username,timestamp,from'}
+        )
+
+    # =========================================================================
+    # MÉTODOS DE MÍDIA/POSTS
+    # =========================================================================
+
+    async def get_media_list(self, limit: int = 25) -> Optional[list]:
+        """Lista as mídias (posts) da conta"""
+        result = await self._make_request(
+            method='GET',
+            endpoint=f"{self.instagram_account_id}/media",
+            params={
+                'fields': MEDIA_FIELDS,
+                'limit': limit
+            }
+        )
+
+        if result and 'data' in result:
+            return result['data']
+        return None
+
+    async def get_media_comments(self, media_id: str, limit: int = 50) -> Optional[list]:
+        """Lista os comentários de um post específico"""
+        result = await self._make_request(
+            method='GET',
+            endpoint=f"{media_id}/comments",
+            params={
+                'fields': 'id,text,username,timestamp,from',
+                'limit': limit
+            }
+        )
+
+        if result and 'data' in result:
+            return result['data']
+        return None
+
+    # =========================================================================
+    # MÉTODOS DE CONTA
+    # =========================================================================
+
+    async def get_account_info(self) -> Optional[dict]:
+        """Obtém informações da conta do Instagram"""
+        return await self._make_request(
+            method='GET',
+            endpoint=self.instagram_account_id,
+            params={'fields': 'id,username,name,biography,followers_count,follows_count,media_count'}
+        )
+
+    async def verify_permissions(self) -> dict:
+        """Verifica quais permissões o token possui"""
+        result = await self._make_request(
+            method='GET',
+            endpoint='me/permissions'
+        )
+
+        if result and 'data' in result:
+            return {
+                perm['permission']: perm['status']
+                for perm in result['data']
+            }
+        return {}
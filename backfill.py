@@ -0,0 +1,307 @@
+"""
+Backfill - Recupera comentários que chegaram com o webhook fora do ar
+Percorre as páginas de comentários de todos os posts monitorados ao mesmo
+tempo e envia os que ainda não foram tratados para o fluxo normal do app
+(deduplicação, outbox e fila de workers)
+
+Execute: python backfill.py [--posts ID ...] [--hours 24] [--dry-run]
+"""
+
+import os
+import json
+import queue
+import argparse
+import logging
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from instagram_api import InstagramAPI, PagingError
+
+logger = logging.getLogger(__name__)
+
+# Último comentário tratado de cada post (high-water mark)
+STATE_FILE = 'backfill_state.json'
+
+# Formato do campo `timestamp` da Graph API (ex: 2024-05-01T12:00:00+0000)
+TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%S%z'
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """Converte o timestamp da Graph API (None se ausente ou inválido)"""
+    try:
+        return datetime.strptime(value, TIMESTAMP_FORMAT)
+    except (TypeError, ValueError):
+        return None
+
+
+def load_state(path: str = STATE_FILE) -> dict:
+    """Carrega os high-water marks salvos ({} se não existir)"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_state(state: dict, path: str = STATE_FILE):
+    """Salva os high-water marks de forma atômica"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.backfill_state.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2, sort_keys=True)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def to_webhook_value(media_id: str, comment: dict) -> dict:
+    """Converte um comentário da listagem para o formato do webhook"""
+    author = comment.get('from') or {}
+    return {
+        'id': comment.get('id'),
+        'text': comment.get('text', ''),
+        'media': {'id': media_id},
+        'from': {
+            'id': author.get('id'),
+            'username': author.get('username') or comment.get('username', 'usuário')
+        }
+    }
+
+
+class CommentSweep:
+    """
+    Varredura concorrente dos comentários novos de vários posts
+
+    Cada post é paginado por uma thread (no máximo `concurrency` ao mesmo
+    tempo), parando no primeiro comentário já coberto pelo high-water mark.
+    As páginas chegam ao consumidor por uma fila limitada: se o consumidor
+    for mais lento, as threads esperam em vez de acumular comentários.
+    """
+
+    def __init__(
+        self,
+        api: InstagramAPI,
+        posts: List[str],
+        high_water: Dict[str, datetime],
+        default_since: datetime,
+        concurrency: int = 4,
+        page_size: int = 50,
+        buffer_pages: int = 64
+    ):
+        self.api = api
+        self.posts = list(posts)
+        self.high_water = high_water
+        self.default_since = default_since
+        self.concurrency = max(1, concurrency)
+        self.page_size = page_size
+        self.buffer_pages = buffer_pages
+
+        # Resultado por post: timestamp do comentário mais novo (varredura completa)
+        self.completed = {}
+        self.failed = set()
+        self.pages = 0
+        self.comments = 0
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def _put(self, out: queue.Queue, item) -> bool:
+        """Entrega um item ao consumidor (False se a varredura foi interrompida)"""
+        while not self._stop.is_set():
+            try:
+                out.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _sweep_post(self, media_id: str, out: queue.Queue):
+        since = self.high_water.get(media_id) or self.default_since
+        newest = None
+
+        try:
+            for page in self.api.iter_media_comments(media_id, self.page_size):
+                fresh = []
+                reached = False
+                for comment in page:
+                    timestamp = parse_timestamp(comment.get('timestamp'))
+                    if timestamp is not None and timestamp <= since:
+                        reached = True
+                        break
+                    if timestamp is not None and (newest is None or timestamp > newest):
+                        newest = timestamp
+                    fresh.append(comment)
+
+                with self._lock:
+                    self.pages += 1
+                    self.comments += len(fresh)
+
+                if fresh and not self._put(out, (media_id, fresh)):
+                    return
+                # Os comentários vêm do mais novo ao mais antigo: o resto já foi visto
+                if reached or self._stop.is_set():
+                    break
+        except PagingError as e:
+            logger.error(f"❌ {e} - o high-water mark do post não será avançado")
+            self.failed.add(media_id)
+        else:
+            if not self._stop.is_set():
+                self.completed[media_id] = newest
+        finally:
+            self._put(out, (media_id, None))
+
+    def __iter__(self) -> Iterator[Tuple[str, List[dict]]]:
+        """
+        Yields:
+            (ID do post, comentários novos de uma página)
+        """
+        out = queue.Queue(maxsize=self.buffer_pages)
+        self._stop.clear()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='backfill') as pool:
+            for media_id in self.posts:
+                pool.submit(self._sweep_post, media_id, out)
+
+            remaining = len(self.posts)
+            try:
+                while remaining:
+                    media_id, comments = out.get()
+                    if comments is None:
+                        remaining -= 1
+                        continue
+                    yield media_id, comments
+            finally:
+                # Consumidor parou antes do fim: liberar as threads
+                self._stop.set()
+
+
+def monitored_media_ids(campaign_store) -> List[str]:
+    """IDs das mídias com campanha ativa (shortcodes não podem ser listados)"""
+    media_ids = []
+    for post_id, config in campaign_store.items():
+        if not config.get('enabled'):
+            continue
+        if post_id.isdigit():
+            media_ids.append(post_id)
+        else:
+            logger.warning(f"⚠️ {post_id} não é um ID de mídia - ignorado no backfill")
+    return media_ids
+
+
+def run(bot, posts: List[str], args, account=None) -> dict:
+    """
+    Executa o backfill usando o fluxo do app (process_comments)
+
+    Args:
+        account: Conta dos posts (padrão: a do .env)
+
+    Returns:
+        Resumo da execução
+    """
+    state = load_state(args.state)
+    high_water = {media_id: parse_timestamp(value) for media_id, value in state.items()}
+    default_since = datetime.now(timezone.utc) - timedelta(hours=args.hours)
+
+    account = account or bot.accounts.default
+    sweep = CommentSweep(
+        bot.clients.get(account),
+        posts,
+        high_water,
+        default_since,
+        concurrency=args.concurrency,
+        page_size=args.page_size
+    )
+
+    queued = 0
+    skipped = 0
+    rejected = set()
+
+    for media_id, comments in sweep:
+        # Comentários da própria conta e ações já registradas no outbox não são reenviados
+        comments = [c for c in comments if (c.get('from') or {}).get('id') != account.account_id]
+        known = bot.outbox.known([c['id'] for c in comments]) if bot.outbox is not None else set()
+        fresh = [c for c in comments if c['id'] not in known]
+        skipped += len(comments) - len(fresh)
+        queued += len(fresh)
+
+        if args.dry_run or not fresh:
+            continue
+
+        # Com a fila cheia, espera vaga (a varredura desacelera junto)
+        values = ((account.account_id, to_webhook_value(media_id, comment)) for comment in fresh)
+        if not bot.process_comments(values, submit_timeout=args.submit_timeout):
+            rejected.add(media_id)
+
+    if not args.dry_run:
+        bot.comment_queue.drain(timeout=float('inf'))
+
+        for media_id, newest in sweep.completed.items():
+            if media_id not in rejected and newest is not None:
+                state[media_id] = newest.strftime(TIMESTAMP_FORMAT)
+        save_state(state, args.state)
+
+    return {
+        'posts': len(posts),
+        'pages': sweep.pages,
+        'comments': sweep.comments,
+        'queued': queued,
+        'skipped': skipped,
+        'failed_posts': sorted(sweep.failed | rejected)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recupera comentários perdidos enquanto o webhook estava fora do ar')
+    parser.add_argument('--posts', nargs='*', help='IDs das mídias (padrão: todas as campanhas ativas)')
+    parser.add_argument('--account', help='ID da conta no accounts.json (padrão: a do .env)')
+    parser.add_argument('--hours', type=float, default=24,
+                        help='janela para posts sem high-water mark salvo (padrão: 24h)')
+    parser.add_argument('--state', default=os.getenv('BACKFILL_STATE_FILE', STATE_FILE),
+                        help='arquivo com os high-water marks')
+    parser.add_argument('--concurrency', type=int, default=4, help='posts paginados ao mesmo tempo')
+    parser.add_argument('--page-size', type=int, default=50, help='comentários por página')
+    parser.add_argument('--workers', type=int, help='workers enviando respostas/DMs (padrão: QUEUE_WORKERS)')
+    parser.add_argument('--submit-timeout', type=float, default=300,
+                        help='segundos esperando vaga na fila antes de desistir de um comentário')
+    parser.add_argument('--dry-run', action='store_true', help='apenas conta os comentários, sem responder')
+    args = parser.parse_args()
+
+    import app as bot
+
+    account = bot.accounts.resolve(args.account)
+    if account is None:
+        print(f"❌ Conta {args.account} não está no {bot.accounts.path}")
+        return
+
+    if args.workers:
+        bot.comment_queue.num_workers = args.workers
+        # Uma conexão por worker e por post sendo paginado (o pool é criado no primeiro uso)
+        client = bot.clients.get(account)
+        client.pool_size = max(client.pool_size, args.workers + args.concurrency)
+    # Reenviar também o que ficou pendente no outbox
+    bot.start_outbox()
+
+    posts = args.posts or monitored_media_ids(account.campaigns)
+    if not posts:
+        print("❌ Nenhum post para varrer")
+        return
+
+    print(f"🔎 Varrendo {len(posts)} posts...")
+    summary = run(bot, posts, args, account)
+
+    print(f"\n✅ {summary['pages']} páginas, {summary['comments']} comentários novos")
+    print(f"   {'Seriam enviados' if args.dry_run else 'Enviados para a fila'}: {summary['queued']}")
+    print(f"   Já tratados: {summary['skipped']}")
+    if summary['failed_posts']:
+        print(f"   ⚠️ Incompletos (rode de novo): {', '.join(summary['failed_posts'])}")
+
+
+if __name__ == '__main__':
+    main()
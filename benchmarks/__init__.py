@@ -0,0 +1,4 @@
+"""
+Benchmarks do Instagram Bot
+Execute cada um com: python -m benchmarks.<nome>
+"""
@@ -0,0 +1,79 @@
+"""
+Benchmark das contas
+Memória ocupada por conta (registro, cliente da Graph API com rate limit
+e sessão HTTP) e custo de direcionar uma entrada do webhook para a conta
+
+Execute: python -m benchmarks.bench_accounts [contas]
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import tracemalloc
+
+from accounts import Account, AccountRegistry, ClientCache
+from campaigns import CampaignStore
+from instagram_api import IdempotencyStore, InstagramAPI
+
+
+def allocated(func) -> int:
+    """Bytes alocados (e mantidos) por `func`"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    func()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'accounts.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                f"1784140{n:010d}": {'access_token': f"token-{n}", 'name': f"conta{n}"}
+                for n in range(count)
+            }, f)
+
+        default = Account('default', 'token', CampaignStore(os.path.join(directory, 'posts.json'), watch=False))
+        holder = {}
+        idempotency = IdempotencyStore()
+
+        def load():
+            holder['registry'] = AccountRegistry(path, default=default)
+
+        def create_clients():
+            clients = ClientCache(lambda account: InstagramAPI(
+                account.access_token, account.account_id, pool_size=4, idempotency=idempotency
+            ))
+            for account in holder['registry'].accounts.values():
+                clients.get(account)
+            holder['clients'] = clients
+
+        def open_sessions():
+            for _, client in holder['clients'].items():
+                client.session
+
+        print(f"📊 {count} contas\n")
+        for label, func in (
+            ('registro (accounts.json)', load),
+            ('cliente + rate limit', create_clients),
+            ('sessão HTTP (pool)', open_sessions),
+        ):
+            print(f"{label:<28}{allocated(func) / count / 1024:>8.1f} KiB/conta")
+
+        registry = holder['registry']
+        ids = list(registry.accounts)
+        rounds = 200000
+        start = time.perf_counter()
+        for i in range(rounds):
+            registry.resolve(ids[i % len(ids)])
+        print(f"\n{'resolve(entry_id)':<28}{(time.perf_counter() - start) / rounds * 1e6:>8.2f} µs")
+
+
+if __name__ == '__main__':
+    main()
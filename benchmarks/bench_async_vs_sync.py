@@ -0,0 +1,67 @@
+"""
+Teste de carga: cliente síncrono (threads) x cliente assíncrono
+Envia resposta + DM para N comentários contra a Graph API falsa com a
+mesma latência, no mesmo processo (mesmo hardware)
+
+Execute: python -m benchmarks.bench_async_vs_sync [comentários] [latência]
+"""
+
+import sys
+import time
+import asyncio
+import logging
+
+from async_instagram_api import AsyncInstagramAPI
+from benchmarks.fake_graph import FakeGraphAPI
+from instagram_api import InstagramAPI
+from job_queue import JobQueue
+
+# Sem rate limit local: medimos só a capacidade de I/O
+UNLIMITED = {'replies': 1e9, 'messages': 1e9, 'default': 1e9}
+
+
+def run_sync(url: str, comments: int, workers: int) -> float:
+    """Comentários/segundo com a JobQueue + InstagramAPI (uma thread por chamada)"""
+    api = InstagramAPI('token', 'account', pool_size=workers, rate_limits=UNLIMITED, base_url=url)
+    queue = JobQueue(num_workers=workers, max_size=comments, name=f'bench-{workers}')
+
+    start = time.perf_counter()
+    for i in range(comments):
+        queue.submit(api.reply_and_send_private, f"sync{workers}_{i}", 'resposta', 'dm')
+    queue.drain(timeout=600)
+    return comments / (time.perf_counter() - start)
+
+
+def run_async(url: str, comments: int) -> float:
+    """Comentários/segundo com a AsyncInstagramAPI (uma task por comentário)"""
+    async def main():
+        api = AsyncInstagramAPI('token', 'account', rate_limits=UNLIMITED, base_url=url)
+        api.clients  # cria os pools antes de medir
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            api.reply_and_send_private(f"async_{i}", 'resposta', 'dm')
+            for i in range(comments)
+        ))
+        elapsed = time.perf_counter() - start
+        await api.close()
+        return comments / elapsed
+
+    return asyncio.run(main())
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING)
+    comments = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.3
+
+    server = FakeGraphAPI(latency=latency)
+    url = server.start_in_thread()
+
+    print(f"📊 {comments} comentários (resposta + DM), latência da API {latency * 1000:.0f} ms\n")
+    for workers in (32, 64, 128):
+        print(f"{'síncrono, ' + str(workers) + ' threads':<28}{run_sync(url, comments, workers):>10.0f} comentários/s")
+    print(f"{'assíncrono':<28}{run_async(url, comments):>10.0f} comentários/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Benchmark da importação/exportação de campanhas
+Tempo para ler, validar e gravar N campanhas de um CSV/JSONL (o que o
+`manage_posts.py import` faz) e para exportá-las de volta
+
+Execute: python -m benchmarks.bench_campaign_io [campanhas]
+"""
+
+import io
+import os
+import sys
+import time
+import tempfile
+
+from campaign_io import read_campaigns, write_campaigns
+from campaigns import save_campaign_file
+
+
+def campaigns(count: int):
+    for n in range(count):
+        yield str(17000000000000000 + n), {
+            'comment_reply': f"Enviei na sua DM, @{{username}}! 🥰 ({n})",
+            'dm_message': f"Oi {{username}}! Aqui está o link: https://s.shopee.com.br/{n}",
+            'enabled': bool(n % 3),
+            'keywords': ['link', 'quero', 'eu']
+        }
+
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    print(f"📊 {count} campanhas\n")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'monitored_posts.json')
+        for fmt in ('csv', 'jsonl'):
+            source = io.StringIO()
+            export = timed(lambda: write_campaigns(campaigns(count), source, fmt))
+            holder = {}
+
+            def read():
+                source.seek(0)
+                holder['config'] = dict(read_campaigns(source, fmt))
+
+            parse = timed(read)
+            indented = timed(lambda: save_campaign_file(holder['config'], path))
+            compact = timed(lambda: save_campaign_file(holder['config'], path, indent=None))
+            print(f"{fmt}")
+            print(f"  {'exportar':<30}{export:>8.2f} s")
+            print(f"  {'ler + validar':<30}{parse:>8.2f} s")
+            print(f"  {'gravar (indentado)':<30}{indented:>8.2f} s")
+            print(f"  {'gravar (--compact)':<30}{compact:>8.2f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark do limite adaptativo de concorrência
+Várias threads chamando a Graph API falsa enquanto a capacidade dela muda
+(normal -> sobrecarregada -> normal), com o número de chamadas simultâneas
+fixo (todas as threads) e com o ConcurrencyLimiter
+
+Execute: python -m benchmarks.bench_concurrency [threads] [segundos por fase]
+"""
+
+import sys
+import time
+import threading
+
+from benchmarks.fake_graph import FakeGraphAPI
+from instagram_api import ConcurrencyLimiter, InstagramAPI, RetryPolicy
+
+# (nome, requisições que a API atende ao mesmo tempo)
+PHASES = (('normal', 16), ('sobrecarregada', 2), ('normal de novo', 16))
+
+# Latência da API com folga e timeout de leitura do cliente
+LATENCY = 0.05
+READ_TIMEOUT = 0.5
+
+
+def percentile(values: list, fraction: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run(threads: int, seconds: float, limiter: ConcurrencyLimiter = None) -> list:
+    graph = FakeGraphAPI(latency=LATENCY, capacity=PHASES[0][1])
+    api = InstagramAPI(
+        'token', graph.account_id,
+        pool_size=threads,
+        read_timeout=READ_TIMEOUT,
+        rate_limits={'default': 100000},
+        base_url=graph.start_in_thread(),
+        retry_policy=RetryPolicy(base_delay=0.05, max_delay=0.5),
+        limiter=limiter
+    )
+    results = []
+    phase = {'index': 0}
+    stop = threading.Event()
+
+    def client():
+        while not stop.is_set():
+            index = phase['index']
+            started = time.perf_counter()
+            ok = api.get_account_info() is not None
+            results.append((index, ok, time.perf_counter() - started))
+
+    workers = [threading.Thread(target=client, daemon=True) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+
+    summary = []
+    for index, (name, capacity) in enumerate(PHASES):
+        phase['index'] = index
+        graph.capacity = capacity
+        requests_before = graph.requests
+        time.sleep(seconds)
+        summary.append((name, capacity, graph.requests - requests_before,
+                        int(limiter.limit) if limiter else threads))
+
+    stop.set()
+    for worker in workers:
+        worker.join()
+    graph.stop()
+
+    report = []
+    for index, (name, capacity, sent, limit) in enumerate(summary):
+        latencies = [elapsed for phase_index, ok, elapsed in results if phase_index == index and ok]
+        failed = sum(1 for phase_index, ok, _ in results if phase_index == index and not ok)
+        report.append((name, capacity, len(latencies) / seconds, percentile(latencies, 0.5),
+                       percentile(latencies, 0.99), failed, sent, limit))
+    return report
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 24
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    print(f"📊 {threads} threads, latência {LATENCY * 1000:.0f} ms, timeout {READ_TIMEOUT * 1000:.0f} ms, {seconds:.0f} s por fase\n")
+    for label, limiter in (
+        ('fixo', None),
+        ('adaptativo', ConcurrencyLimiter(initial=4, max_limit=threads, queue_timeout=30)),
+    ):
+        print(label)
+        print(f"  {'fase (capacidade)':<26}{'ok/s':>8}{'p50':>10}{'p99':>10}{'falhas':>8}{'req':>7}{'limite':>8}")
+        for name, capacity, rate, p50, p99, failed, sent, limit in run(threads, seconds, limiter):
+            print(f"  {f'{name} ({capacity})':<26}{rate:>8.1f}{p50 * 1000:>8.0f}ms{p99 * 1000:>8.0f}ms"
+                  f"{failed:>8}{sent:>7}{limit:>8}")
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark do logging
+Várias threads registram as linhas de cada comentário ao mesmo tempo;
+compara o StreamHandler síncrono (logging.basicConfig) com o AsyncLogHandler,
+medindo o tempo gasto por quem chama o logger
+
+Execute: python -m benchmarks.bench_logging [threads] [linhas por thread]
+"""
+
+import os
+import sys
+import time
+import logging
+import tempfile
+import threading
+
+import logs
+
+logger = logging.getLogger('bench')
+
+
+def caller_time(threads: int, per_thread: int) -> float:
+    """Microssegundos por linha do ponto de vista de quem chama"""
+    def worker(n: int):
+        with logs.context(delivery=logs.new_delivery_id()):
+            for i in range(per_thread):
+                logger.info(
+                    "💬 Novo comentário de @%s: %s (post %s)", f"usuario{n}", 'quero os links', i,
+                    extra={'event': 'comment_received'}
+                )
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return (time.perf_counter() - start) / (threads * per_thread) * 1e6
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    per_thread = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    root = logging.getLogger()
+
+    print(f"📊 {threads} threads x {per_thread} linhas (escrevendo em arquivo)\n")
+    with tempfile.TemporaryDirectory(dir='.') as directory:
+        with open(os.path.join(directory, 'sync.log'), 'w') as stream:
+            handler = logging.StreamHandler(stream)
+            handler.setFormatter(logging.Formatter(logs.TEXT_FORMAT))
+            root.handlers = [handler]
+            root.setLevel(logging.INFO)
+            print(f"{'StreamHandler (síncrono)':<34}{caller_time(threads, per_thread):>8.2f} µs/linha")
+
+        cases = (
+            ('AsyncLogHandler (texto)', 'text', None),
+            ('AsyncLogHandler (JSON)', 'json', None),
+            ('AsyncLogHandler (JSON, 10%)', 'json', {'comment_received': 0.1}),
+        )
+        for label, fmt, rates in cases:
+            with open(os.path.join(directory, f"{fmt}.log"), 'w') as stream:
+                # Fila grande: medimos o custo de enfileirar, sem descartes
+                handler = logs.configure('INFO', fmt, rates, queue_size=threads * per_thread, stream=stream)
+                per_line = caller_time(threads, per_thread)
+                start = time.perf_counter()
+                handler.flush(timeout=60)
+                print(f"{label:<34}{per_line:>8.2f} µs/linha   (escrita terminou {time.perf_counter() - start:.2f}s depois)")
+
+
+if __name__ == '__main__':
+    main()
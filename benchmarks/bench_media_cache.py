@@ -0,0 +1,81 @@
+"""
+Benchmark do cache de mídias (manage_posts.py)
+Requisições e tempo para listar os posts de uma conta grande: sem cache
+(todas as páginas a cada ação), cache novo, dentro do TTL, revalidação
+com ETag (304) e atualização incremental depois de novos posts; busca
+offline nas legendas; consultas do "testar conexão" em sequência e
+ao mesmo tempo
+
+Execute: python -m benchmarks.bench_media_cache [posts] [latência]
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+from benchmarks.fake_graph import FakeGraphAPI
+from instagram_api import InstagramAPI
+from manage_posts import run_concurrently
+from media_cache import MediaCache
+
+
+def measure(graph: FakeGraphAPI, func):
+    """(requisições, segundos) de `func`"""
+    requests_before = graph.requests
+    start = time.perf_counter()
+    func()
+    return graph.requests - requests_before, time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.1
+
+    graph = FakeGraphAPI(latency=latency, media_count=count)
+    api = InstagramAPI('token', graph.account_id, base_url=graph.start_in_thread())
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'media_cache.json')
+        cache = MediaCache(graph.account_id, path, ttl=300)
+
+        def without_cache():
+            MediaCache(graph.account_id, os.path.join(directory, 'sem_cache.json')).refresh(api)
+
+        def expire():
+            cache.fetched_at = 0
+
+        def publish():
+            expire()
+            graph.media_count += 5
+
+        print(f"📊 {count} posts, latência {latency * 1000:.0f} ms\n")
+        for label, prepare, func in (
+            ('sem cache (todas as páginas)', None, without_cache),
+            ('cache vazio (primeira vez)', None, lambda: cache.refresh(api)),
+            ('dentro do TTL', None, lambda: cache.refresh(api)),
+            ('TTL vencido, nada novo (304)', expire, lambda: cache.refresh(api)),
+            ('5 posts novos (incremental)', publish, lambda: cache.refresh(api)),
+            ('reabrir o cache do disco', None, lambda: MediaCache(graph.account_id, path)),
+        ):
+            if prepare:
+                prepare()
+            calls, seconds = measure(graph, func)
+            print(f"{label:<32}{calls:>5} req{seconds * 1000:>10.1f} ms")
+
+        rounds = 200
+        start = time.perf_counter()
+        for i in range(rounds):
+            cache.search(('vassoura', 'promocao #3', 'Post 12', 'inexistente')[i % 4])
+        print(f"\n{'busca na legenda (offline)':<32}{len(cache):>5} posts{(time.perf_counter() - start) / rounds * 1000:>8.2f} ms")
+
+    sequential = measure(graph, lambda: (api.get_account_info(), api.verify_permissions()))[1]
+    concurrent = measure(graph, lambda: run_concurrently(info=api.get_account_info, perms=api.verify_permissions))[1]
+    print(f"\n{'testar conexão (sequencial)':<32}{sequential * 1000:>19.1f} ms")
+    print(f"{'testar conexão (concorrente)':<32}{concurrent * 1000:>19.1f} ms")
+
+    graph.stop()
+
+
+if __name__ == '__main__':
+    main()
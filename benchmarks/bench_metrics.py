@@ -0,0 +1,52 @@
+"""
+Benchmark das métricas
+Custo, por chamada, da instrumentação que roda no caminho de cada
+requisição à Graph API (histograma + contador + gauge de em andamento)
+
+Execute: python -m benchmarks.bench_metrics [chamadas]
+"""
+
+import sys
+import time
+
+from instagram_api import GRAPH_IN_FLIGHT, GraphResponse, endpoint_label, observe_call
+from metrics import Registry
+
+
+def per_call_us(func, calls: int) -> float:
+    """Microssegundos por chamada"""
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+    registry = Registry()
+    counter = registry.counter('bench_total', 'contador', ('endpoint',))
+    histogram = registry.histogram('bench_seconds', 'histograma', ('endpoint',))
+    ok = GraphResponse(status=200, body={'id': '1'})
+    error = GraphResponse(status=400, body={'error': {'code': 100}})
+
+    def instrumented_call():
+        label = endpoint_label('17895695668004550/replies')
+        GRAPH_IN_FLIGHT.inc(label)
+        GRAPH_IN_FLIGHT.dec(label)
+        observe_call(label, 0.123, ok)
+
+    cases = (
+        ('Counter.inc', lambda: counter.inc('replies')),
+        ('Histogram.observe', lambda: histogram.observe(0.123, 'replies')),
+        ('chamada à Graph API (200)', instrumented_call),
+        ('chamada à Graph API (erro)', lambda: observe_call('replies', 0.123, error)),
+    )
+
+    print(f"📊 {calls} chamadas\n")
+    for label, func in cases:
+        print(f"{label:<30}{per_call_us(func, calls):>8.2f} µs/chamada")
+
+
+if __name__ == '__main__':
+    main()
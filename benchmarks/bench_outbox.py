@@ -0,0 +1,53 @@
+"""
+Benchmark do outbox
+Várias threads (como os requests do gunicorn) gravam ações ao mesmo tempo;
+compara um commit (fsync) por gravação com o group commit
+
+Execute: python -m benchmarks.bench_outbox [threads] [gravações por thread]
+"""
+
+import os
+import sys
+import time
+import tempfile
+import threading
+
+from outbox import Outbox
+
+
+def records_per_second(outbox: Outbox, threads: int, per_thread: int) -> float:
+    """Ações gravadas (e confirmadas no disco) por segundo"""
+    def worker(n: int):
+        for i in range(per_thread):
+            plan = {
+                'comment_id': f"{n}_{i}",
+                'username': 'usuario',
+                'reply_text': 'Todos os itens foram enviados para sua DM!',
+                'dm_text': 'Aqui estão os links 🔗'
+            }
+            assert outbox.record([plan])
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return threads * per_thread / (time.perf_counter() - start)
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    per_thread = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    print(f"📊 {threads} threads x {per_thread} gravações (synchronous=FULL)\n")
+    # No diretório atual: /tmp costuma ser tmpfs, onde o fsync não custa nada
+    with tempfile.TemporaryDirectory(dir='.') as directory:
+        for label, max_batch in (('um commit por gravação', 1), ('group commit', 500)):
+            outbox = Outbox(os.path.join(directory, f"outbox_{max_batch}.db"), max_batch=max_batch)
+            rate = records_per_second(outbox, threads, per_thread)
+            print(f"{label:<26}{rate:>10.0f} gravações/s   ({outbox.stats()['writes_per_commit']} por commit)")
+
+
+if __name__ == '__main__':
+    main()
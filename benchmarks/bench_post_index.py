@@ -0,0 +1,62 @@
+"""
+Benchmark da busca de configuração de posts
+Compara a varredura linear original com o PostIndex compilado
+
+Execute: python -m benchmarks.bench_post_index [quantidade_de_posts]
+"""
+
+import sys
+import time
+import random
+
+from post_index import PostIndex
+
+
+def naive_lookup(posts: dict, post_id: str):
+    """Implementação original de get_post_config"""
+    if post_id in posts:
+        return posts[post_id]
+    for shortcode, config in posts.items():
+        if shortcode in post_id:
+            return config
+    return None
+
+
+def random_id() -> str:
+    return str(random.randint(10 ** 16, 10 ** 17 - 1))
+
+
+def measure(func, ids: list) -> float:
+    """Tempo médio por busca, em microssegundos"""
+    start = time.perf_counter()
+    for post_id in ids:
+        func(post_id)
+    return (time.perf_counter() - start) / len(ids) * 1e6
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    random.seed(42)
+
+    posts = {random_id(): {'enabled': True, 'dm_message': 'link'} for _ in range(total)}
+    configured = random.sample(list(posts), 1000)
+    unconfigured = [random_id() for _ in range(1000)]
+
+    start = time.perf_counter()
+    index = PostIndex(posts)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    naive_sample = unconfigured[:100]
+
+    print(f"📊 {total} posts configurados (índice compilado em {build_ms:.0f} ms)\n")
+    print(f"{'cenário':<30}{'linear (µs)':>15}{'índice (µs)':>15}")
+    print("-" * 60)
+    print(f"{'post configurado':<30}{measure(lambda i: naive_lookup(posts, i), configured):>15.2f}"
+          f"{measure(index.lookup, configured):>15.2f}")
+    print(f"{'post não configurado (1ª vez)':<30}{measure(lambda i: naive_lookup(posts, i), naive_sample):>15.2f}"
+          f"{measure(index.lookup, unconfigured):>15.2f}")
+    print(f"{'post não configurado (cache)':<30}{'-':>15}{measure(index.lookup, unconfigured):>15.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Benchmark da verificação de assinatura dos webhooks
+Compara a implementação original (chave codificada e hexdigest formatado a
+cada requisição) com o SignatureVerifier (estado HMAC pré-processado)
+
+Execute: python -m benchmarks.bench_signature
+"""
+
+import io
+import hmac
+import time
+import hashlib
+
+from signature import SignatureVerifier
+
+APP_SECRET = 'segredo-do-app-de-teste-0123456789abcdef'
+BODY_SIZES = (512, 4 * 1024, 64 * 1024, 512 * 1024)
+
+
+def original_verify(payload: bytes, signature: str) -> bool:
+    """verify_signature original do app.py"""
+    expected_signature = hmac.new(
+        APP_SECRET.encode('utf-8'),
+        payload,
+        hashlib.sha256
+    ).hexdigest()
+    return hmac.compare_digest(f"sha256={expected_signature}", signature)
+
+
+def requests_per_second(func, seconds: float = 0.5) -> float:
+    """Chamadas por segundo em um único núcleo"""
+    count = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            func()
+        count += 100
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    verifier = SignatureVerifier(APP_SECRET, max_body_size=1024 * 1024)
+
+    print(f"{'corpo':>10}{'original (req/s)':>20}{'verify (req/s)':>18}{'stream (req/s)':>18}")
+    print("-" * 66)
+    for size in BODY_SIZES:
+        payload = (b'{"object":"instagram","entry":[]}' * (size // 33 + 1))[:size]
+        signature = 'sha256=' + hmac.new(APP_SECRET.encode(), payload, hashlib.sha256).hexdigest()
+        assert original_verify(payload, signature) and verifier.verify(payload, signature)
+
+        original = requests_per_second(lambda: original_verify(payload, signature))
+        verify = requests_per_second(lambda: verifier.verify(payload, signature))
+        stream = requests_per_second(
+            lambda: verifier.read_verified(io.BytesIO(payload), len(payload), signature)
+        )
+        print(f"{size:>10}{original:>20,.0f}{verify:>18,.0f}{stream:>18,.0f}")
+
+
+if __name__ == '__main__':
+    main()
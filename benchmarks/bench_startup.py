@@ -0,0 +1,192 @@
+"""
+Benchmark da inicialização do bot
+- Import do app: etapas (startup.py) e as bibliotecas mais lentas
+  (`python -X importtime`)
+- Gunicorn com e sem `--preload`: tempo até o primeiro request e memória
+  própria (não compartilhada) de cada worker
+
+Os tempos são comparados com o orçamento em BUDGET_MS; o benchmark termina
+com código 1 se algum passar (dá para rodar no CI).
+
+Execute: python -m benchmarks.bench_startup [workers]
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import tempfile
+import subprocess
+import urllib.request
+
+# Orçamento (ms): import do app em um processo novo e primeiro request do
+# worker (do início do import, ou do fork com preload)
+BUDGET_MS = {
+    'import': 400,
+    'first_request': 1000,
+    'first_request_preload': 100
+}
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Bibliotecas mostradas na quebra do import
+TOP_IMPORTS = 8
+
+
+def bot_env(directory: str) -> dict:
+    """Variáveis de ambiente de um bot isolado em `directory`"""
+    return {
+        **os.environ,
+        'LOG_LEVEL': 'WARNING',
+        'OUTBOX_FILE': os.path.join(directory, 'outbox.db'),
+        'DEDUP_BACKEND': 'memory',
+        'DM_SUPPRESSION_FILE': '',
+        'MONITORED_POSTS_FILE': os.path.join(directory, 'monitored_posts.json'),
+        'ACCOUNTS_FILE': os.path.join(directory, 'accounts.json'),
+        'METRICS_DIR': os.path.join(directory, 'metrics')
+    }
+
+
+# =============================================================================
+# IMPORT
+# =============================================================================
+
+def profile_import(env: dict):
+    """(etapas do startup.py, [(biblioteca, ms)] importadas direto pelo app)"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c',
+         'import app, json; print(json.dumps(app.startup.PROFILE.stats()))'],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    stats = json.loads(result.stdout.strip().splitlines()[-1])
+
+    # Linhas "import time: próprio | acumulado | nome"; o recuo do nome é a
+    # profundidade. Ficam os imports feitos pelo app (profundidade 1), que
+    # aparecem antes da linha do próprio app
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        if name.strip() == 'app':
+            break
+        if depth == 1:
+            modules.append((name.strip(), int(cumulative) / 1000))
+        elif depth == 0:
+            modules.clear()
+    modules.sort(key=lambda item: item[1], reverse=True)
+    return stats, modules
+
+
+# =============================================================================
+# GUNICORN
+# =============================================================================
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def get_json(url: str, timeout: float = 1) -> dict:
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def memory_kb(pid: int) -> dict:
+    """Pss e memória privada (kB) do processo (Linux)"""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if parts[0].rstrip(':') in ('Pss', 'Private_Clean', 'Private_Dirty'):
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {'pss': fields['Pss'], 'private': fields['Private_Clean'] + fields['Private_Dirty']}
+
+
+def worker_pids(master: int) -> list:
+    with open(f'/proc/{master}/task/{master}/children') as f:
+        return [int(pid) for pid in f.read().split()]
+
+
+def run_gunicorn(env: dict, workers: int, preload: bool) -> dict:
+    port = free_port()
+    env = {**env, 'PRELOAD_APP': 'true' if preload else 'false'}
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-w', str(workers), '-b', f'127.0.0.1:{port}', 'app:app'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        home = None
+        while home is None:
+            if time.perf_counter() - started > 60:
+                raise RuntimeError("gunicorn não respondeu em 60 s")
+            try:
+                home = get_json(f'http://127.0.0.1:{port}/')
+            except OSError:
+                time.sleep(0.01)
+        first_response = time.perf_counter() - started
+
+        # Todos os workers atendem alguns requests antes de medir a memória
+        startups = {}
+        deadline = time.perf_counter() + 10
+        while len(startups) < workers and time.perf_counter() < deadline:
+            stats = get_json(f'http://127.0.0.1:{port}/')['startup']
+            startups[stats['pid']] = stats
+        time.sleep(0.5)
+
+        memory = [memory_kb(pid) for pid in worker_pids(server.pid)]
+        first_requests = [stats['first_request_ms'] for stats in startups.values() if stats['first_request_ms']]
+        return {
+            'first_response': first_response * 1000,
+            'first_request': max(first_requests) if first_requests else 0,
+            'private': sum(item['private'] for item in memory) / len(memory) / 1024,
+            'pss': sum(item['pss'] for item in memory + [memory_kb(server.pid)]) / 1024
+        }
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+# =============================================================================
+
+def check(label: str, value: float, budget: float) -> bool:
+    ok = value <= budget
+    print(f"  {label:<40}{value:>8.0f} ms  (orçamento {budget} ms) {'✅' if ok else '❌'}")
+    return ok
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    ok = True
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = bot_env(directory)
+
+        stats, modules = profile_import(env)
+        print("📦 Import do app (processo novo)")
+        for phase, ms in stats['phases_ms'].items():
+            print(f"  {phase:<40}{ms:>8.1f} ms")
+        print("\n  bibliotecas mais lentas (-X importtime, com a sobrecarga da medição):")
+        for name, ms in modules[:TOP_IMPORTS]:
+            print(f"    {name:<38}{ms:>8.1f} ms")
+        print()
+        ok &= check('import', stats['import_ms'], BUDGET_MS['import'])
+
+        for preload in (False, True):
+            result = run_gunicorn(env, workers, preload)
+            print(f"\n🦄 gunicorn, {workers} workers, {'com' if preload else 'sem'} preload")
+            print(f"  {'do comando à primeira resposta':<40}{result['first_response']:>8.0f} ms")
+            print(f"  {'memória própria por worker':<40}{result['private']:>8.1f} MB")
+            print(f"  {'Pss total (master + workers)':<40}{result['pss']:>8.1f} MB")
+            budget = BUDGET_MS['first_request_preload' if preload else 'first_request']
+            ok &= check('primeiro request do worker (pior)', result['first_request'], budget)
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark dos templates
+Compara a renderização das mensagens compiladas (templates.py) com o
+caminho ingênuo: sortear o texto e chamar str.format a cada comentário
+
+Execute: python -m benchmarks.bench_templates [mensagens]
+"""
+
+import sys
+import time
+import random
+
+from templates import compile_campaign
+
+USERNAMES = [f"usuario_{n}" for n in range(1000)]
+
+# Campanha no formato do MONITORED_POSTS do app.py
+CAMPAIGN = {
+    'comment_replies': [
+        "Todos os itens foram enviados para sua DM, @{username}! Verifique se você está seguindo a página!🥰",
+        "Todos os itens foram enviados para sua caixa de mensagem, @{username}!🥰",
+        "Todos os itens foram enviados com sucesso, @{username}!✅ Siga a página pra receber outras promoções!!"
+    ],
+    'dm_message': """Oi {username}! Aqui estão os links do vídeo
+
+🔗 Tira pelos https://s.shopee.com.br/3AzWD7SD5l
+🔗 Vassoura 2 em 1 https://s.shopee.com.br/4VUtnbV7rT
+🔗 Limpa Piso https://s.shopee.com.br/50RAOYssiK
+🔗 Pano metálico https://s.shopee.com.br/2qMfoc93MJ
+
+Caso não consiga CLICAR algum link, copie e cole no bloco de notas do seu celular""",
+    'enabled': True
+}
+
+
+def per_message_us(func, count: int) -> float:
+    """Microssegundos por mensagem"""
+    names = USERNAMES
+    start = time.perf_counter()
+    for i in range(count):
+        func(names[i % len(names)])
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+    post_id, config = '18059820224230541', CAMPAIGN
+    compiled = compile_campaign(post_id, config)
+    tracked = compile_campaign(post_id, dict(config, tracking={'utm_source': 'instagram', 'utm_content': 'link{link}'}))
+    replies = config['comment_replies']
+    dm = config['dm_message']
+
+    def naive(username):
+        random.choice(replies).format(username=username)
+        dm.format(username=username)
+
+    def templates(username):
+        compiled['reply_templates'].render(username)
+        compiled['dm_templates'].render(username)
+
+    def templates_tracked(username):
+        tracked['reply_templates'].render(username)
+        tracked['dm_templates'].render(username)
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        compile_campaign(post_id, config)
+    compile_us = (time.perf_counter() - start) / 1000 * 1e6
+
+    print(f"📊 {count} comentários (resposta + DM de {len(dm)} caracteres)\n")
+    for label, func in (
+        ('str.format (ingênuo)', naive),
+        ('templates compilados', templates),
+        ('compilados + rastreamento', templates_tracked),
+    ):
+        print(f"{label:<28}{per_message_us(func, count):>8.2f} µs/comentário")
+    print(f"\n{'compilação da campanha':<28}{compile_us:>8.2f} µs (uma vez por carga)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+Benchmark dos gatilhos
+Tempo para decidir se um comentário deve ser respondido conforme o número
+de palavras-chave cresce: TriggerMatcher (uma passada no texto) contra
+testar cada palavra com `in`
+
+Execute: python -m benchmarks.bench_triggers [comentários]
+"""
+
+import sys
+import time
+
+from triggers import TriggerMatcher, normalize_text
+
+COMMENTS = [
+    'Lindo demais!! 😍',
+    'Quero o link por favor',
+    'Eu quero!!! Me manda no direct',
+    'Não quero nada, só vim ver',
+    'Onde compra esse escovão elétrico? Amei a vassoura 2 em 1 também',
+]
+
+
+def per_comment_us(func, count: int) -> float:
+    """Microssegundos por comentário"""
+    comments = COMMENTS
+    start = time.perf_counter()
+    for i in range(count):
+        func(comments[i % len(comments)])
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+
+    print(f"📊 {count} comentários\n")
+    print(f"{'palavras-chave':<16}{'TriggerMatcher':>16}{'in (cada uma)':>16}")
+    for rules in (5, 50, 500, 5000):
+        keywords = ['quero', 'link', 'eu'] + [f"produto{n}" for n in range(rules - 3)]
+        matcher = TriggerMatcher(keywords, exclude=['nao quero'])
+        normalized = [' ' + word for word in map(normalize_text, keywords)]
+
+        def naive(text):
+            text = ' ' + normalize_text(text)
+            return 'nao quero' not in text and any(word in text for word in normalized)
+
+        print(f"{rules:<16}{per_comment_us(matcher.matches, count):>13.2f} µs{per_comment_us(naive, count):>13.2f} µs")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark do processamento do corpo dos webhooks
+Compara o caminho original (request.json + log do payload inteiro)
+com o parser de comentários sobre os bytes, e confere que payloads fora
+do formato são ignorados sem exceção (o webhook responde 200, não 500)
+
+Execute: python -m benchmarks.bench_webhook_parse
+"""
+
+import json
+import time
+import logging
+
+from webhook_parser import iter_comment_changes, parse_comment_changes
+
+ENTRY_COUNTS = (1, 10, 100, 500)
+
+# Corpos com "comments" mas fora do formato do Meta: nenhum comentário
+MALFORMED = (
+    b'{"object":"instagram","entry":["comments"]}',
+    b'{"object":"instagram","entry":"comments"}',
+    b'{"object":"instagram","entry":[{"changes":"comments"}]}',
+    b'{"object":"instagram","entry":[{"changes":["comments", 1, null]}]}',
+    b'{"object":"instagram","entry":[{"changes":[{"field":"comments","value":"oops"}]}]}',
+    b'["comments"]',
+)
+
+
+def comment_change(i: int) -> dict:
+    return {
+        'field': 'comments',
+        'value': {
+            'id': f"17{i:015d}",
+            'text': 'quero o link! 😍',
+            'media': {'id': '18076117025230421', 'media_product_type': 'REELS'},
+            'from': {'id': f"63{i:015d}", 'username': f"usuario_{i}"}
+        }
+    }
+
+
+def other_change(i: int) -> dict:
+    return {
+        'field': 'story_insights',
+        'value': {
+            'media_id': f"18{i:015d}",
+            'impressions': 1000 + i,
+            'reach': 900 + i,
+            'taps_forward': 10,
+            'taps_back': 2,
+            'exits': 3,
+            'replies': 0
+        }
+    }
+
+
+def build_payload(entries: int, make_change) -> bytes:
+    """Payload no formato enviado pelo Meta (várias entradas em uma entrega)"""
+    return json.dumps({
+        'object': 'instagram',
+        'entry': [
+            {'id': '17841400000000000', 'time': 1700000000 + i, 'changes': [make_change(i)]}
+            for i in range(entries)
+        ]
+    }).encode('utf-8')
+
+
+def original(raw: bytes) -> int:
+    """request.json + f-string do payload (formatada mesmo sem handler) + iteração"""
+    data = json.loads(raw)
+    _ = f"📩 Webhook recebido: {data}"
+    return sum(1 for _ in iter_comment_changes(data))
+
+
+def fast_path(raw: bytes) -> int:
+    """Parser sobre os bytes + log do payload só em nível DEBUG"""
+    comments = parse_comment_changes(raw)
+    if logging.getLogger('app').isEnabledFor(logging.DEBUG):
+        _ = raw.decode('utf-8', 'replace')
+    return len(comments)
+
+
+def measure(func, raw: bytes) -> float:
+    """Tempo médio por entrega, em microssegundos"""
+    iterations = max(20, 20000 // max(1, len(raw) // 200))
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(raw)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+
+    print(f"{'tipo':<16}{'entradas':>10}{'bytes':>10}{'original (µs)':>16}{'parser (µs)':>14}")
+    print("-" * 66)
+    for label, make_change in (('comentários', comment_change), ('outros campos', other_change)):
+        for entries in ENTRY_COUNTS:
+            raw = build_payload(entries, make_change)
+            print(f"{label:<16}{entries:>10}{len(raw):>10}"
+                  f"{measure(original, raw):>16.1f}{measure(fast_path, raw):>14.1f}")
+
+    print()
+    for raw in MALFORMED:
+        comments = parse_comment_changes(raw)
+        assert comments == [], raw
+        print(f"✅ ignorado: {raw.decode()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,450 @@
+"""
+Graph API falsa para benchmarks
+Servidor HTTP/1.1 (keep-alive) em asyncio que imita os endpoints usados
+pelo bot, com latência configurável, headers de uso do rate limit e
+injeção de erros
+
+Execute sozinho: python -m benchmarks.fake_graph --port 8900 --latency 0.1
+    [--errors transient=0.01,drop=0.001] [--usage-capacity 6000]
+"""
+
+import json
+import time
+import random
+import asyncio
+import argparse
+import threading
+from collections import deque
+from urllib.parse import parse_qs, urlsplit
+
+# Erros que podem ser injetados: (status HTTP, objeto `error` da Graph API)
+# `drop` aplica a ação e fecha a conexão sem responder (resultado incerto)
+INJECTED_ERRORS = {
+    'transient': (500, {'message': 'An unexpected error has occurred', 'code': 2, 'is_transient': True}),
+    'throttle': (400, {'message': '(#4) Application request limit reached', 'code': 4}),
+    'permanent': (400, {'message': '(#100) Invalid parameter', 'code': 100}),
+    'drop': (None, None)
+}
+
+
+def parse_error_rates(value: str) -> dict:
+    """Converte "tipo=probabilidade,..." (ex: transient=0.01,drop=0.001)"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in (value or '').split(','))):
+        kind, _, rate = item.partition('=')
+        if kind not in INJECTED_ERRORS:
+            raise ValueError(f"Erro desconhecido: {kind} (use {', '.join(INJECTED_ERRORS)})")
+        rates[kind] = float(rate)
+    return rates
+
+
+class FakeGraphAPI:
+    """
+    Servidor falso da Graph API
+
+    Endpoints:
+        POST /{comment_id}/replies   -> {"id": ...}
+        GET  /{comment_id}/replies   -> respostas já publicadas no comentário
+        POST /{account_id}/messages  -> {"recipient_id": ..., "message_id": ...}
+        POST /  (batch=[...])        -> uma resposta por operação do batch
+        GET  /{media_id}/comments    -> comentários paginados (do mais novo ao mais antigo)
+        GET  /{account_id}/media     -> mídias paginadas, com ETag (304 se If-None-Match bater)
+        GET  /?ids=...               -> {id: {"id": ...}} para cada ID
+        GET  /...                    -> {"id": ...}
+
+    Com `capacity`, só esse número de requisições é atendido ao mesmo
+    tempo; as demais esperam na fila do servidor (a latência cresce com a
+    carga, como uma API sobrecarregada). Pode ser mudado com o servidor
+    rodando.
+
+    Cada resposta leva os headers X-App-Usage (e X-Business-Use-Case-Usage
+    em respostas e DMs) calculados sobre as chamadas dos últimos
+    `usage_window` segundos; acima de `usage_capacity` chamadas a API
+    responde com o erro de rate limit (código 4), como o Meta.
+
+    O horário de chegada da primeira resposta e da primeira DM de cada
+    comentário fica em `reply_times` e `message_times` (para medir a
+    latência de ponta a ponta).
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        host: str = '127.0.0.1',
+        port: int = 0,
+        comments_per_media: int = 0,
+        media_count: int = 0,
+        jitter: float = 0.0,
+        errors: dict = None,
+        usage_capacity: int = 0,
+        usage_window: float = 60.0,
+        account_id: str = 'account',
+        capacity: int = 0
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.host = host
+        self.port = port
+        self.comments_per_media = comments_per_media
+        self.media_count = media_count
+        self.errors = dict(errors or {})
+        self.usage_capacity = usage_capacity
+        self.usage_window = usage_window
+        self.account_id = account_id
+        self.capacity = capacity
+        self._busy = 0
+        self._slots = None
+        # Horário do comentário mais novo; os demais são 1 segundo mais antigos cada
+        self.newest_comment_time = int(time.time())
+        self.requests = 0
+        self.replies = 0
+        self.messages = 0
+        self.injected = {kind: 0 for kind in INJECTED_ERRORS}
+        self.reply_times = {}
+        self.message_times = {}
+        self._published = {}
+        self._calls = deque()
+        self._counter = 0
+        self._loop = None
+        self._server = None
+
+    def reset(self):
+        """Zera os contadores e os horários registrados (ex: depois do aquecimento)"""
+        self.requests = self.replies = self.messages = 0
+        self.injected = {kind: 0 for kind in INJECTED_ERRORS}
+        self.reply_times.clear()
+        self.message_times.clear()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    # -------------------------------------------------------------------------
+    # Rotas
+    # -------------------------------------------------------------------------
+
+    def route(self, method: str, path: str, query: str, body: bytes, headers: dict = None):
+        """Retorna (status, corpo, headers extras) para a requisição"""
+        self._counter += 1
+        parts = [part for part in path.split('/') if part]
+
+        if method == 'POST' and not parts:
+            return 200, self.batch(_decode_body(body).get('batch') or []), {}
+
+        if method == 'POST' and len(parts) >= 2 and parts[-1] == 'replies':
+            comment_id = parts[-2]
+            reply_id = f"reply_{self._counter}"
+            self.replies += 1
+            self.reply_times.setdefault(comment_id, time.time())
+            self._published.setdefault(comment_id, []).append({
+                'id': reply_id,
+                'text': _decode_body(body).get('message'),
+                'from': {'id': self.account_id}
+            })
+            return 200, {'id': reply_id}, {}
+
+        if method == 'GET' and len(parts) >= 2 and parts[-1] == 'replies':
+            return 200, {'data': self._published.get(parts[-2], [])}, {}
+
+        if method == 'POST' and parts and parts[-1] == 'messages':
+            recipient = _decode_body(body).get('recipient') or {}
+            if recipient.get('comment_id'):
+                self.message_times.setdefault(str(recipient['comment_id']), time.time())
+            self.messages += 1
+            return 200, {'recipient_id': 'user', 'message_id': f"mid_{self._counter}"}, {}
+
+        if method == 'GET' and len(parts) >= 2 and parts[-1] == 'comments':
+            return 200, self.comments_page(parts[-2], parse_qs(query)), {}
+
+        if method == 'GET' and len(parts) >= 2 and parts[-1] == 'media':
+            return self.media_page(parse_qs(query), (headers or {}).get('if-none-match'))
+
+        if method == 'GET' and not parts and 'ids=' in query:
+            ids = parse_qs(query)['ids'][0].split(',')
+            return 200, {media_id: {'id': media_id} for media_id in ids}, {}
+
+        if method == 'GET':
+            return 200, {'id': parts[-1] if parts else 'me'}, {}
+
+        return 404, {'error': {'message': 'Unknown path', 'code': 803}}, {}
+
+    def batch(self, operations: list) -> list:
+        """Executa as operações de uma requisição batch"""
+        results = []
+        for operation in operations:
+            url = urlsplit(operation.get('relative_url', ''))
+            status, payload, _ = self.route(
+                operation.get('method', 'GET'),
+                url.path,
+                url.query,
+                (operation.get('body') or '').encode('utf-8')
+            )
+            results.append({'code': status, 'headers': [], 'body': json.dumps(payload)})
+        return results
+
+    def comments_page(self, media_id: str, query: dict) -> dict:
+        """Uma página de comentários, no formato da Graph API (cursor = posição)"""
+        limit = int(query.get('limit', ['25'])[0])
+        start = int(query.get('after', ['0'])[0])
+        end = min(start + limit, self.comments_per_media)
+
+        data = [
+            {
+                'id': f"{media_id}_{i}",
+                'text': f"comentário {i}",
+                'username': f"usuario{i}",
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S+0000', time.gmtime(self.newest_comment_time - i)),
+                'from': {'id': f"user{i}", 'username': f"usuario{i}"}
+            }
+            for i in range(start, end)
+        ]
+
+        page = {'data': data}
+        if data:
+            page['paging'] = {'cursors': {'before': str(start), 'after': str(end)}}
+            if end < self.comments_per_media:
+                page['paging']['next'] = f"{self.url}/{media_id}/comments?after={end}&limit={limit}"
+        return page
+
+    def media_page(self, query: dict, etag: str = None):
+        """
+        Uma página de mídias, da mais nova (ID = media_count) para a mais antiga (ID = 1)
+        A primeira página leva um ETag que muda quando um post é publicado
+        """
+        current = f'"{self.media_count}"'
+        start = int(query.get('after', ['0'])[0])
+        if not start and etag == current:
+            return 304, None, {'ETag': current}
+
+        limit = int(query.get('limit', ['25'])[0])
+        end = min(start + limit, self.media_count)
+        data = [
+            {
+                'id': str(self.media_count - i),
+                'caption': f"Post {self.media_count - i} - promoção de vassoura 2 em 1 #{(self.media_count - i) % 7}",
+                'media_type': 'VIDEO',
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S+0000', time.gmtime(self.newest_comment_time - i * 3600)),
+                'permalink': f"https://www.instagram.com/p/{self.media_count - i}/"
+            }
+            for i in range(start, end)
+        ]
+
+        page = {'data': data}
+        if data:
+            page['paging'] = {'cursors': {'before': str(start), 'after': str(end)}}
+            if end < self.media_count:
+                page['paging']['next'] = f"{self.url}/{self.account_id}/media?after={end}&limit={limit}"
+        return 200, page, {} if start else {'ETag': current}
+
+    def usage_headers(self, parts: list) -> dict:
+        """Headers de uso do rate limit (percentual da capacidade na janela)"""
+        now = time.monotonic()
+        calls = self._calls
+        calls.append(now)
+        while calls and calls[0] < now - self.usage_window:
+            calls.popleft()
+
+        usage = min(100, round(len(calls) * 100 / self.usage_capacity)) if self.usage_capacity else 0
+        headers = {'X-App-Usage': json.dumps({'call_count': usage, 'total_time': usage // 2, 'total_cputime': usage // 2})}
+        if parts and parts[-1] in ('replies', 'messages'):
+            headers['X-Business-Use-Case-Usage'] = json.dumps({self.account_id: [{
+                'type': 'instagram',
+                'call_count': usage,
+                'total_time': usage // 2,
+                'total_cputime': usage // 2,
+                'estimated_time_to_regain_access': 0
+            }]})
+        return headers
+
+    def inject_error(self) -> str:
+        """Sorteia um dos erros configurados (None = resposta normal)"""
+        roll = random.random()
+        for kind, rate in self.errors.items():
+            if roll < rate:
+                self.injected[kind] += 1
+                return kind
+            roll -= rate
+        return None
+
+    def respond(self, method: str, path: str, query: str, body: bytes, request_headers: dict = None):
+        """Aplica rate limit e erros injetados antes da rota (None = derrubar a conexão)"""
+        parts = [part for part in path.split('/') if part]
+        headers = self.usage_headers(parts)
+
+        if self.usage_capacity and len(self._calls) > self.usage_capacity:
+            self.injected['throttle'] += 1
+            return 400, {'error': INJECTED_ERRORS['throttle'][1]}, headers
+
+        kind = self.inject_error()
+        if kind == 'drop':
+            # A ação é feita, mas o cliente nunca recebe a resposta
+            self.route(method, path, query, body, request_headers)
+            return None
+        if kind is not None:
+            status, error = INJECTED_ERRORS[kind]
+            return status, {'error': error}, headers
+
+        status, payload, extra_headers = self.route(method, path, query, body, request_headers)
+        headers.update(extra_headers)
+        return status, payload, headers
+
+    # -------------------------------------------------------------------------
+    # Servidor HTTP
+    # -------------------------------------------------------------------------
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode('latin-1').split(' ', 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length') or 0)
+                body = await reader.readexactly(length) if length else b''
+
+                self.requests += 1
+                delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0)
+                if self.capacity:
+                    await self._occupy(delay)
+                elif delay:
+                    await asyncio.sleep(delay)
+
+                url = urlsplit(target)
+                result = self.respond(method, url.path, url.query, body, headers)
+                if result is None:
+                    break
+                status, payload, extra_headers = result
+                # 304 Not Modified não tem corpo
+                data = json.dumps(payload).encode('utf-8') if status != 304 else b''
+
+                response = [f"HTTP/1.1 {status} {'OK' if status < 400 else 'Error'}",
+                            'Content-Type: application/json',
+                            f"Content-Length: {len(data)}"]
+                response += [f"{name}: {value}" for name, value in extra_headers.items()]
+                writer.write(('\r\n'.join(response) + '\r\n\r\n').encode('latin-1') + data)
+                await writer.drain()
+
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _occupy(self, delay: float):
+        """Espera uma das `capacity` vagas do servidor e a ocupa por `delay` segundos"""
+        async with self._slots:
+            await self._slots.wait_for(lambda: not self.capacity or self._busy < self.capacity)
+            self._busy += 1
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            async with self._slots:
+                self._busy -= 1
+                self._slots.notify_all()
+
+    async def serve(self):
+        """Inicia o servidor no loop atual"""
+        self._slots = asyncio.Condition()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, backlog=4096)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self._server
+
+    def stop(self):
+        """Encerra o servidor iniciado com start_in_thread"""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def start_in_thread(self) -> str:
+        """Roda o servidor em uma thread própria e retorna a URL base"""
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.serve())
+            ready.set()
+            self._loop.run_forever()
+
+        threading.Thread(target=run, name='fake-graph', daemon=True).start()
+        ready.wait()
+        return self.url
+
+
+def _decode_body(body: bytes) -> dict:
+    """Corpo JSON ou form-urlencoded da requisição ({} se vazio/inválido)"""
+    if not body:
+        return {}
+    try:
+        return json.loads(body)
+    except ValueError:
+        pass
+    # Form: valores complexos (ex: recipient, batch) vêm codificados em JSON
+    form = {}
+    for key, values in parse_qs(body.decode('utf-8', 'replace')).items():
+        try:
+            form[key] = json.loads(values[0])
+        except ValueError:
+            form[key] = values[0]
+    return form
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """Opções da Graph API falsa (compartilhadas com o benchmarks.load_test)"""
+    parser.add_argument('--latency', type=float, default=0.1, help='latência de cada resposta (segundos)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='latência extra aleatória, de 0 até este valor')
+    parser.add_argument('--comments', type=int, default=0, help='comentários em cada post (paginados)')
+    parser.add_argument('--account-media', type=int, default=0, help='posts da conta (paginados)')
+    parser.add_argument('--errors', type=parse_error_rates, default={},
+                        help=f"erros injetados, ex: transient=0.01,drop=0.001 ({', '.join(INJECTED_ERRORS)})")
+    parser.add_argument('--usage-capacity', type=int, default=0,
+                        help='chamadas por janela que correspondem a 100%% de uso (0 = sem limite)')
+    parser.add_argument('--usage-window', type=float, default=60.0, help='janela do uso (segundos)')
+    parser.add_argument('--capacity', type=int, default=0,
+                        help='requisições atendidas ao mesmo tempo (as demais esperam; 0 = sem limite)')
+
+
+def from_arguments(args, host: str = '127.0.0.1', port: int = 0, account_id: str = 'account') -> FakeGraphAPI:
+    return FakeGraphAPI(
+        latency=args.latency,
+        host=host,
+        port=port,
+        comments_per_media=args.comments,
+        media_count=args.account_media,
+        jitter=args.jitter,
+        errors=args.errors,
+        usage_capacity=args.usage_capacity,
+        usage_window=args.usage_window,
+        account_id=account_id,
+        capacity=args.capacity
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Graph API falsa para benchmarks')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--account-id', default='account', help='ID da conta (autor das respostas publicadas)')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server = from_arguments(args, host=args.host, port=args.port, account_id=args.account_id)
+    print(f"🧪 Graph API falsa em {server.url} (latência {args.latency}s)")
+    server.start_in_thread()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
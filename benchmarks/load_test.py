@@ -0,0 +1,261 @@
+"""
+Teste de carga de ponta a ponta
+Sobe a Graph API falsa, roda o app.py no gunicorn apontando para ela e
+envia webhooks assinados a uma taxa fixa. Mede:
+
+- latência do ack (envio do webhook até o `200`), p50/p99
+- latência de ponta a ponta (webhook até a resposta chegar na Graph API), p50/p99
+- comentários respondidos por segundo, sustentados
+
+Com --output o resultado é salvo em JSON; com --baseline ele é comparado a
+um resultado anterior e o comando sai com erro se piorar além da tolerância.
+
+Execute: python -m benchmarks.load_test --rate 50 --duration 20 --workers 2
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import asyncio
+import argparse
+import tempfile
+import subprocess
+import urllib.request
+
+from benchmarks import fake_graph, webhook_traffic
+from benchmarks.fake_graph import FakeGraphAPI
+from benchmarks.webhook_traffic import WebhookTraffic, percentile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ACCOUNT_ID = 'load-test-account'
+
+# Métricas comparadas com o baseline: (chave, maior é melhor)
+COMPARED = (
+    ('ack_p99_ms', False),
+    ('e2e_p99_ms', False),
+    ('comments_per_sec', True)
+)
+
+
+def server_env(args, graph_url: str, directory: str) -> dict:
+    """Variáveis de ambiente do app sob teste"""
+    env = dict(os.environ)
+    env.update({
+        'GRAPH_API_URL': graph_url,
+        'APP_SECRET': args.secret,
+        'ACCESS_TOKEN': 'load-test-token',
+        'INSTAGRAM_ACCOUNT_ID': ACCOUNT_ID,
+        'QUEUE_WORKERS': str(args.queue_workers),
+        'QUEUE_MAX_SIZE': str(args.queue_max_size),
+        'HTTP_POOL_SIZE': str(max(10, args.queue_workers)),
+        'GRAPH_BATCH_SIZE': str(args.batch_size),
+        'OUTBOX_FILE': os.path.join(directory, 'outbox.db') if args.outbox else '',
+        'DM_SUPPRESSION_FILE': os.path.join(directory, 'dm_suppression.bin'),
+        'MONITORED_POSTS_FILE': os.path.join(directory, 'monitored_posts.json'),
+        'METRICS_DIR': os.path.join(directory, 'metrics'),
+        'LOG_LEVEL': args.log_level,
+        'PRELOAD_APP': 'true' if args.preload else 'false',
+        'PYTHONUNBUFFERED': '1'
+    })
+    if not args.rate_limits:
+        # Sem rate limit local: medimos a capacidade do bot, não o limite do Meta
+        env['RATE_REPLIES_PER_SEC'] = '1000000'
+        env['RATE_MESSAGES_PER_SEC'] = '1000000'
+    return env
+
+
+def start_server(args, env: dict, log_file) -> subprocess.Popen:
+    """Inicia o gunicorn com o app (ou a versão ASGI)"""
+    command = [
+        sys.executable, '-m', 'gunicorn',
+        'asgi_app:app' if args.asgi else 'app:app',
+        '-c', os.path.join(ROOT, 'gunicorn.conf.py'),
+        '-w', str(args.workers),
+        '-b', f"127.0.0.1:{args.port}"
+    ]
+    if args.asgi:
+        command += ['-k', 'uvicorn.workers.UvicornWorker']
+    elif args.threads > 1:
+        command += ['-k', 'gthread', '--threads', str(args.threads)]
+    return subprocess.Popen(command, cwd=ROOT, env=env, stdout=log_file, stderr=subprocess.STDOUT)
+
+
+def wait_ready(url: str, process: subprocess.Popen, timeout: float = 30):
+    """Espera o app responder na rota /"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn saiu com código {process.returncode}")
+        try:
+            with urllib.request.urlopen(url + '/', timeout=2) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"o app não respondeu em {timeout}s")
+
+
+def stop_server(process: subprocess.Popen, timeout: float = 40):
+    """Encerra o gunicorn (drenando a fila) e espera sair"""
+    if process.poll() is not None:
+        return
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def wait_replies(graph: FakeGraphAPI, comment_ids: list, timeout: float) -> bool:
+    """Espera a resposta de todos os comentários aceitos chegar na Graph API falsa"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if all(comment_id in graph.reply_times for comment_id in comment_ids):
+            return True
+        time.sleep(0.1)
+    return False
+
+
+def measure(args) -> dict:
+    """Executa um teste de carga e retorna o resumo"""
+    graph = fake_graph.from_arguments(args, account_id=ACCOUNT_ID)
+    graph_url = graph.start_in_thread()
+    app_url = f"http://127.0.0.1:{args.port}"
+
+    with tempfile.TemporaryDirectory(prefix='igbot-load-') as directory:
+        log_path = os.path.join(directory, 'server.log')
+        with open(log_path, 'w') as log_file:
+            process = start_server(args, server_env(args, graph_url, directory), log_file)
+            try:
+                wait_ready(app_url, process)
+                if args.warmup:
+                    asyncio.run(WebhookTraffic(app_url, args.secret, args.rate, args.warmup,
+                                               connections=args.connections, account_id=ACCOUNT_ID).run())
+                graph.reset()
+
+                traffic = WebhookTraffic(
+                    app_url,
+                    args.secret,
+                    args.rate,
+                    args.duration,
+                    connections=args.connections,
+                    comments_per_delivery=args.comments_per_delivery,
+                    media_ids=args.media,
+                    account_id=ACCOUNT_ID,
+                    poisson=args.poisson
+                )
+                asyncio.run(traffic.run())
+
+                accepted = [d for d in traffic.deliveries if d.status == 200]
+                comment_ids = [comment_id for d in accepted for comment_id in d.comment_ids]
+                complete = wait_replies(graph, comment_ids, args.settle)
+            finally:
+                stop_server(process)
+
+        if args.show_log:
+            with open(log_path) as f:
+                sys.stdout.write(f.read())
+
+    graph.stop()
+
+    summary = traffic.summary()
+    first_sent = traffic.deliveries[0].scheduled_at if traffic.deliveries else 0
+    e2e = []
+    dm_e2e = []
+    last_reply = first_sent
+    for delivery in accepted:
+        for comment_id in delivery.comment_ids:
+            replied_at = graph.reply_times.get(comment_id)
+            if replied_at is not None:
+                e2e.append(replied_at - delivery.scheduled_at)
+                last_reply = max(last_reply, replied_at)
+            sent_at = graph.message_times.get(comment_id)
+            if sent_at is not None:
+                dm_e2e.append(sent_at - delivery.scheduled_at)
+
+    elapsed = last_reply - first_sent
+    summary.update({
+        'offered_per_sec': args.rate * args.comments_per_delivery,
+        'replied': len(e2e),
+        'unreplied': len(comment_ids) - len(e2e),
+        'all_replied': complete,
+        'e2e_p50_ms': _ms(percentile(e2e, 50)),
+        'e2e_p99_ms': _ms(percentile(e2e, 99)),
+        'dm_e2e_p99_ms': _ms(percentile(dm_e2e, 99)),
+        'comments_per_sec': round(len(e2e) / elapsed, 1) if elapsed > 0 else 0.0,
+        'graph_requests': graph.requests,
+        'injected_errors': {kind: count for kind, count in graph.injected.items() if count}
+    })
+    return summary
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list:
+    """Métricas que pioraram mais que `tolerance` (fração) em relação ao baseline"""
+    regressions = []
+    for key, higher_is_better in COMPARED:
+        old, new = baseline.get(key), result.get(key)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        worse = -change if higher_is_better else change
+        if worse > tolerance:
+            regressions.append(f"{key}: {old} -> {new} ({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Teste de carga do app contra uma Graph API falsa')
+    webhook_traffic.add_arguments(parser)
+    fake_graph.add_arguments(parser)
+    parser.set_defaults(latency=0.05)
+    parser.add_argument('--secret', default=os.getenv('APP_SECRET') or 'load-test-secret', help='APP_SECRET do app')
+    parser.add_argument('--port', type=int, default=5055, help='porta do gunicorn')
+    parser.add_argument('--workers', type=int, default=2, help='workers do gunicorn')
+    parser.add_argument('--threads', type=int, default=1, help='threads por worker (gthread)')
+    parser.add_argument('--asgi', action='store_true', help='testar o asgi_app (UvicornWorker)')
+    parser.add_argument('--preload', action='store_true', help='importar o app uma vez no master (PRELOAD_APP)')
+    parser.add_argument('--queue-workers', type=int, default=16, help='QUEUE_WORKERS do app')
+    parser.add_argument('--queue-max-size', type=int, default=10000, help='QUEUE_MAX_SIZE do app')
+    parser.add_argument('--batch-size', type=int, default=0, help='GRAPH_BATCH_SIZE do app')
+    parser.add_argument('--no-outbox', dest='outbox', action='store_false', help='desativa o outbox')
+    parser.add_argument('--rate-limits', action='store_true', help='manter o rate limit local padrão do app')
+    parser.add_argument('--log-level', default='WARNING', help='LOG_LEVEL do app')
+    parser.add_argument('--warmup', type=float, default=2, help='segundos de carga antes da medição')
+    parser.add_argument('--settle', type=float, default=60, help='espera máxima pelas respostas após a carga')
+    parser.add_argument('--show-log', action='store_true', help='mostrar o log do gunicorn no final')
+    parser.add_argument('--output', help='salvar o resultado em JSON')
+    parser.add_argument('--baseline', help='resultado anterior (JSON) para comparar')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='piora aceita em relação ao baseline (fração)')
+    args = parser.parse_args()
+
+    print(f"🚦 {args.rate:g} entregas/s x {args.comments_per_delivery} comentários por {args.duration:g}s "
+          f"({'asgi_app' if args.asgi else 'app'}, {args.workers} workers, latência da API {args.latency}s)")
+    result = measure(args)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        if regressions:
+            print("\n❌ Regressões em relação ao baseline:")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print("\n✅ Dentro da tolerância do baseline")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,253 @@
+"""
+Gerador de tráfego de webhooks
+Envia entregas de comentários assinadas com o APP_SECRET (como o Meta) a uma
+taxa fixa, sem esperar as respostas anteriores (carga aberta), e mede a
+latência até o `200` de cada entrega
+
+Execute: python -m benchmarks.webhook_traffic --url http://127.0.0.1:5000 --rate 100 --duration 10
+"""
+
+import os
+import hmac
+import json
+import math
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+from typing import List, Optional
+from urllib.parse import urlsplit
+
+# Post configurado no MONITORED_POSTS do app.py
+DEFAULT_MEDIA_ID = '18076117025230421'
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """Percentil pelo método nearest-rank (None sem valores)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+class Delivery:
+    """Uma entrega de webhook e o seu resultado"""
+
+    __slots__ = ('comment_ids', 'scheduled_at', 'status', 'ack_latency')
+
+    def __init__(self, comment_ids: List[str], scheduled_at: float):
+        self.comment_ids = comment_ids
+        self.scheduled_at = scheduled_at
+        self.status = None
+        self.ack_latency = None
+
+
+class WebhookTraffic:
+    """
+    Carga aberta de webhooks assinados
+
+    A entrega `i` é agendada para `início + i / rate` (ou com intervalos
+    exponenciais, em `poisson`). A latência é medida a partir do horário
+    agendado, não do envio: se o servidor atrasar, a espera por uma conexão
+    livre também conta (sem "coordinated omission").
+    """
+
+    def __init__(
+        self,
+        url: str,
+        app_secret: str,
+        rate: float,
+        duration: float,
+        connections: int = 64,
+        comments_per_delivery: int = 1,
+        media_ids: List[str] = (DEFAULT_MEDIA_ID,),
+        account_id: str = 'account',
+        poisson: bool = False,
+        timeout: float = 30.0
+    ):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.path = (parts.path.rstrip('/') or '') + '/webhook'
+        self.secret = app_secret.encode('utf-8')
+        self.rate = rate
+        self.duration = duration
+        self.connections = connections
+        self.comments_per_delivery = comments_per_delivery
+        self.media_ids = list(media_ids)
+        self.account_id = account_id
+        self.poisson = poisson
+        self.timeout = timeout
+        # Prefixo único por execução: os IDs nunca colidem com o dedup/outbox
+        self.run_id = os.urandom(3).hex()
+
+        self.deliveries: List[Delivery] = []
+        self.errors = 0
+        self._idle = []
+        self._slots = None
+
+    # -------------------------------------------------------------------------
+    # Payloads
+    # -------------------------------------------------------------------------
+
+    def delivery(self, index: int, scheduled_at: float) -> Delivery:
+        """Cria a entrega `index` (o corpo é montado no envio)"""
+        comment_ids = [f"{self.run_id}_{index}_{n}" for n in range(self.comments_per_delivery)]
+        return Delivery(comment_ids, scheduled_at)
+
+    def body(self, delivery: Delivery) -> bytes:
+        changes = [
+            {
+                'field': 'comments',
+                'value': {
+                    'id': comment_id,
+                    'text': 'quero os links',
+                    'media': {'id': self.media_ids[n % len(self.media_ids)]},
+                    # Uma pessoa por comentário: o índice de DMs não interfere
+                    'from': {'id': f"u{comment_id}", 'username': f"carga_{comment_id}"}
+                }
+            }
+            for n, comment_id in enumerate(delivery.comment_ids)
+        ]
+        return json.dumps({
+            'object': 'instagram',
+            'entry': [{'id': self.account_id, 'time': int(time.time()), 'changes': changes}]
+        }).encode('utf-8')
+
+    def sign(self, body: bytes) -> str:
+        return 'sha256=' + hmac.new(self.secret, body, hashlib.sha256).hexdigest()
+
+    # -------------------------------------------------------------------------
+    # Cliente HTTP/1.1 (keep-alive quando o servidor permite)
+    # -------------------------------------------------------------------------
+
+    async def _post(self, body: bytes) -> int:
+        async with self._slots:
+            if self._idle:
+                connection = self._idle.pop()
+            else:
+                connection = await asyncio.open_connection(self.host, self.port)
+            return await self._exchange(connection, body)
+
+    async def _exchange(self, connection, body: bytes) -> int:
+        reader, writer = connection
+        reusable = False
+        try:
+            head = (
+                f"POST {self.path} HTTP/1.1\r\n"
+                f"Host: {self.host}:{self.port}\r\n"
+                "Content-Type: application/json\r\n"
+                f"X-Hub-Signature-256: {self.sign(body)}\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n"
+            )
+            writer.write(head.encode('latin-1') + body)
+            await writer.drain()
+
+            status = int((await reader.readline()).split()[1])
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            await reader.readexactly(int(headers.get('content-length') or 0))
+            reusable = headers.get('connection', '').lower() != 'close'
+            return status
+        finally:
+            if reusable:
+                self._idle.append(connection)
+            else:
+                writer.close()
+
+    async def _send(self, delivery: Delivery):
+        try:
+            delivery.status = await asyncio.wait_for(self._post(self.body(delivery)), self.timeout)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, IndexError):
+            self.errors += 1
+        delivery.ack_latency = time.time() - delivery.scheduled_at
+
+    async def run(self) -> List[Delivery]:
+        """Envia todas as entregas e espera as respostas"""
+        self._slots = asyncio.Semaphore(self.connections)
+        total = int(self.rate * self.duration)
+        tasks = []
+        start = time.time()
+        next_at = start
+
+        for index in range(total):
+            delay = next_at - time.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            delivery = self.delivery(index, next_at)
+            self.deliveries.append(delivery)
+            tasks.append(asyncio.ensure_future(self._send(delivery)))
+            next_at += random.expovariate(self.rate) if self.poisson else 1 / self.rate
+
+        await asyncio.gather(*tasks)
+        while self._idle:
+            self._idle.pop()[1].close()
+        return self.deliveries
+
+    # -------------------------------------------------------------------------
+    # Resumo
+    # -------------------------------------------------------------------------
+
+    def summary(self) -> dict:
+        """Contagem por status e percentis da latência até o ack"""
+        statuses = {}
+        for delivery in self.deliveries:
+            key = str(delivery.status or 'erro')
+            statuses[key] = statuses.get(key, 0) + 1
+        acked = [d.ack_latency for d in self.deliveries if d.status == 200]
+        return {
+            'deliveries': len(self.deliveries),
+            'comments': len(self.deliveries) * self.comments_per_delivery,
+            'statuses': statuses,
+            'ack_p50_ms': _ms(percentile(acked, 50)),
+            'ack_p99_ms': _ms(percentile(acked, 99)),
+            'ack_max_ms': _ms(max(acked) if acked else None)
+        }
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """Opções do tráfego (compartilhadas com o benchmarks.load_test)"""
+    parser.add_argument('--rate', type=float, default=50, help='entregas de webhook por segundo')
+    parser.add_argument('--duration', type=float, default=10, help='duração da carga (segundos)')
+    parser.add_argument('--connections', type=int, default=64, help='conexões simultâneas com o app')
+    parser.add_argument('--comments-per-delivery', type=int, default=1, help='comentários em cada entrega')
+    parser.add_argument('--media', nargs='*', default=[DEFAULT_MEDIA_ID], help='IDs dos posts comentados')
+    parser.add_argument('--poisson', action='store_true', help='intervalos exponenciais em vez de fixos')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Envia webhooks de comentário assinados a uma taxa fixa')
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='URL base do app')
+    parser.add_argument('--secret', default=os.getenv('APP_SECRET', ''), help='APP_SECRET usado na assinatura')
+    parser.add_argument('--account-id', default=os.getenv('INSTAGRAM_ACCOUNT_ID', 'account'))
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    traffic = WebhookTraffic(
+        args.url,
+        args.secret,
+        args.rate,
+        args.duration,
+        connections=args.connections,
+        comments_per_delivery=args.comments_per_delivery,
+        media_ids=args.media,
+        account_id=args.account_id,
+        poisson=args.poisson
+    )
+    print(f"📨 {args.rate:g} entregas/s por {args.duration:g}s para {args.url}")
+    asyncio.run(traffic.run())
+    print(json.dumps(traffic.summary(), indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+"""
+Importação e exportação de campanhas em massa (CSV ou JSONL)
+Usado pelos subcomandos `import` e `export` do manage_posts.py.
+
+Os arquivos são lidos e escritos em streaming, uma campanha por linha:
+- JSONL: um objeto por linha, `{"post_id": "...", ...campos da campanha}`
+- CSV: colunas de CSV_FIELDS (só `post_id` é obrigatória); colunas de
+  lista (`keywords`, `patterns`, ...) separam os itens com `|` ou trazem
+  uma lista JSON (`["a", "b"]`), e `tracking` traz um objeto JSON
+"""
+
+import csv
+import json
+from typing import Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from templates import ROTATIONS
+
+# Formatos aceitos
+FORMATS = ('csv', 'jsonl')
+
+# Colunas do CSV, na ordem da exportação
+CSV_FIELDS = (
+    'post_id', 'enabled', 'comment_reply', 'comment_replies', 'dm_message',
+    'keywords', 'patterns', 'exclude', 'rotation', 'tracking'
+)
+
+# Campos de texto, de lista de textos e de objeto de uma campanha
+TEXT_FIELDS = ('comment_reply', 'dm_message', 'rotation')
+LIST_FIELDS = ('comment_replies', 'keywords', 'patterns', 'exclude')
+DICT_FIELDS = ('tracking',)
+
+# Separador dos itens das colunas de lista no CSV
+LIST_SEPARATOR = '|'
+
+# Valores aceitos na coluna `enabled`
+TRUE_VALUES = {'1', 'true', 'sim', 's', 'yes', 'y', 'on'}
+FALSE_VALUES = {'0', 'false', 'nao', 'não', 'n', 'no', 'off'}
+
+
+class CampaignError(ValueError):
+    """Linha inválida do arquivo importado"""
+
+    def __init__(self, line: int, message: str):
+        super().__init__(f"linha {line}: {message}")
+        self.line = line
+
+
+def detect_format(path: str, default: str = 'jsonl') -> str:
+    """Formato pela extensão do arquivo (`-` = stdin/stdout usa o padrão)"""
+    lowered = (path or '').lower()
+    if lowered.endswith('.csv'):
+        return 'csv'
+    if lowered.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    return default
+
+
+# =============================================================================
+# VALIDAÇÃO
+# =============================================================================
+
+def validate_campaign(post_id, settings: dict) -> Tuple[str, dict]:
+    """
+    Confere os tipos de uma campanha importada
+
+    Returns:
+        (post_id, campanha) com `comment_reply`, `dm_message` e `enabled`
+        sempre presentes (como o menu grava)
+
+    Raises:
+        ValueError: com a descrição do problema
+    """
+    post_id = str(post_id if post_id is not None else '').strip()
+    if not post_id.isdigit():
+        raise ValueError(f"post_id inválido: {post_id!r}")
+
+    campaign = {'comment_reply': None, 'dm_message': None, 'enabled': True}
+    for field, value in settings.items():
+        if value is None or value == '' or value == []:
+            continue
+        if field in TEXT_FIELDS:
+            if not isinstance(value, str):
+                raise ValueError(f"{field} deve ser texto")
+        elif field in LIST_FIELDS:
+            if isinstance(value, str):
+                value = [value]
+            if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+                raise ValueError(f"{field} deve ser uma lista de textos")
+        elif field in DICT_FIELDS:
+            if not isinstance(value, dict):
+                raise ValueError(f"{field} deve ser um objeto")
+        elif field == 'enabled':
+            if not isinstance(value, bool):
+                raise ValueError("enabled deve ser true ou false")
+        campaign[field] = value
+
+    if campaign.get('rotation') and campaign['rotation'] not in ROTATIONS:
+        raise ValueError(f"rotation deve ser {', '.join(ROTATIONS)}")
+    return post_id, campaign
+
+
+# =============================================================================
+# LEITURA
+# =============================================================================
+
+def _parse_list(value: str) -> List[str]:
+    value = value.strip()
+    if value.startswith('['):
+        return json.loads(value)
+    return [item.strip() for item in value.split(LIST_SEPARATOR) if item.strip()]
+
+
+def _parse_bool(value: str) -> bool:
+    lowered = value.strip().lower()
+    if lowered in TRUE_VALUES:
+        return True
+    if lowered in FALSE_VALUES:
+        return False
+    raise ValueError(f"enabled inválido: {value!r}")
+
+
+def _csv_rows(stream: TextIO) -> Iterator[Tuple[int, str, dict]]:
+    reader = csv.DictReader(stream)
+    if not reader.fieldnames or 'post_id' not in reader.fieldnames:
+        raise CampaignError(1, "o CSV precisa da coluna post_id")
+    for row in reader:
+        line = reader.line_num
+        settings = {}
+        try:
+            for field, value in row.items():
+                if field == 'post_id' or field is None or not value:
+                    continue
+                if field in LIST_FIELDS:
+                    settings[field] = _parse_list(value)
+                elif field in DICT_FIELDS:
+                    settings[field] = json.loads(value)
+                elif field == 'enabled':
+                    settings[field] = _parse_bool(value)
+                else:
+                    settings[field] = value
+        except ValueError as e:
+            yield line, row.get('post_id'), e
+            continue
+        yield line, row.get('post_id'), settings
+
+
+def _jsonl_rows(stream: TextIO) -> Iterator[Tuple[int, str, dict]]:
+    for line, text in enumerate(stream, 1):
+        if not text.strip():
+            continue
+        try:
+            settings = json.loads(text)
+        except ValueError as e:
+            yield line, None, ValueError(f"JSON inválido ({e})")
+            continue
+        if not isinstance(settings, dict):
+            yield line, None, ValueError("cada linha deve ser um objeto JSON")
+            continue
+        yield line, settings.pop('post_id', None), settings
+
+
+def read_campaigns(stream: TextIO, fmt: str, errors: Optional[list] = None) -> Iterator[Tuple[str, dict]]:
+    """
+    Lê as campanhas de um arquivo, uma linha por vez
+
+    Args:
+        stream: Arquivo aberto (ou sys.stdin)
+        fmt: 'csv' ou 'jsonl'
+        errors: Se informado, linhas inválidas são registradas aqui
+            (CampaignError) e puladas; senão a primeira interrompe a leitura
+
+    Yields:
+        (post_id, campanha) já validadas
+    """
+    rows = _csv_rows(stream) if fmt == 'csv' else _jsonl_rows(stream)
+    for line, post_id, settings in rows:
+        try:
+            if isinstance(settings, Exception):
+                raise settings
+            yield validate_campaign(post_id, settings)
+        except ValueError as e:
+            error = CampaignError(line, str(e))
+            if errors is None:
+                raise error from None
+            errors.append(error)
+
+
+# =============================================================================
+# ESCRITA
+# =============================================================================
+
+def _format_list(items: List[str]) -> str:
+    if any(LIST_SEPARATOR in item for item in items) or (items and items[0].lstrip().startswith('[')):
+        return json.dumps(items, ensure_ascii=False)
+    return LIST_SEPARATOR.join(items)
+
+
+def write_campaigns(campaigns: Iterable[Tuple[str, dict]], stream: TextIO, fmt: str) -> Tuple[int, set]:
+    """
+    Grava as campanhas, uma linha por vez
+
+    Returns:
+        (campanhas gravadas, campos que não cabem no CSV e ficaram de fora)
+    """
+    written, dropped = 0, set()
+
+    if fmt == 'csv':
+        writer = csv.writer(stream, lineterminator='\n')
+        writer.writerow(CSV_FIELDS)
+        for post_id, settings in campaigns:
+            row = [post_id]
+            for field in CSV_FIELDS[1:]:
+                value = settings.get(field)
+                if value is None:
+                    row.append('')
+                elif field in LIST_FIELDS:
+                    row.append(_format_list([value] if isinstance(value, str) else value))
+                elif field in DICT_FIELDS:
+                    row.append(json.dumps(value, ensure_ascii=False))
+                elif field == 'enabled':
+                    row.append('true' if value else 'false')
+                else:
+                    row.append(value)
+            writer.writerow(row)
+            dropped.update(settings.keys() - CSV_FIELDS)
+            written += 1
+        return written, dropped
+
+    encode = json.JSONEncoder(ensure_ascii=False).encode
+    for post_id, settings in campaigns:
+        stream.write(encode({'post_id': post_id, **settings}) + '\n')
+        written += 1
+    return written, dropped
@@ -0,0 +1,178 @@
+"""
+Campanhas - Configuração dos posts monitorados
+Carrega o monitored_posts.json (gerado pelo manage_posts.py) e recarrega
+automaticamente quando o arquivo muda, sem reiniciar o servidor
+"""
+
+import os
+import json
+import time
+import logging
+import tempfile
+import threading
+from typing import Optional
+
+from post_index import PostIndex
+from templates import compile_campaign
+from triggers import compile_trigger
+
+logger = logging.getLogger(__name__)
+
+# Arquivo padrão com as configurações dos posts
+CONFIG_FILE = 'monitored_posts.json'
+
+
+def normalize_campaign(settings: dict) -> dict:
+    """
+    Converte o formato do monitored_posts.json para o formato usado pelo app
+
+    O manage_posts.py grava uma única resposta em `comment_reply`;
+    o app usa a lista `comment_replies` (uma é escolhida aleatoriamente).
+    """
+    campaign = dict(settings)
+    if 'comment_replies' not in campaign:
+        reply = campaign.get('comment_reply')
+        campaign['comment_replies'] = [reply] if reply else None
+    campaign.setdefault('dm_message', None)
+    campaign.setdefault('enabled', True)
+    return campaign
+
+
+def prepare_campaign(post_id: str, settings: dict) -> dict:
+    """Normaliza a campanha e compila as mensagens e os gatilhos"""
+    campaign = compile_campaign(post_id, normalize_campaign(settings))
+    campaign['trigger'] = compile_trigger(campaign)
+    return campaign
+
+
+def load_campaign_file(path: str = CONFIG_FILE) -> dict:
+    """Carrega as campanhas de um arquivo JSON ({} se não existir)"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_campaign_file(campaigns: dict, path: str = CONFIG_FILE, indent: Optional[int] = 2):
+    """
+    Salva as campanhas de forma atômica (arquivo temporário + rename)
+    Quem estiver lendo o arquivo nunca vê uma versão pela metade
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.monitored_posts.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            # json.dumps de uma vez: sem indentação usa o encoder em C
+            f.write(json.dumps(campaigns, indent=indent, ensure_ascii=False))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class CampaignStore:
+    """
+    Campanhas do app com recarga automática
+
+    Combina os posts definidos no código (`base`) com os do arquivo JSON.
+    Uma thread em background verifica o mtime do arquivo e, quando ele
+    muda, compila um novo PostIndex (e as mensagens e gatilhos de cada
+    campanha) e o troca de uma vez. As consultas apenas leem o índice atual, sem lock.
+
+    Com `watch=False` não há thread própria: quem criou o store chama
+    reload() (ex: o AccountRegistry verifica os arquivos de todas as contas
+    em uma única thread).
+    """
+
+    def __init__(self, path: str = CONFIG_FILE, base: dict = None, check_interval: float = 2.0, watch: bool = True):
+        self.path = path
+        self.base = {
+            str(post_id): prepare_campaign(str(post_id), config)
+            for post_id, config in (base or {}).items()
+        }
+        self.check_interval = check_interval
+        self.watch = watch
+
+        self.reloads = 0
+        self._signature = None
+        self._reload_lock = threading.Lock()
+        self._watcher_pid = None
+
+        self.index = PostIndex(self.base)
+        self.reload()
+
+    def _file_signature(self) -> Optional[tuple]:
+        """Identifica a versão do arquivo (mtime + tamanho)"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Recarrega o arquivo se ele mudou
+
+        Returns:
+            True se um novo índice foi carregado
+        """
+        with self._reload_lock:
+            signature = self._file_signature()
+            if signature == self._signature and not force:
+                return False
+
+            # Arquivo ilegível ou campanha fora do formato: nada é trocado
+            try:
+                file_campaigns = load_campaign_file(self.path) if signature else {}
+                campaigns = dict(self.base)
+                for post_id, settings in file_campaigns.items():
+                    campaigns[str(post_id)] = prepare_campaign(str(post_id), settings)
+                index = PostIndex(campaigns)
+            except (OSError, ValueError, TypeError, AttributeError) as e:
+                logger.error(f"❌ Erro ao carregar {self.path}: {e} - mantendo configuração atual")
+                self._signature = signature
+                return False
+
+            # Troca atômica: consultas em andamento continuam no índice antigo
+            self.index = index
+            self._signature = signature
+            self.reloads += 1
+
+            if signature:
+                logger.info(f"🔄 {len(file_campaigns)} campanhas carregadas de {self.path} ({len(campaigns)} no total)")
+            return True
+
+    def _ensure_watching(self):
+        """Inicia a thread de verificação no processo atual (uma vez por PID)"""
+        pid = os.getpid()
+        if self._watcher_pid == pid:
+            return
+        with self._reload_lock:
+            if self._watcher_pid == pid:
+                return
+            threading.Thread(target=self._watch, name='campaign-watcher', daemon=True).start()
+            self._watcher_pid = pid
+
+    def _watch(self):
+        while True:
+            time.sleep(self.check_interval)
+            try:
+                self.reload()
+            except Exception as e:
+                logger.error(f"Erro ao recarregar campanhas: {e}")
+
+    def lookup(self, post_id: str) -> Optional[dict]:
+        """Configuração do post (ou None se não monitorado)"""
+        if self.watch:
+            self._ensure_watching()
+        return self.index.lookup(post_id)
+
+    def items(self):
+        """Pares (post_id, configuração) de todas as campanhas atuais"""
+        return self.index.items()
+
+    def __len__(self):
+        return len(self.index)
@@ -0,0 +1,197 @@
+"""
+Deduplicação de Webhooks - Evita processar o mesmo comentário duas vezes
+O Meta reenvia o webhook quando a confirmação demora, então cada
+comment_id é lembrado por um tempo (TTL) antes de chamar a Graph API
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBackend:
+    """
+    Backend em memória (por processo) com TTL e descarte LRU
+    """
+
+    def __init__(self, max_size: int = 100000):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, key: str, ttl: float) -> bool:
+        """Registra a chave; retorna False se ela já existia (e não expirou)"""
+        now = time.monotonic()
+        with self._lock:
+            expires = self._entries.get(key)
+            if expires is not None and expires > now:
+                self._entries.move_to_end(key)
+                return False
+
+            self._entries[key] = now + ttl
+            self._entries.move_to_end(key)
+
+            # Remover expirados do início e respeitar o tamanho máximo
+            while self._entries:
+                oldest_key, oldest_expires = next(iter(self._entries.items()))
+                if oldest_expires > now and len(self._entries) <= self.max_size:
+                    break
+                self._entries.popitem(last=False)
+            return True
+
+    def remove(self, key: str):
+        """Esquece a chave"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """
+    Backend em arquivo SQLite, compartilhado entre os workers do gunicorn
+    """
+
+    def __init__(self, path: str, prune_every: int = 1000):
+        self.path = path
+        self.prune_every = prune_every
+        self._local = threading.local()
+        self._adds = 0
+
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen_keys (key TEXT PRIMARY KEY, expires REAL NOT NULL)"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        """Uma conexão por thread (e por processo, após o fork)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def add(self, key: str, ttl: float) -> bool:
+        """Registra a chave; retorna False se ela já existia (e não expirou)"""
+        now = time.time()
+        conn = self._conn()
+        cursor = conn.execute(
+            "INSERT INTO seen_keys (key, expires) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET expires = excluded.expires "
+            "WHERE seen_keys.expires <= ?",
+            (key, now + ttl, now)
+        )
+
+        self._adds += 1
+        if self._adds % self.prune_every == 0:
+            conn.execute("DELETE FROM seen_keys WHERE expires <= ?", (now,))
+
+        return cursor.rowcount == 1
+
+    def remove(self, key: str):
+        """Esquece a chave"""
+        self._conn().execute("DELETE FROM seen_keys WHERE key = ?", (key,))
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM seen_keys").fetchone()[0]
+
+
+class RedisBackend:
+    """
+    Backend em Redis (ou servidor compatível), compartilhado entre processos e máquinas
+    Requer o pacote `redis` (pip install redis)
+    """
+
+    def __init__(self, url: str, prefix: str = 'igbot:seen:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("Instale o pacote 'redis' para usar DEDUP_BACKEND=redis://...")
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def add(self, key: str, ttl: float) -> bool:
+        """Registra a chave; retorna False se ela já existia (e não expirou)"""
+        return bool(self.client.set(self.prefix + key, 1, nx=True, ex=max(1, int(ttl))))
+
+    def remove(self, key: str):
+        """Esquece a chave"""
+        self.client.delete(self.prefix + key)
+
+    def __len__(self):
+        return sum(1 for _ in self.client.scan_iter(match=self.prefix + '*'))
+
+
+class DedupCache:
+    """
+    Cache de deduplicação com contadores de acertos (duplicados) e falhas (novos)
+    """
+
+    def __init__(self, backend, ttl: float = 86400):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def seen(self, key: str) -> bool:
+        """
+        Verifica e registra a chave
+
+        Returns:
+            True se a chave já foi vista (duplicado), False se é nova
+        """
+        is_new = self.backend.add(key, self.ttl)
+        with self._lock:
+            if is_new:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return not is_new
+
+    def forget(self, key: str):
+        """Remove a chave (ex: quando o comentário não pôde ser enfileirado)"""
+        self.backend.remove(key)
+
+    def stats(self) -> dict:
+        """Contadores do cache"""
+        return {
+            'backend': type(self.backend).__name__,
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+
+def create_dedup_cache(url: str = 'memory', ttl: float = 86400, max_size: int = 100000) -> DedupCache:
+    """
+    Cria o cache a partir de uma URL de backend
+
+    Args:
+        url: 'memory', 'sqlite:///caminho/arquivo.db' ou 'redis://host:porta/db'
+        ttl: Tempo (segundos) que cada chave é lembrada
+        max_size: Tamanho máximo do backend em memória
+
+    Returns:
+        DedupCache configurado
+    """
+    if url.startswith('sqlite:///'):
+        backend = SQLiteBackend(url[len('sqlite:///'):])
+    elif url.startswith(('redis://', 'rediss://', 'unix://')):
+        backend = RedisBackend(url)
+    elif url == 'memory':
+        backend = MemoryBackend(max_size=max_size)
+    else:
+        raise ValueError(f"Backend de deduplicação desconhecido: {url}")
+
+    logger.info(f"🧠 Deduplicação de webhooks usando {type(backend).__name__}")
+    return DedupCache(backend, ttl=ttl)
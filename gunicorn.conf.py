@@ -0,0 +1,47 @@
+"""
+Configuração do Gunicorn (carregada automaticamente pelo `gunicorn app:app`)
+"""
+
+import os
+
+# Tempo para os workers drenarem a fila de comentários ao encerrar
+graceful_timeout = int(os.getenv('GRACEFUL_TIMEOUT', 30))
+
+# Com PRELOAD_APP=true (ou `--preload`) o app é importado uma vez no master e
+# os workers são criados já prontos: boot mais rápido e campanhas compiladas
+# compartilhadas por copy-on-write. Mudanças no código exigem reiniciar o
+# master (as campanhas continuam sendo recarregadas sozinhas)
+preload_app = os.getenv('PRELOAD_APP', 'false').lower() == 'true'
+
+
+def when_ready(server):
+    """Com preload, prepara o master para o fork dos workers"""
+    if server.cfg.preload_app:
+        import app
+        app.prepare_fork()
+
+
+def post_worker_init(worker):
+    """Reenvia as ações que ficaram pendentes no outbox e publica as métricas"""
+    import app
+    import metrics
+    app.start_outbox()
+    metrics.REGISTRY.start()
+
+
+def worker_exit(server, worker):
+    """Drena a fila de comentários antes do worker sair"""
+    import app
+    import metrics
+    app.comment_queue.drain()
+    # Comentários em espera (Graph API fora do ar) ficam pendentes no outbox
+    # e são reenviados por outro worker quando o lease expirar
+    if len(app.held_plans):
+        app.logger.warning(
+            f"⏸️ {len(app.held_plans)} comentário(s) em espera "
+            + ("ficam no outbox" if app.outbox is not None else "serão perdidos (outbox desativado)")
+        )
+    if app.outbox is not None:
+        app.outbox.close()
+    # Últimos valores (somados ao arquivo morto pela próxima coleta)
+    metrics.REGISTRY.publish()
@@ -2,79 +2,1282 @@
 Instagram API - Módulo de integração com a Graph API do Meta
 """
 
-import requests
+import os
+import json
+import time
+import random
 import logging
-from typing import Optional
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable, Iterator, Optional, Tuple
+from urllib.parse import urlencode
+
+# O `requests` (e o urllib3, certifi...) é importado só na primeira chamada à
+# API: fica fora do boot do worker e do primeiro request do webhook
+if TYPE_CHECKING:
+    import requests
+
+import metrics
 
 logger = logging.getLogger(__name__)
 
 BASE_URL = "https://graph.facebook.com/v18.0"
 
+# Configurações padrão do pool de conexões HTTP
+POOL_SIZE = 10
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 30
+
+# Limite de operações por requisição em batch da Graph API
+BATCH_MAX_SIZE = 50
+
+# Campos de cada mídia nas listagens
+MEDIA_FIELDS = 'id,caption,media_type,timestamp,permalink'
+
+# Taxa padrão (chamadas/segundo) de cada orçamento do rate limit
+DEFAULT_RATE_LIMITS = {
+    'replies': 5.0,
+    'messages': 10.0,
+    'default': 20.0
+}
+
+# Códigos de erro da Graph API que indicam throttling
+RATE_LIMIT_ERROR_CODES = {4, 17, 32, 613, 80001, 80002, 80006}
+
+# Códigos de erro temporários (vale a pena tentar de novo)
+TRANSIENT_ERROR_CODES = {1, 2}
+
+# Endpoints com série própria nas métricas (os demais aparecem como `other`)
+METRIC_ENDPOINTS = {'replies', 'messages', 'comments', 'media'}
+
+# Métricas das chamadas à Graph API (ver metrics.py)
+GRAPH_LATENCY = metrics.REGISTRY.histogram(
+    'igbot_graph_request_duration_seconds',
+    'Latência das chamadas HTTP à Graph API',
+    ('endpoint',)
+)
+GRAPH_REQUESTS = metrics.REGISTRY.counter(
+    'igbot_graph_requests_total',
+    'Chamadas à Graph API por status HTTP e código de erro do Meta',
+    ('endpoint', 'status', 'code')
+)
+GRAPH_IN_FLIGHT = metrics.REGISTRY.gauge(
+    'igbot_graph_in_flight',
+    'Chamadas à Graph API em andamento',
+    ('endpoint',)
+)
+GRAPH_RETRY_EVENTS = metrics.REGISTRY.counter(
+    'igbot_graph_retry_events_total',
+    'Retentativas, esperas por throttling e desistências por tipo de chamada',
+    ('event', 'kind')
+)
+RATE_LIMIT_WAIT = metrics.REGISTRY.histogram(
+    'igbot_rate_limit_wait_seconds',
+    'Tempo esperando orçamento no rate limit local',
+    ('kind',)
+)
+CIRCUIT_TRANSITIONS = metrics.REGISTRY.counter(
+    'igbot_graph_circuit_transitions_total',
+    'Mudanças de estado do circuit breaker por endpoint',
+    ('endpoint', 'state')
+)
+CIRCUIT_REJECTED = metrics.REGISTRY.counter(
+    'igbot_graph_circuit_rejected_total',
+    'Chamadas à Graph API recusadas na hora com o circuito aberto',
+    ('endpoint',)
+)
+CONCURRENCY_SHED = metrics.REGISTRY.counter(
+    'igbot_graph_concurrency_shed_total',
+    'Chamadas à Graph API descartadas por esperar demais por uma vaga no limite de concorrência'
+)
+
+
+def endpoint_kind(endpoint: str) -> str:
+    """Classifica o endpoint no orçamento de rate limit correspondente"""
+    if endpoint.endswith('/replies'):
+        return 'replies'
+    if endpoint.endswith('/messages'):
+        return 'messages'
+    return 'default'
+
+
+def endpoint_label(endpoint: str) -> str:
+    """Nome do endpoint nas métricas, sem os IDs (batch = requisição batch)"""
+    if not endpoint:
+        return 'batch'
+    edge = endpoint.rsplit('/', 1)[-1] if '/' in endpoint else ''
+    return edge if edge in METRIC_ENDPOINTS else 'other'
+
+
+def observe_call(label: str, seconds: float, response: 'GraphResponse'):
+    """Registra a latência e o resultado de uma chamada nas métricas"""
+    GRAPH_LATENCY.observe(seconds, label)
+    code = '' if response.ok else str(graph_error(response).get('code', ''))
+    GRAPH_REQUESTS.inc(label, str(response.status) if response.status else 'error', code)
+
+
+def graph_error(response: 'GraphResponse') -> dict:
+    """Extrai o objeto `error` do corpo de uma resposta da Graph API"""
+    if isinstance(response.body, dict) and isinstance(response.body.get('error'), dict):
+        return response.body['error']
+    return {}
+
+
+def is_throttled(response: 'GraphResponse') -> bool:
+    """Verifica se a resposta indica que atingimos o rate limit"""
+    return response.status == 429 or graph_error(response).get('code') in RATE_LIMIT_ERROR_CODES
+
+
+class PagingError(Exception):
+    """Uma página da listagem não pôde ser obtida (a listagem ficou incompleta)"""
+
+
+class TokenBucket:
+    """
+    Token bucket simples: `rate` tokens por segundo, até `capacity` acumulados
+    A taxa efetiva é `rate * factor` (o fator diminui conforme o uso reportado pelo Meta)
+    """
+    
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate * 2)
+        self.factor = 1.0
+        self.tokens = self.capacity
+        self.paused_until = 0.0
+        self.updated = time.monotonic()
+    
+    def _refill(self, now: float):
+        elapsed = now - self.updated
+        self.updated = now
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate * self.factor)
+    
+    def wait_time(self, now: float) -> float:
+        """Segundos até haver um token disponível (0 se já houver)"""
+        if now < self.paused_until:
+            return self.paused_until - now
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / (self.rate * self.factor)
+
+
+class RateLimitScheduler:
+    """
+    Agenda as chamadas de saída respeitando o rate limit do Meta
+    
+    Mantém um token bucket por tipo de chamada (respostas, mensagens, demais)
+    e reduz a taxa conforme os headers X-App-Usage e
+    X-Business-Use-Case-Usage se aproximam de 100%. Quando o Meta indica
+    throttling, o orçamento é pausado e as chamadas esperam em vez de serem
+    descartadas.
+    """
+    
+    def __init__(self, rates: dict = None, slowdown_at: float = 75.0, pause_seconds: float = 60.0):
+        rates = {**DEFAULT_RATE_LIMITS, **(rates or {})}
+        self.buckets = {kind: TokenBucket(rate) for kind, rate in rates.items()}
+        self.slowdown_at = slowdown_at
+        self.pause_seconds = pause_seconds
+        
+        self.app_usage = 0.0
+        self.business_usage = {kind: 0.0 for kind in self.buckets}
+        self.waiting = 0
+        self._cond = threading.Condition()
+    
+    def _bucket(self, kind: str) -> TokenBucket:
+        return self.buckets.get(kind) or self.buckets['default']
+    
+    def acquire(self, kind: str, timeout: float = None) -> bool:
+        """
+        Espera até haver orçamento para uma chamada do tipo `kind`
+        
+        Returns:
+            True quando liberado, False se o timeout expirar
+        """
+        bucket = self._bucket(kind)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        
+        with self._cond:
+            self.waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = bucket.wait_time(now)
+                    if wait <= 0:
+                        bucket.tokens -= 1
+                        return True
+                    if deadline is not None:
+                        if now >= deadline:
+                            return False
+                        wait = min(wait, deadline - now)
+                    self._cond.wait(wait)
+            finally:
+                self.waiting -= 1
+    
+    def try_acquire(self, kind: str) -> float:
+        """
+        Tenta consumir um token sem bloquear (usado pelo cliente assíncrono)
+        
+        Returns:
+            0 se liberado, ou os segundos a esperar antes de tentar de novo
+        """
+        with self._cond:
+            wait = self._bucket(kind).wait_time(time.monotonic())
+            if wait <= 0:
+                self._bucket(kind).tokens -= 1
+                return 0.0
+            return wait
+    
+    def update(self, kind: str, headers) -> None:
+        """Ajusta as taxas a partir dos headers de uso retornados pelo Meta"""
+        if not headers:
+            return
+        
+        app_header = headers.get('X-App-Usage')
+        business_header = headers.get('X-Business-Use-Case-Usage')
+        if not app_header and not business_header:
+            return
+        
+        regain_minutes = 0
+        with self._cond:
+            if app_header:
+                usage = _parse_usage_header(app_header)
+                if usage is not None:
+                    self.app_usage = _max_usage(usage)
+            
+            if business_header:
+                usage = _parse_usage_header(business_header)
+                if isinstance(usage, dict):
+                    entries = [item for items in usage.values() if isinstance(items, list) for item in items]
+                    if entries:
+                        self.business_usage[kind] = max(_max_usage(item) for item in entries)
+                        regain_minutes = max(item.get('estimated_time_to_regain_access') or 0 for item in entries)
+            
+            for bucket_kind, bucket in self.buckets.items():
+                usage = max(self.app_usage, self.business_usage.get(bucket_kind, 0.0))
+                bucket.factor = self._factor(usage)
+                if usage >= 100:
+                    bucket.paused_until = max(bucket.paused_until, time.monotonic() + self.pause_seconds)
+            
+            if regain_minutes:
+                bucket = self._bucket(kind)
+                bucket.paused_until = max(bucket.paused_until, time.monotonic() + regain_minutes * 60)
+            
+            self._cond.notify_all()
+    
+    def _factor(self, usage: float) -> float:
+        """Fator de redução da taxa para um percentual de uso"""
+        if usage <= self.slowdown_at:
+            return 1.0
+        return max(0.05, (100 - usage) / (100 - self.slowdown_at))
+    
+    def throttled(self, kind: str, seconds: float = None) -> None:
+        """Pausa o orçamento após o Meta responder com erro de rate limit"""
+        with self._cond:
+            bucket = self._bucket(kind)
+            bucket.paused_until = max(bucket.paused_until, time.monotonic() + (seconds or self.pause_seconds))
+            bucket.tokens = 0
+            self._cond.notify_all()
+    
+    def paused_for(self) -> float:
+        """Maior pausa restante entre os orçamentos (0 se nenhum está pausado)"""
+        now = time.monotonic()
+        return max(0.0, max(bucket.paused_until for bucket in self.buckets.values()) - now)
+    
+    def budget(self) -> dict:
+        """
+        Orçamento atual de cada tipo de chamada
+        
+        Returns:
+            Dicionário com taxa efetiva, tokens disponíveis e pausa restante
+        """
+        with self._cond:
+            now = time.monotonic()
+            result = {'app_usage': self.app_usage, 'waiting': self.waiting}
+            for kind, bucket in self.buckets.items():
+                bucket.wait_time(now)
+                result[kind] = {
+                    'rate': round(bucket.rate * bucket.factor, 3),
+                    'tokens': round(bucket.tokens, 2),
+                    'usage': max(self.app_usage, self.business_usage.get(kind, 0.0)),
+                    'paused_for': round(max(0.0, bucket.paused_until - now), 1)
+                }
+            return result
+
+
+def _parse_usage_header(value: str):
+    """Decodifica o JSON de um header de uso (None se inválido)"""
+    try:
+        return json.loads(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _max_usage(usage: dict) -> float:
+    """Maior percentual entre call_count, total_cputime e total_time"""
+    if not isinstance(usage, dict):
+        return 0.0
+    return float(max(
+        usage.get('call_count') or 0,
+        usage.get('total_cputime') or 0,
+        usage.get('total_time') or 0
+    ))
+
+
+def is_overloaded(response: 'GraphResponse') -> bool:
+    """Falha que indica API ou conexão sobrecarregada (timeout, conexão, 5xx)"""
+    return response.error is not None or response.status >= 500
+
+
+def classify_error(response: 'GraphResponse') -> str:
+    """
+    Classifica uma resposta com falha
+    
+    Returns:
+        'throttled' (rate limit), 'transient' (pode repetir) ou 'permanent'
+    """
+    if is_throttled(response):
+        return 'throttled'
+    if response.error is not None or response.status >= 500:
+        return 'transient'
+    error = graph_error(response)
+    if error.get('is_transient') or error.get('code') in TRANSIENT_ERROR_CODES:
+        return 'transient'
+    return 'permanent'
+
+
+class RetryPolicy:
+    """
+    Política de retentativas com backoff exponencial e jitter ("full jitter")
+    """
+    
+    def __init__(
+        self,
+        max_retries: int = 5,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        max_total_time: float = 60.0
+    ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_total_time = max_total_time
+    
+    def backoff(self, attempt: int) -> float:
+        """Tempo de espera antes da tentativa `attempt` (1, 2, 3...)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class ConcurrencyLimiter:
+    """
+    Limite adaptativo de chamadas simultâneas à Graph API (AIMD)
+    
+    Compara a latência recente (média móvel curta) com a latência base
+    (a menor vista nos últimos `baseline_window` segundos, então ela acompanha
+    a API se ficar mais lenta de vez):
+    - latência perto da base e o limite em uso: o limite sobe 1 a cada
+      `limit` respostas (aumento aditivo; até a primeira redução, 1 por
+      resposta, para chegar logo ao ponto de trabalho)
+    - latência acima de `tolerance` x base, timeout, erro de conexão ou 5xx:
+      o limite cai para `limit * backoff` (no máximo uma vez por latência
+      recente, para uma rajada de erros não derrubar o limite até o mínimo)
+    
+    Acima do limite as chamadas esperam uma vaga (fila); quem espera mais
+    que `queue_timeout` é descartado e tratado como erro temporário.
+    Compartilhado por todos os clientes do processo.
+    """
+    
+    def __init__(
+        self,
+        initial: int = 4,
+        min_limit: int = 1,
+        max_limit: int = POOL_SIZE,
+        tolerance: float = 2.0,
+        backoff: float = 0.8,
+        queue_timeout: float = READ_TIMEOUT,
+        smoothing: float = 0.2,
+        baseline_window: float = 30.0
+    ):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.initial = min(max(initial, self.min_limit), self.max_limit)
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.queue_timeout = queue_timeout
+        self.smoothing = smoothing
+        self.baseline_window = baseline_window
+        self._cond = threading.Condition()
+        self._reset()
+    
+    def _reset(self):
+        """Estado zerado (novo processo: cada worker se adapta sozinho)"""
+        self.limit = float(self.initial)
+        self.in_flight = 0
+        self.waiting = 0
+        self.baseline = None
+        self.latency = None
+        # Menor latência da janela atual e da anterior
+        self._window_min = None
+        self._previous_min = None
+        self._window_started = time.monotonic()
+        self._slow_start = True
+        self.increases = 0
+        self.decreases = 0
+        self.shed = 0
+        self._last_decrease = 0.0
+        self._pid = os.getpid()
+    
+    def acquire(self, timeout: float = None) -> bool:
+        """
+        Ocupa uma vaga, esperando se o limite estiver cheio
+        
+        Returns:
+            False se a espera passou de `timeout` (padrão: queue_timeout)
+        """
+        if self._pid != os.getpid():
+            with self._cond:
+                if self._pid != os.getpid():
+                    self._reset()
+        
+        with self._cond:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True
+            
+            deadline = time.monotonic() + (self.queue_timeout if timeout is None else timeout)
+            self.waiting += 1
+            try:
+                while self.in_flight >= int(self.limit):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.shed += 1
+                        CONCURRENCY_SHED.inc()
+                        return False
+                    self._cond.wait(remaining)
+                self.in_flight += 1
+                return True
+            finally:
+                self.waiting -= 1
+    
+    def release(self, seconds: float, overloaded: bool = False):
+        """
+        Libera a vaga e ajusta o limite
+        
+        Args:
+            seconds: Duração da chamada (sem a espera pela vaga)
+            overloaded: A chamada falhou por sobrecarga (timeout, conexão, 5xx)
+        """
+        now = time.monotonic()
+        with self._cond:
+            busy = self.in_flight >= int(self.limit)
+            self.in_flight -= 1
+            
+            if not overloaded:
+                if now - self._window_started >= self.baseline_window:
+                    self._previous_min, self._window_min = self._window_min, None
+                    self._window_started = now
+                if self._window_min is None or seconds < self._window_min:
+                    self._window_min = seconds
+                self.baseline = min(self._window_min, self._previous_min or self._window_min)
+                self.latency = seconds if self.latency is None else (
+                    self.latency + (seconds - self.latency) * self.smoothing
+                )
+            
+            if overloaded or (self.latency is not None and self.latency > self.tolerance * self.baseline):
+                # Uma redução por "latência recente": as respostas que já
+                # estavam a caminho não contam de novo
+                if now - self._last_decrease >= (self.latency or 0):
+                    self.limit = max(self.min_limit, self.limit * self.backoff)
+                    self._last_decrease = now
+                    self._slow_start = False
+                    self.decreases += 1
+            elif busy and self.limit < self.max_limit:
+                self.limit = min(self.max_limit, self.limit + (1 if self._slow_start else 1 / self.limit))
+                self.increases += 1
+            
+            self._cond.notify(max(1, int(self.limit) - self.in_flight))
+    
+    def stats(self) -> dict:
+        """Limite atual e o que motivou os ajustes"""
+        return {
+            'limit': int(self.limit),
+            'in_flight': self.in_flight,
+            'waiting': self.waiting,
+            'baseline_ms': round(self.baseline * 1000, 1) if self.baseline is not None else None,
+            'latency_ms': round(self.latency * 1000, 1) if self.latency is not None else None,
+            'increases': self.increases,
+            'decreases': self.decreases,
+            'shed': self.shed
+        }
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker por endpoint (replies, messages, comments...)
+    
+    - closed: chamadas normais; `failure_threshold` falhas seguidas por
+      sobrecarga (timeout, conexão, 5xx) abrem o circuito
+    - open: chamadas recusadas na hora, sem tocar na rede, por
+      `reset_timeout` segundos
+    - half_open: até `half_open_calls` chamadas de teste passam; sucesso
+      fecha o circuito, falha o reabre com o tempo dobrado (até
+      `max_reset_timeout`)
+    
+    Erros do Meta que não indicam indisponibilidade (parâmetro inválido,
+    rate limit) contam como sucesso: a API está respondendo.
+    Cada mudança de estado é passada aos ouvintes (add_listener) como
+    (endpoint, estado anterior, novo estado), fora do lock.
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        max_reset_timeout: float = 300.0,
+        half_open_calls: int = 1
+    ):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max(reset_timeout, max_reset_timeout)
+        self.half_open_calls = max(1, half_open_calls)
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._reset()
+    
+    def _reset(self):
+        """Estado zerado (novo processo: cada worker observa a API sozinho)"""
+        # endpoint -> [estado, falhas seguidas, aberto em, tempo aberto, testes em andamento]
+        self._circuits = {}
+        self._pid = os.getpid()
+    
+    def add_listener(self, callback: Callable[[str, str, str], None]):
+        """Registra quem quer saber das mudanças de estado"""
+        self._listeners.append(callback)
+    
+    def _circuit(self, endpoint: str) -> list:
+        if self._pid != os.getpid():
+            self._reset()
+        circuit = self._circuits.get(endpoint)
+        if circuit is None:
+            circuit = self._circuits[endpoint] = [self.CLOSED, 0, 0.0, self.reset_timeout, 0]
+        return circuit
+    
+    def _notify(self, endpoint: str, old: str, new: str):
+        CIRCUIT_TRANSITIONS.inc(endpoint, new)
+        for callback in self._listeners:
+            try:
+                callback(endpoint, old, new)
+            except Exception as e:
+                logger.error(f"Erro ao avisar a mudança do circuito de {endpoint}: {e}")
+    
+    def allow(self, endpoint: str) -> bool:
+        """Reserva a passagem de uma chamada (False = recusar na hora)"""
+        with self._lock:
+            circuit = self._circuit(endpoint)
+            state = circuit[0]
+            if state == self.CLOSED:
+                return True
+            if state == self.OPEN:
+                if time.monotonic() < circuit[2] + circuit[3]:
+                    CIRCUIT_REJECTED.inc(endpoint)
+                    return False
+                circuit[0], circuit[4] = self.HALF_OPEN, 1
+            elif circuit[4] < self.half_open_calls:
+                circuit[4] += 1
+                return True
+            else:
+                CIRCUIT_REJECTED.inc(endpoint)
+                return False
+        self._notify(endpoint, self.OPEN, self.HALF_OPEN)
+        return True
+    
+    def record(self, endpoint: str, ok: bool):
+        """Resultado de uma chamada liberada por allow()"""
+        change = None
+        with self._lock:
+            circuit = self._circuit(endpoint)
+            state = circuit[0]
+            if state == self.HALF_OPEN:
+                circuit[4] = max(0, circuit[4] - 1)
+                if ok:
+                    circuit[0], circuit[1], circuit[3] = self.CLOSED, 0, self.reset_timeout
+                    change = (state, self.CLOSED)
+                else:
+                    circuit[0], circuit[2] = self.OPEN, time.monotonic()
+                    circuit[3] = min(self.max_reset_timeout, circuit[3] * 2)
+                    change = (state, self.OPEN)
+            elif ok:
+                circuit[1] = 0
+            elif state == self.CLOSED:
+                circuit[1] += 1
+                if circuit[1] >= self.failure_threshold:
+                    circuit[0], circuit[2] = self.OPEN, time.monotonic()
+                    change = (state, self.OPEN)
+        if change:
+            self._notify(endpoint, *change)
+    
+    def cancel(self, endpoint: str):
+        """Devolve a passagem de uma chamada liberada que não chegou a ser feita"""
+        with self._lock:
+            circuit = self._circuit(endpoint)
+            if circuit[0] == self.HALF_OPEN:
+                circuit[4] = max(0, circuit[4] - 1)
+    
+    def blocked(self, endpoint: str) -> bool:
+        """True se uma chamada agora seria recusada (não reserva nada)"""
+        with self._lock:
+            circuit = self._circuit(endpoint)
+            if circuit[0] == self.OPEN:
+                return time.monotonic() < circuit[2] + circuit[3]
+            return circuit[0] == self.HALF_OPEN and circuit[4] >= self.half_open_calls
+    
+    def retry_in(self, endpoint: str) -> float:
+        """Segundos até o circuito aceitar uma chamada de teste (0 = já aceita)"""
+        with self._lock:
+            circuit = self._circuit(endpoint)
+            if circuit[0] != self.OPEN:
+                return 0.0
+            return max(0.0, circuit[2] + circuit[3] - time.monotonic())
+    
+    def state(self, endpoint: str) -> str:
+        with self._lock:
+            return self._circuit(endpoint)[0]
+    
+    def stats(self) -> dict:
+        """Estado de cada endpoint já chamado"""
+        now = time.monotonic()
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+            return {
+                endpoint: {
+                    'state': state,
+                    'failures': failures,
+                    'retry_in': round(max(0.0, opened + timeout - now), 1) if state == self.OPEN else 0.0
+                }
+                for endpoint, (state, failures, opened, timeout, _) in self._circuits.items()
+            }
+
+
+class IdempotencyStore:
+    """
+    Registro das ações já concluídas, por chave (ex: (comment_id, 'reply'))
+    
+    Garante que a mesma ação não seja executada duas vezes no processo:
+    chamadas concorrentes com a mesma chave esperam a primeira terminar,
+    e chamadas posteriores recebem o resultado já obtido. Falhas não são
+    memorizadas, para que a ação possa ser tentada de novo.
+    """
+    
+    def __init__(self, max_size: int = 100000, ttl: float = 86400):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+    
+    def run(self, key: tuple, func: Callable[[], bool]) -> bool:
+        """Executa `func` uma única vez para a chave `key`"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['expires'] < now:
+                del self._entries[key]
+                entry = None
+            owner = entry is None
+            if owner:
+                entry = {'done': threading.Event(), 'result': False, 'expires': now + self.ttl}
+                self._entries[key] = entry
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        
+        if not owner:
+            entry['done'].wait()
+            if entry['result']:
+                with self._lock:
+                    self.hits += 1
+                logger.info(f"♻️ Ação {key} já executada - ignorando repetição")
+                return True
+            return False
+        
+        result = False
+        try:
+            result = func()
+        finally:
+            entry['result'] = result
+            if not result:
+                with self._lock:
+                    if self._entries.get(key) is entry:
+                        del self._entries[key]
+            entry['done'].set()
+        return result
+
+
+class GraphResponse:
+    """
+    Resultado de uma chamada à Graph API (individual ou parte de um batch)
+    
+    `shed` indica uma chamada descartada aqui mesmo pelo limite de
+    concorrência, sem chegar à API (não conta como falha da Graph API)
+    """
+    
+    __slots__ = ('status', 'headers', 'body', 'error', 'shed')
+    
+    def __init__(self, status: int = 0, headers: dict = None, body=None, error: str = None, shed: bool = False):
+        self.status = status
+        self.headers = headers or {}
+        self.body = body
+        self.error = error
+        self.shed = shed
+    
+    @property
+    def ok(self) -> bool:
+        return self.error is None and 200 <= self.status < 300
+    
+    def describe(self) -> str:
+        """Descrição curta do erro para os logs"""
+        if self.error:
+            return self.error
+        return f"HTTP {self.status}: {self.body}"
+
+
+class GraphBatcher:
+    """
+    Agrupa operações de várias threads em requisições batch da Graph API
+    
+    Cada operação recebe um Future que é resolvido com a sua própria
+    GraphResponse. O batch é enviado quando atinge `max_size` operações
+    ou quando a primeira operação pendente espera mais que `window` segundos.
+    """
+    
+    def __init__(self, api: 'InstagramAPI', max_size: int = BATCH_MAX_SIZE, window: float = 0.05):
+        self.api = api
+        self.max_size = max(1, min(max_size, BATCH_MAX_SIZE))
+        self.window = window
+        
+        self._cond = threading.Condition()
+        self._pending = []
+        self._pid = None
+        self._sender = None
+        
+        # Métricas
+        self.batches_sent = 0
+        self.operations_sent = 0
+    
+    def _ensure_started(self):
+        """Inicia a thread de flush no processo atual (uma vez por PID)"""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._cond:
+            if self._pid == pid:
+                return
+            self._pending = []
+            self._sender = ThreadPoolExecutor(max_workers=4, thread_name_prefix='graph-batch')
+            threading.Thread(target=self._flush_loop, name='graph-batch-flush', daemon=True).start()
+            self._pid = pid
+    
+    def submit(self, method: str, endpoint: str, params: dict = None, data: dict = None) -> Future:
+        """
+        Adiciona uma operação ao próximo batch
+        
+        Returns:
+            Future resolvido com a GraphResponse da operação
+        """
+        self._ensure_started()
+        
+        relative_url = endpoint
+        if params:
+            relative_url = f"{endpoint}?{urlencode(params)}"
+        
+        operation = {'method': method, 'relative_url': relative_url}
+        if data:
+            operation['body'] = urlencode({
+                key: json.dumps(value) if isinstance(value, (dict, list)) else value
+                for key, value in data.items()
+            })
+        
+        future = Future()
+        with self._cond:
+            self._pending.append((operation, future, time.monotonic()))
+            if len(self._pending) == 1 or len(self._pending) >= self.max_size:
+                self._cond.notify()
+        return future
+    
+    def _flush_loop(self):
+        """Espera o batch encher (ou a janela expirar) e dispara o envio"""
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                
+                deadline = self._pending[0][2] + self.window
+                while len(self._pending) < self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                
+                batch = self._pending[:self.max_size]
+                del self._pending[:self.max_size]
+            
+            self._sender.submit(self._send_batch, batch)
+    
+    @property
+    def result_timeout(self) -> float:
+        """
+        Espera máxima pelo resultado de uma operação: janela, vaga no limite
+        de concorrência e a requisição, com folga para batches na fila de envio
+        """
+        connect_timeout, read_timeout = self.api.timeout
+        limiter = self.api.limiter
+        queued = limiter.queue_timeout if limiter is not None else 0
+        return 2 * (self.window + queued + connect_timeout + read_timeout)
+    
+    def _send_batch(self, batch: list):
+        """Envia um batch; se algo falhar, nenhuma operação fica sem resposta"""
+        try:
+            self._deliver_batch(batch)
+        except Exception as e:
+            logger.exception(f"Erro no batch de {len(batch)} operações: {e}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_result(GraphResponse(error=f'falha no batch: {e}'))
+    
+    def _deliver_batch(self, batch: list):
+        """Envia um batch e distribui as respostas para cada operação"""
+        operations = [operation for operation, _, _ in batch]
+        response = self.api._send('POST', '', data={
+            'batch': json.dumps(operations),
+            'include_headers': 'true'
+        }, form=True)
+        
+        self.batches_sent += 1
+        self.operations_sent += len(batch)
+        
+        self.api.scheduler.update('default', response.headers)
+        
+        results = response.body if response.ok and isinstance(response.body, list) else None
+        if results is None:
+            logger.error(f"Erro no batch de {len(batch)} operações: {response.describe()}")
+        
+        now = time.monotonic()
+        for i, (operation, future, queued_at) in enumerate(batch):
+            if results is None:
+                result = GraphResponse(
+                    status=response.status,
+                    headers=response.headers,
+                    body=response.body,
+                    error=response.error or 'falha no batch',
+                    shed=response.shed
+                )
+            elif i >= len(results) or results[i] is None:
+                result = GraphResponse(error='operação sem resposta no batch')
+            else:
+                result = _parse_batch_item(results[i])
+            # Latência vista por quem chamou: espera pelo batch + requisição
+            observe_call(endpoint_label(operation['relative_url'].split('?', 1)[0]), now - queued_at, result)
+            future.set_result(result)
+    
+    def stats(self) -> dict:
+        """Métricas do batcher"""
+        return {
+            'batches_sent': self.batches_sent,
+            'operations_sent': self.operations_sent,
+            'pending': len(self._pending)
+        }
+
+
+def _parse_batch_item(item: dict) -> GraphResponse:
+    """Converte um item da resposta de batch em GraphResponse"""
+    from requests.structures import CaseInsensitiveDict
+    headers = CaseInsensitiveDict({
+        header.get('name'): header.get('value')
+        for header in item.get('headers') or []
+    })
+    body = item.get('body')
+    if isinstance(body, str):
+        try:
+            body = json.loads(body)
+        except ValueError:
+            pass
+    return GraphResponse(status=item.get('code', 0), headers=headers, body=body)
+
 
 class InstagramAPI:
     """
     Classe para interagir com a API do Instagram (via Meta Graph API)
     """
     
-    def __init__(self, access_token: str, instagram_account_id: str):
+    def __init__(
+        self,
+        access_token: str,
+        instagram_account_id: str,
+        pool_size: int = POOL_SIZE,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        read_timeout: float = READ_TIMEOUT,
+        rate_limits: dict = None,
+        max_throttle_wait: float = 300,
+        base_url: str = None,
+        retry_policy: RetryPolicy = None,
+        idempotency: IdempotencyStore = None,
+        limiter: ConcurrencyLimiter = None,
+        breaker: CircuitBreaker = None
+    ):
         self.access_token = access_token
         self.instagram_account_id = instagram_account_id
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.base_url = base_url or BASE_URL
+        
+        # Orçamentos de rate limit (respostas, mensagens e demais chamadas)
+        self.scheduler = RateLimitScheduler(rate_limits)
+        self.max_throttle_wait = max_throttle_wait
+        
+        # Retentativas e idempotência das ações por comentário (o registro pode
+        # ser compartilhado entre as contas: IDs de comentário são únicos)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.idempotency = idempotency or IdempotencyStore()
+        self._retry_stats = {'retries': {}, 'throttled': {}, 'give_ups': {}}
+        self._stats_lock = threading.Lock()
+        
+        # Limite adaptativo de chamadas simultâneas e circuit breaker por
+        # endpoint (os dois compartilháveis entre contas)
+        self.limiter = limiter
+        self.breaker = breaker
+        
+        self._session = None
+        self._session_pid = None
+        self._session_lock = threading.Lock()
+        
+        self.batcher = None
+        self._parallel = None
     
-    def _make_request(
-        self, 
-        method: str, 
-        endpoint: str, 
-        params: dict = None, 
-        data: dict = None
-    ) -> Optional[dict]:
-        """Faz uma requisição para a API do Meta"""
+    def enable_batching(self, max_size: int = BATCH_MAX_SIZE, window: float = 0.05):
+        """
+        Ativa o modo batch: chamadas POST de várias threads são agrupadas
+        em requisições batch da Graph API (até 50 operações cada)
         
-        url = f"{BASE_URL}/{endpoint}"
+        Args:
+            max_size: Operações por batch (máximo 50)
+            window: Tempo máximo (segundos) esperando o batch encher
+        """
+        self.batcher = GraphBatcher(self, max_size=max_size, window=window)
+    
+    @property
+    def session(self) -> 'requests.Session':
+        """
+        Sessão HTTP com pool de conexões keep-alive
+        Criada uma vez por processo (cada worker do gunicorn tem a sua)
+        e compartilhada entre threads
+        """
+        pid = os.getpid()
+        if self._session_pid != pid:
+            with self._session_lock:
+                if self._session_pid != pid:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    session = requests.Session()
+                    adapter = HTTPAdapter(
+                        pool_connections=1,
+                        pool_maxsize=self.pool_size
+                    )
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    session.headers['Connection'] = 'keep-alive'
+                    self._session = session
+                    self._session_pid = pid
+        return self._session
+    
+    def rate_limit_budget(self) -> dict:
+        """Orçamento atual do rate limit (ver RateLimitScheduler.budget)"""
+        return self.scheduler.budget()
+    
+    def connection_stats(self) -> dict:
+        """
+        Estatísticas de reaproveitamento de conexões do pool
+        
+        Returns:
+            Dicionário com requisições, conexões novas e reaproveitadas
+        """
+        if self._session_pid != os.getpid():
+            return {'requests': 0, 'new_connections': 0, 'reused_connections': 0}
+        
+        total_requests = 0
+        new_connections = 0
+        for adapter in set(self._session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is not None:
+                    total_requests += pool.num_requests
+                    new_connections += pool.num_connections
+        
+        return {
+            'requests': total_requests,
+            'new_connections': new_connections,
+            'reused_connections': total_requests - new_connections
+        }
+    
+    def _send(
+        self,
+        method: str,
+        endpoint: str,
+        params: dict = None,
+        data: dict = None,
+        form: bool = False,
+        headers: dict = None
+    ) -> GraphResponse:
+        """Executa uma única requisição HTTP para a API do Meta"""
+        limiter = self.limiter
+        if limiter is None:
+            return self._send_once(method, endpoint, params, data, form, headers)
+        
+        # Sem vaga dentro do prazo: erro temporário (o backoff alivia a API)
+        if not limiter.acquire():
+            return GraphResponse(error='limite de concorrência: chamada descartada após esperar por uma vaga', shed=True)
+        
+        started = time.perf_counter()
+        result = None
+        try:
+            result = self._send_once(method, endpoint, params, data, form, headers)
+            return result
+        finally:
+            limiter.release(time.perf_counter() - started, result is None or is_overloaded(result))
+    
+    def _send_once(
+        self,
+        method: str,
+        endpoint: str,
+        params: dict = None,
+        data: dict = None,
+        form: bool = False,
+        headers: dict = None
+    ) -> GraphResponse:
+        """Requisição HTTP propriamente dita (ver _send)"""
+        from requests.exceptions import RequestException
+        
+        url = f"{self.base_url}/{endpoint}"
         
         # Adicionar access_token aos parâmetros
         if params is None:
             params = {}
         params['access_token'] = self.access_token
         
+        label = endpoint_label(endpoint)
+        GRAPH_IN_FLIGHT.inc(label)
+        started = time.perf_counter()
         try:
             if method == 'GET':
-                response = requests.get(url, params=params, timeout=30)
+                response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+            elif method == 'POST' and form:
+                response = self.session.post(url, params=params, data=data, timeout=self.timeout)
             elif method == 'POST':
-                response = requests.post(url, params=params, json=data, timeout=30)
+                response = self.session.post(url, params=params, json=data, timeout=self.timeout)
             else:
                 raise ValueError(f"Método não suportado: {method}")
+        except RequestException as e:
+            result = GraphResponse(error=str(e))
+            observe_call(label, time.perf_counter() - started, result)
+            return result
+        finally:
+            GRAPH_IN_FLIGHT.dec(label)
+        
+        try:
+            body = response.json()
+        except ValueError:
+            body = response.text
+        
+        result = GraphResponse(status=response.status_code, headers=response.headers, body=body)
+        observe_call(label, time.perf_counter() - started, result)
+        return result
+    
+    def _make_request(
+        self, 
+        method: str, 
+        endpoint: str, 
+        params: dict = None, 
+        data: dict = None,
+        verify: Callable[[], Optional[dict]] = None,
+        headers: dict = None,
+        raw: bool = False,
+        retry: bool = True
+    ):
+        """
+        Faz uma requisição para a API do Meta
+        
+        Erros temporários (timeout, 5xx, códigos transitórios) são repetidos
+        com backoff; erros de rate limit esperam o orçamento voltar. Com o
+        circuito do endpoint aberto, retorna None na hora.
+        
+        Args:
+            verify: Função chamada antes de repetir uma requisição cujo
+                resultado é incerto (timeout/5xx). Se retornar um resultado,
+                a ação já foi feita no Meta e não é enviada de novo.
+            headers: Headers extras da requisição (ex: If-None-Match)
+            raw: Retorna o GraphResponse inteiro (com os headers), e aceita
+                304 Not Modified como sucesso
+            retry: Com False, erros temporários não são repetidos (consultas
+                feitas dentro das retentativas de outra requisição)
+        """
+        
+        kind = endpoint_kind(endpoint)
+        label = endpoint_label(endpoint)
+        breaker = self.breaker
+        policy = self.retry_policy
+        started = time.monotonic()
+        deadline = started + self.max_throttle_wait
+        attempt = 0
+        
+        while True:
+            # API fora do ar: falhar na hora em vez de esperar o timeout
+            if breaker is not None and not breaker.allow(label):
+                logger.warning(f"⚡ Circuito de {label} aberto - {endpoint} não enviado")
+                return None
             
-            response.raise_for_status()
-            return response.json()
+            # Esperar orçamento no rate limit (a chamada fica na fila, não é descartada)
+            waiting_since = time.monotonic()
+            acquired = self.scheduler.acquire(kind, timeout=max(0.0, deadline - waiting_since))
+            RATE_LIMIT_WAIT.observe(time.monotonic() - waiting_since, kind)
+            if not acquired:
+                logger.error(f"❌ Rate limit: sem orçamento para {endpoint} após {self.max_throttle_wait}s")
+                self._count('give_ups', kind)
+                if breaker is not None:
+                    breaker.cancel(label)
+                return None
             
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Erro na requisição para {endpoint}: {e}")
-            if hasattr(e, 'response') and e.response is not None:
-                logger.error(f"Resposta: {e.response.text}")
-            return None
+            # No modo batch os POSTs são agrupados com os de outras threads
+            if self.batcher is not None and method == 'POST':
+                try:
+                    response = self.batcher.submit(method, endpoint, params, data).result(
+                        timeout=self.batcher.result_timeout
+                    )
+                except FutureTimeoutError:
+                    response = GraphResponse(error='batch sem resposta no prazo')
+            else:
+                response = self._send(method, endpoint, dict(params or {}), data, headers=headers)
+            
+            self.scheduler.update(kind, response.headers)
+            if breaker is not None:
+                # Descartada pelo limite local: a API não foi consultada
+                if response.shed:
+                    breaker.cancel(label)
+                else:
+                    breaker.record(label, not is_overloaded(response))
+            
+            if response.ok or (raw and response.status == 304):
+                return response if raw else response.body
+            
+            error_class = classify_error(response)
+            
+            if error_class == 'throttled' and time.monotonic() < deadline:
+                logger.warning(f"⏳ Rate limit atingido em {endpoint} - aguardando orçamento")
+                self._count('throttled', kind)
+                self.scheduler.throttled(kind)
+                continue
+            
+            attempt += 1
+            delay = policy.backoff(attempt)
+            if (
+                error_class != 'transient'
+                or not retry
+                or attempt > policy.max_retries
+                or time.monotonic() + delay - started > policy.max_total_time
+            ):
+                break
+            
+            logger.warning(
+                f"🔁 Erro temporário em {endpoint} ({response.describe()}) - "
+                f"tentativa {attempt}/{policy.max_retries} em {delay:.1f}s"
+            )
+            self._count('retries', kind)
+            time.sleep(delay)
+            
+            # A requisição anterior pode ter sido processada mesmo sem resposta
+            if verify is not None and method == 'POST':
+                existing = verify()
+                if existing is not None:
+                    logger.info(f"♻️ {endpoint} já havia sido processado - não reenviando")
+                    return existing
+        
+        if error_class != 'permanent':
+            self._count('give_ups', kind)
+        logger.error(f"Erro na requisição para {endpoint}: {response.describe()}")
+        return None
+    
+    def _count(self, metric: str, kind: str):
+        """Incrementa um contador de retentativas"""
+        with self._stats_lock:
+            counters = self._retry_stats[metric]
+            counters[kind] = counters.get(kind, 0) + 1
+        GRAPH_RETRY_EVENTS.inc(metric, kind)
+    
+    def retry_stats(self) -> dict:
+        """
+        Contadores de retentativas, throttling e desistências por tipo de chamada
+        
+        Returns:
+            Dicionário com os contadores
+        """
+        with self._stats_lock:
+            stats = {metric: dict(counters) for metric, counters in self._retry_stats.items()}
+        stats['idempotent_hits'] = self.idempotency.hits
+        return stats
     
     # =========================================================================
     # MÉTODOS DE COMENTÁRIOS
     # =========================================================================
     
-    def reply_to_comment(self, comment_id: str, message: str) -> bool:
+    def reply_to_comment(self, comment_id: str, message: str, check_existing: bool = False) -> bool:
         """
         Responde a um comentário específico
         
         Args:
             comment_id: ID do comentário a ser respondido
             message: Texto da resposta
+            check_existing: Procurar antes uma resposta nossa já publicada
+                (ex: ação reenviada pelo outbox após a queda de um worker)
             
         Returns:
             True se sucesso, False se falhou
         """
-        result = self._make_request(
-            method='POST',
-            endpoint=f"{comment_id}/replies",
-            data={'message': message}
-        )
+        def send() -> bool:
+            if check_existing and self._find_own_reply(comment_id, message) is not None:
+                logger.info(f"♻️ Comentário {comment_id} já havia sido respondido - não reenviando")
+                return True
+            result = self._make_request(
+                method='POST',
+                endpoint=f"{comment_id}/replies",
+                data={'message': message},
+                verify=lambda: self._find_own_reply(comment_id, message)
+            )
+            return result is not None and 'id' in result
         
-        return result is not None and 'id' in result
+        return self.idempotency.run((comment_id, 'reply'), send)
+    
+    def _find_own_reply(self, comment_id: str, message: str) -> Optional[dict]:
+        """
+        Procura uma resposta nossa com o mesmo texto (evita resposta duplicada)
+        Passa pelo circuito, rate limit e limite de concorrência como as outras
+        chamadas, mas sem retentativas próprias
+        """
+        replies = self._make_request(
+            'GET',
+            f"{comment_id}/replies",
+            params={'fields': 'id,text,from'},
+            retry=False
+        )
+        if not isinstance(replies, dict):
+            return None
+        for reply in replies.get('data', []):
+            author = (reply.get('from') or {}).get('id')
+            if author == self.instagram_account_id and reply.get('text') == message:
+                return {'id': reply['id']}
+        return None
     
     def send_private_reply(self, comment_id: str, message: str) -> bool:
         """
@@ -88,16 +1291,55 @@ class InstagramAPI:
         Returns:
             True se sucesso, False se falhou
         """
-        result = self._make_request(
-            method='POST',
-            endpoint=f"{self.instagram_account_id}/messages",
-            data={
-                'recipient': {'comment_id': comment_id},
-                'message': {'text': message}
-            }
-        )
+        def send() -> bool:
+            result = self._make_request(
+                method='POST',
+                endpoint=f"{self.instagram_account_id}/messages",
+                data={
+                    'recipient': {'comment_id': comment_id},
+                    'message': {'text': message}
+                }
+            )
+            return result is not None and 'message_id' in result
         
-        return result is not None and 'message_id' in result
+        return self.idempotency.run((comment_id, 'private_reply'), send)
+    
+    def reply_and_send_private(
+        self,
+        comment_id: str,
+        reply_text: Optional[str],
+        dm_text: Optional[str],
+        check_existing: bool = False
+    ) -> Tuple[Optional[bool], Optional[bool]]:
+        """
+        Responde o comentário e envia a DM
+        No modo batch as duas chamadas saem juntas na mesma requisição
+        
+        Args:
+            comment_id: ID do comentário
+            reply_text: Texto da resposta pública (None para não responder)
+            dm_text: Texto da DM (None para não enviar)
+            check_existing: Ver reply_to_comment
+            
+        Returns:
+            (resultado da resposta, resultado da DM) - None quando não enviado
+        """
+        if self.batcher is None or not (reply_text and dm_text):
+            replied = self.reply_to_comment(comment_id, reply_text, check_existing) if reply_text else None
+            sent = self.send_private_reply(comment_id, dm_text) if dm_text else None
+            return replied, sent
+        
+        if self._parallel is None:
+            with self._session_lock:
+                if self._parallel is None:
+                    self._parallel = ThreadPoolExecutor(
+                        max_workers=self.pool_size,
+                        thread_name_prefix='graph-reply'
+                    )
+        
+        reply_future = self._parallel.submit(self.reply_to_comment, comment_id, reply_text, check_existing)
+        sent = self.send_private_reply(comment_id, dm_text)
+        return reply_future.result(), sent
     
     def get_comment_details(self, comment_id: str) -> Optional[dict]:
         """
@@ -133,7 +1375,7 @@ class InstagramAPI:
             method='GET',
             endpoint=f"{self.instagram_account_id}/media",
             params={
-                'fields': 'id,caption,media_type,timestamp,permalink',
+                'fields': MEDIA_FIELDS,
                 'limit': limit
             }
         )
@@ -142,6 +1384,61 @@ class InstagramAPI:
             return result['data']
         return None
     
+    def get_media_details(self, media_id: str) -> Optional[dict]:
+        """
+        Obtém os dados de uma mídia (post) específica
+        
+        Args:
+            media_id: ID do post
+            
+        Returns:
+            Dados da mídia ou None se não existe/falhou
+        """
+        return self._make_request(
+            method='GET',
+            endpoint=media_id,
+            params={'fields': MEDIA_FIELDS}
+        )
+    
+    def get_media_many(self, media_ids: list) -> Optional[dict]:
+        """
+        Obtém várias mídias em uma única chamada (`?ids=...`, até 50)
+        
+        A Graph API recusa a chamada inteira se algum ID não existir.
+        
+        Returns:
+            {ID: dados da mídia} ou None se falhou
+        """
+        return self._make_request(
+            method='GET',
+            endpoint='',
+            params={'ids': ','.join(media_ids), 'fields': MEDIA_FIELDS}
+        )
+    
+    def get_media_page(self, limit: int = 50, after: str = None, etag: str = None) -> Optional[GraphResponse]:
+        """
+        Uma página da lista de mídias (da mais nova para a mais antiga)
+        
+        Args:
+            limit: Mídias por página
+            after: Cursor da página anterior (None = primeira página)
+            etag: ETag da última resposta; se nada mudou a API responde
+                304 Not Modified, sem corpo
+            
+        Returns:
+            A resposta (body com `data` e `paging`, header ETag) ou None se falhou
+        """
+        params = {'fields': MEDIA_FIELDS, 'limit': limit}
+        if after:
+            params['after'] = after
+        return self._make_request(
+            method='GET',
+            endpoint=f"{self.instagram_account_id}/media",
+            params=params,
+            headers={'If-None-Match': etag} if etag else None,
+            raw=True
+        )
+    
     def get_media_comments(self, media_id: str, limit: int = 50) -> Optional[list]:
         """
         Lista os comentários de um post específico
@@ -166,6 +1463,44 @@ class InstagramAPI:
             return result['data']
         return None
     
+    def iter_media_comments(self, media_id: str, page_size: int = 50) -> Iterator[list]:
+        """
+        Percorre todos os comentários de um post, seguindo os cursores de paginação
+        As páginas são buscadas sob demanda: parar a iteração para a busca
+        
+        Args:
+            media_id: ID do post
+            page_size: Comentários por página
+            
+        Yields:
+            Lista de comentários de cada página (do mais novo para o mais antigo)
+            
+        Raises:
+            PagingError: se uma página falhar (mesmo após as retentativas)
+        """
+        params = {
+            'fields': 'id,text,username,timestamp,from',
+            'limit': page_size
+        }
+        
+        while True:
+            result = self._make_request(
+                method='GET',
+                endpoint=f"{media_id}/comments",
+                params=params
+            )
+            if not result or 'data' not in result:
+                raise PagingError(f"Falha ao listar comentários de {media_id}")
+            
+            if result['data']:
+                yield result['data']
+            
+            paging = result.get('paging') or {}
+            after = (paging.get('cursors') or {}).get('after')
+            if not paging.get('next') or not after:
+                return
+            params = dict(params, after=after)
+    
     # =========================================================================
     # MÉTODOS DE CONTA
     # =========================================================================
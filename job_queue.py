@@ -0,0 +1,348 @@
+"""
+Fila de Trabalho - Processamento assíncrono dos webhooks
+Permite responder ao Meta imediatamente enquanto workers em segundo plano
+fazem as chamadas (lentas) para a Graph API
+"""
+
+import os
+import time
+import queue
+import atexit
+import logging
+import threading
+import contextvars
+from collections import deque
+from typing import Callable, Hashable
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Marcador usado para encerrar os workers
+_STOP = object()
+
+QUEUE_WAIT = metrics.REGISTRY.histogram(
+    'igbot_queue_wait_seconds',
+    'Tempo entre enfileirar um trabalho e um worker começar a executá-lo',
+    ('queue',)
+)
+JOB_DURATION = metrics.REGISTRY.histogram(
+    'igbot_job_duration_seconds',
+    'Tempo de execução de cada trabalho da fila',
+    ('queue',)
+)
+
+
+class JobQueue:
+    """
+    Fila limitada com um pool de workers em background
+
+    Os workers são iniciados sob demanda no processo atual (após o fork do
+    gunicorn), então a mesma instância funciona com `gunicorn app:app`.
+    Cada trabalho roda com uma cópia das contextvars de quem o enviou
+    (ex: o ID de correlação dos logs).
+
+    Com `max_per_key`, no máximo esse número de trabalhos de uma mesma
+    chave (ex: a conta do Instagram) fica na fila ou em execução; os demais
+    esperam à parte e entram na fila quando um da mesma chave termina.
+    Assim uma conta em throttling ocupa só parte dos workers.
+    """
+
+    def __init__(self, num_workers: int = 4, max_size: int = 1000, name: str = 'jobs', max_per_key: int = 0):
+        self.num_workers = max(1, num_workers)
+        self.max_size = max(1, max_size)
+        self.name = name
+        self.max_per_key = max(0, max_per_key)
+
+        # O limite (max_size) é controlado em _pending; a fila interna não
+        # bloqueia, então um worker pode liberar um trabalho em espera
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._space = threading.Condition(self._lock)
+        self._threads = []
+        self._pid = None
+        self._accepting = True
+
+        # Trabalhos aceitos e ainda não concluídos (fila + espera + execução)
+        self._pending = 0
+        # Trabalhos na fila ou em execução por chave, e os que esperam a vez
+        self._active = {}
+        self._parked = {}
+
+        # Métricas
+        self.enqueued = 0
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.in_flight = 0
+        self.high_water = 0
+        self._total_wait = 0.0
+
+    def _ensure_started(self):
+        """Inicia os workers no processo atual (uma vez por PID)"""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+
+        with self._lock:
+            if self._pid == pid:
+                return
+
+            # Após um fork os threads do processo pai não existem mais
+            self._queue = queue.Queue()
+            self._threads = []
+            self.in_flight = 0
+            self._pending = 0
+            self._active = {}
+            self._parked = {}
+            self._accepting = True
+
+            for i in range(self.num_workers):
+                thread = threading.Thread(
+                    target=self._worker,
+                    name=f"{self.name}-worker-{i}",
+                    daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+            self._pid = pid
+            atexit.register(self.drain)
+            logger.info(f"⚙️ Fila '{self.name}' iniciada com {self.num_workers} workers (pid {pid})")
+
+    def submit(self, func: Callable, *args, timeout: float = 0, key: Hashable = None) -> bool:
+        """
+        Coloca um trabalho na fila
+
+        Args:
+            func: Função a ser executada pelo worker
+            *args: Argumentos da função
+            timeout: Tempo máximo (segundos) esperando vaga na fila
+            key: Chave do limite `max_per_key` (None = sem limite)
+
+        Returns:
+            True se enfileirado, False se a fila está cheia ou encerrando
+        """
+        self._ensure_started()
+
+        item = (func, args, time.monotonic(), contextvars.copy_context(), key)
+        deadline = time.monotonic() + timeout
+
+        with self._space:
+            while self._accepting and self._pending >= self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._space.wait(remaining)
+
+            if not self._accepting or self._pending >= self.max_size:
+                self.rejected += 1
+                full = self._accepting
+            else:
+                full = None
+                self._pending += 1
+                self.enqueued += 1
+                depth = self._pending - self.in_flight
+                if depth > self.high_water:
+                    self.high_water = depth
+
+                if key is not None and self.max_per_key:
+                    if self._active.get(key, 0) >= self.max_per_key:
+                        self._parked.setdefault(key, deque()).append(item)
+                        return True
+                    self._active[key] = self._active.get(key, 0) + 1
+                self._queue.put(item)
+
+        if full:
+            logger.warning(f"⚠️ Fila '{self.name}' cheia ({self.max_size}) - trabalho rejeitado")
+        return full is None
+
+    def _worker(self):
+        """Loop de cada worker: consome a fila até receber o marcador de parada"""
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                return
+
+            func, args, enqueued_at, context, key = item
+            started = time.monotonic()
+            with self._lock:
+                self.in_flight += 1
+                self._total_wait += started - enqueued_at
+            QUEUE_WAIT.observe(started - enqueued_at, self.name)
+
+            try:
+                context.run(func, *args)
+                failed = False
+            except Exception as e:
+                logger.error(f"Erro ao processar trabalho da fila '{self.name}': {e}")
+                failed = True
+            finally:
+                JOB_DURATION.observe(time.monotonic() - started, self.name)
+                with self._space:
+                    self.in_flight -= 1
+                    self.processed += 1
+                    self._pending -= 1
+                    if failed:
+                        self.failed += 1
+                    if key is not None and key in self._active:
+                        self._release_key(key)
+                    self._space.notify()
+                self._queue.task_done()
+
+    def _release_key(self, key: Hashable):
+        """Passa a vez da chave ao próximo trabalho em espera (chamado com o lock)"""
+        parked = self._parked.get(key)
+        if parked:
+            self._queue.put(parked.popleft())
+            if not parked:
+                del self._parked[key]
+            return
+        self._active[key] -= 1
+        if not self._active[key]:
+            del self._active[key]
+
+    def drain(self, timeout: float = None):
+        """
+        Para de aceitar trabalhos e espera a fila esvaziar
+
+        Args:
+            timeout: Tempo máximo de espera (padrão: QUEUE_DRAIN_TIMEOUT)
+        """
+        if self._pid != os.getpid() or not self._accepting:
+            return
+
+        if timeout is None:
+            timeout = float(os.getenv('QUEUE_DRAIN_TIMEOUT', 25))
+
+        with self._space:
+            self._accepting = False
+            # Quem espera vaga em submit() desiste agora
+            self._space.notify_all()
+        if self._pending:
+            logger.info(f"⏳ Drenando fila '{self.name}': {self._pending} trabalhos pendentes")
+
+        deadline = time.monotonic() + timeout
+        while self._pending and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        left = self._pending
+        if left:
+            logger.warning(f"⚠️ Fila '{self.name}' encerrada com {left} trabalhos não concluídos")
+            return
+
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        logger.info(f"✅ Fila '{self.name}' drenada")
+
+    def stats(self) -> dict:
+        """
+        Retorna as métricas da fila (profundidade, rejeições, etc.)
+
+        Returns:
+            Dicionário com as métricas atuais
+        """
+        with self._lock:
+            started = self.processed + self.in_flight
+            return {
+                'workers': self.num_workers,
+                'max_size': self.max_size,
+                'max_per_key': self.max_per_key,
+                'depth': self._pending - self.in_flight,
+                'waiting_turn': sum(len(parked) for parked in self._parked.values()),
+                'high_water': self.high_water,
+                'in_flight': self.in_flight,
+                'enqueued': self.enqueued,
+                'processed': self.processed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'avg_wait_ms': round(self._total_wait / started * 1000, 2) if started else 0.0,
+                'accepting': self._accepting
+            }
+
+
+class HoldingQueue:
+    """
+    Trabalhos adiados enquanto um recurso está fora do ar
+
+    Guarda os itens em memória (na ordem de chegada) até `release` devolvê-los
+    para `resubmit` (ex: a fila de workers, quando o circuito da Graph API
+    fecha). Nenhuma thread fica presa esperando o recurso voltar.
+    """
+
+    def __init__(self, resubmit: Callable[[object], bool], max_size: int = 10000, name: str = 'held'):
+        self.resubmit = resubmit
+        self.max_size = max(1, max_size)
+        self.name = name
+        self._items = deque()
+        self._lock = threading.Lock()
+
+        # Métricas
+        self.held = 0
+        self.released = 0
+        self.overflowed = 0
+
+    def hold(self, item) -> bool:
+        """Guarda um item (False se a espera está cheia)"""
+        with self._lock:
+            if len(self._items) >= self.max_size:
+                self.overflowed += 1
+                return False
+            self._items.append(item)
+            self.held += 1
+            return True
+
+    def release(self, limit: int = None, match: Callable[[object], bool] = None) -> int:
+        """
+        Devolve até `limit` itens (todos, se None) para `resubmit`
+
+        Com `match`, só os itens aceitos por ele saem (na ordem de chegada);
+        os outros continuam esperando. Um item recusado volta para o início
+        da espera, junto com os que ainda não foram devolvidos, e a liberação
+        para.
+
+        Returns:
+            Quantidade devolvida
+        """
+        with self._lock:
+            if match is None:
+                count = len(self._items) if limit is None else min(limit, len(self._items))
+                batch = [self._items.popleft() for _ in range(count)]
+            else:
+                batch, rest = [], deque()
+                for item in self._items:
+                    if (limit is None or len(batch) < limit) and match(item):
+                        batch.append(item)
+                    else:
+                        rest.append(item)
+                self._items = rest
+
+        released = 0
+        for item in batch:
+            try:
+                accepted = self.resubmit(item)
+            except Exception as e:
+                logger.error(f"Erro ao devolver item da espera '{self.name}': {e}")
+                accepted = False
+            if not accepted:
+                with self._lock:
+                    self._items.extendleft(reversed(batch[released:]))
+                break
+            released += 1
+        with self._lock:
+            self.released += released
+        return released
+
+    def __len__(self):
+        return len(self._items)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'size': len(self._items),
+                'max_size': self.max_size,
+                'held': self.held,
+                'released': self.released,
+                'overflowed': self.overflowed
+            }
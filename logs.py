@@ -0,0 +1,290 @@
+"""
+Logs - Pipeline de logging que não bloqueia o caminho dos webhooks
+Quem chama o logger só cria o registro e o coloca em uma fila; a formatação
+(texto ou JSON) e a escrita no stdout acontecem em uma thread separada,
+em lotes. Cada entrega de webhook recebe um ID de correlação que acompanha
+todos os logs dos seus comentários, inclusive nos workers da fila.
+
+Linhas de alto volume podem ser amostradas por tipo (`extra={'event': ...}`):
+a decisão é feita por entrega, então uma entrega amostrada aparece inteira.
+Avisos e erros nunca são amostrados.
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import random
+import logging
+import zlib
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+import metrics
+
+# Formato de texto (o mesmo do logging.basicConfig usado antes)
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Registros escritos por chamada de write()
+WRITE_BATCH = 256
+
+# Campos de contexto (entrega, comentário...) do request/trabalho atual
+_context = ContextVar('log_context', default={})
+
+# Handler instalado pelo configure() e se o ajuste global já foi feito
+# (gancho do fork e _srcfile: uma vez por processo, não a cada configure())
+_active: Optional['AsyncLogHandler'] = None
+_configured = False
+
+LOG_DROPPED = metrics.REGISTRY.counter(
+    'igbot_log_dropped_total',
+    'Registros de log descartados (amostragem ou fila cheia)',
+    ('reason',)
+)
+
+
+def new_delivery_id() -> str:
+    """ID de correlação para uma entrega de webhook"""
+    return os.urandom(6).hex()
+
+
+def current_context() -> Dict[str, str]:
+    """Campos de contexto ativos"""
+    return _context.get()
+
+
+@contextmanager
+def context(**fields):
+    """
+    Acrescenta campos ao contexto dos logs (ex: delivery, comment)
+    Trabalhos enviados para a JobQueue levam uma cópia do contexto
+    """
+    fields = {key: str(value) for key, value in fields.items() if value is not None}
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """Converte "evento=taxa,evento=taxa" (ex: comment_received=0.1)"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in (value or '').split(','))):
+        event, _, rate = item.partition('=')
+        rates[event.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+
+class TextFormatter(logging.Formatter):
+    """Formato de texto com o contexto no final ([delivery=... comment=...])"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = getattr(record, 'context', None)
+        if fields:
+            line += ' [' + ' '.join(f"{key}={value}" for key, value in fields.items()) + ']'
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """Um objeto JSON por linha, com os campos de contexto"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'pid': record.process,
+            'thread': record.threadName
+        }
+        event = getattr(record, 'event', None)
+        if event:
+            entry['event'] = event
+        entry.update(getattr(record, 'context', None) or {})
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class AsyncLogHandler(logging.Handler):
+    """
+    Handler que só enfileira os registros; uma thread por processo formata
+    e escreve em lotes
+
+    A mensagem (`msg % args`) também é montada na thread escritora, então
+    os argumentos passados ao logger devem ser valores que não mudam depois
+    (strings, números). Com a fila cheia, registros abaixo de WARNING são
+    descartados (e contados em igbot_log_dropped_total); avisos e erros
+    esperam vaga.
+    """
+
+    def __init__(
+        self,
+        stream=None,
+        queue_size: int = 10000,
+        sample_rates: Dict[str, float] = None,
+        level: int = logging.NOTSET
+    ):
+        super().__init__(level)
+        self.stream = stream
+        self.queue_size = max(1, queue_size)
+        self.sample_rates = dict(sample_rates or {})
+
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._start_lock = threading.Lock()
+        self._pid = None
+
+    # -------------------------------------------------------------------------
+    # Lado de quem chama o logger
+    # -------------------------------------------------------------------------
+
+    def _sampled_out(self, record: logging.LogRecord, fields: Dict[str, str]) -> bool:
+        rate = self.sample_rates.get(getattr(record, 'event', None))
+        if rate is None or record.levelno >= logging.WARNING:
+            return False
+        delivery = fields.get('delivery')
+        if delivery:
+            # Mesma decisão para todas as linhas da entrega
+            return zlib.crc32(delivery.encode()) % 10000 >= rate * 10000
+        return random.random() >= rate
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        # Sem o lock do Handler: a fila já é thread-safe
+        result = self.filter(record)
+        if not result:
+            return False
+        if isinstance(result, logging.LogRecord):
+            record = result
+        self.emit(record)
+        return True
+
+    def emit(self, record: logging.LogRecord):
+        fields = _context.get()
+        if self.sample_rates and self._sampled_out(record, fields):
+            LOG_DROPPED.inc('sampled')
+            return
+        record.context = fields
+
+        self._ensure_started()
+        try:
+            if record.levelno >= logging.WARNING:
+                self._queue.put(record, timeout=1)
+            else:
+                self._queue.put_nowait(record)
+        except queue.Full:
+            LOG_DROPPED.inc('queue_full')
+
+    # -------------------------------------------------------------------------
+    # Thread escritora
+    # -------------------------------------------------------------------------
+
+    def _ensure_started(self):
+        """Inicia a thread escritora no processo atual (uma vez por PID)"""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._start_lock:
+            if self._pid == pid:
+                return
+            # Após um fork a thread do processo pai não existe mais
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            threading.Thread(target=self._run, name='log-writer', daemon=True).start()
+            self._pid = pid
+            atexit.register(self.flush)
+
+    def _run(self):
+        records = self._queue
+        while True:
+            batch = [records.get()]
+            while len(batch) < WRITE_BATCH:
+                try:
+                    batch.append(records.get_nowait())
+                except queue.Empty:
+                    break
+            self._write(batch)
+            for _ in batch:
+                records.task_done()
+
+    def _write(self, batch: list):
+        lines = []
+        for record in batch:
+            try:
+                lines.append(self.format(record))
+            except Exception:
+                self.handleError(record)
+        if not lines:
+            return
+        stream = self.stream or sys.stdout
+        try:
+            stream.write('\n'.join(lines) + '\n')
+            stream.flush()
+        except Exception:
+            self.handleError(batch[-1])
+
+    def flush(self, timeout: float = 5):
+        """Espera os registros já enfileirados serem escritos"""
+        if self._pid != os.getpid():
+            return
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def _after_fork(self):
+        # A fila do pai pode estar com o lock preso por outra thread
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._start_lock = threading.Lock()
+        self._pid = None
+
+
+def configure(
+    level='INFO',
+    fmt: str = 'text',
+    sample_rates: Dict[str, float] = None,
+    queue_size: int = 10000,
+    stream=None
+) -> AsyncLogHandler:
+    """
+    Substitui os handlers do logger raiz pelo AsyncLogHandler
+
+    Args:
+        level: Nível mínimo (nome ou número)
+        fmt: `text` (formato de sempre) ou `json`
+        sample_rates: Fração mantida de cada tipo de linha (evento -> 0..1)
+        queue_size: Registros aguardando a escrita antes de descartar INFO/DEBUG
+        stream: Onde escrever (padrão: stdout)
+    """
+    handler = AsyncLogHandler(stream=stream, queue_size=queue_size, sample_rates=sample_rates)
+    handler.setFormatter(JsonFormatter() if fmt == 'json' else TextFormatter(TEXT_FORMAT))
+
+    global _active, _configured
+    _active = handler
+    if not _configured:
+        # Nenhum formato usa arquivo/linha de origem: evita percorrer a pilha a
+        # cada registro (otimização descrita na documentação do logging)
+        logging._srcfile = None
+        logging.logMultiprocessing = False
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=_after_fork)
+        _configured = True
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+        if isinstance(existing, AsyncLogHandler):
+            existing.flush()
+    root.addHandler(handler)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    return handler
+
+
+def _after_fork():
+    """Gancho do fork (registrado uma vez): só o handler atual é reiniciado"""
+    if _active is not None:
+        _active._after_fork()
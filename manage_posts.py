@@ -1,64 +1,158 @@
 """
 Utilitário para gerenciar posts monitorados
-Execute: python manage_posts.py
+Execute: python manage_posts.py (menu interativo)
+         python manage_posts.py import campanhas.csv [--check] [--replace]
+         python manage_posts.py export campanhas.jsonl
 """
 
 import os
+import sys
 import json
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from instagram_api import InstagramAPI
+from campaigns import load_campaign_file, save_campaign_file
+from campaign_io import FORMATS, detect_format, read_campaigns, write_campaigns
+from media_cache import MediaCache
 
 load_dotenv()
 
 ACCESS_TOKEN = os.getenv('ACCESS_TOKEN', '')
 INSTAGRAM_ACCOUNT_ID = os.getenv('INSTAGRAM_ACCOUNT_ID', '')
+GRAPH_API_URL = os.getenv('GRAPH_API_URL') or None
 
-# Arquivo para salvar configurações dos posts
-CONFIG_FILE = 'monitored_posts.json'
+# Arquivo para salvar configurações dos posts (lido automaticamente pelo app.py)
+CONFIG_FILE = os.getenv('MONITORED_POSTS_FILE', 'monitored_posts.json')
+
+# Cache local dos seus posts (lista, busca por legenda)
+MEDIA_CACHE_FILE = os.getenv('MEDIA_CACHE_FILE', 'media_cache.json')
+MEDIA_CACHE_TTL = float(os.getenv('MEDIA_CACHE_TTL', 300))
+
+# IDs por chamada ao conferir posts na API (máximo da Graph API: 50)
+CHECK_GROUP_SIZE = 50
 
 
 def load_config() -> dict:
     """Carrega configurações salvas"""
-    if os.path.exists(CONFIG_FILE):
-        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
+    return load_campaign_file(CONFIG_FILE)
 
 
-def save_config(config: dict):
-    """Salva configurações"""
-    with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-        json.dump(config, f, indent=2, ensure_ascii=False)
+def save_config(config: dict, indent: int = 2):
+    """Salva configurações (o app.py em execução recarrega sozinho)"""
+    save_campaign_file(config, CONFIG_FILE, indent=indent)
     print(f"✅ Configurações salvas em {CONFIG_FILE}")
 
 
-def list_posts():
-    """Lista seus posts recentes do Instagram"""
+_api = None
+_media_cache = None
+
+
+def get_api() -> InstagramAPI:
+    """Cliente da API compartilhado por todas as ações do menu (mesmo pool de conexões)"""
+    global _api
+    if _api is None:
+        _api = InstagramAPI(ACCESS_TOKEN, INSTAGRAM_ACCOUNT_ID, base_url=GRAPH_API_URL)
+    return _api
+
+
+def get_media_cache() -> MediaCache:
+    """Cache em disco das mídias da conta"""
+    global _media_cache
+    if _media_cache is None:
+        _media_cache = MediaCache(INSTAGRAM_ACCOUNT_ID, MEDIA_CACHE_FILE, MEDIA_CACHE_TTL)
+    return _media_cache
+
+
+def run_concurrently(**calls) -> dict:
+    """Executa consultas independentes à API ao mesmo tempo"""
+    with ThreadPoolExecutor(max_workers=len(calls)) as pool:
+        futures = {name: pool.submit(call) for name, call in calls.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+
+def refresh_media(full: bool = False) -> MediaCache:
+    """Atualiza o cache de mídias (revalida só depois do TTL)"""
+    cache = get_media_cache()
+    if cache.fresh and not full:
+        return cache
+    print("\n🔄 Atualizando cache de posts..." if cache else "\n🔄 Baixando seus posts (só na primeira vez)...")
+    new = cache.refresh(get_api(), full=full)
+    if new is None:
+        print("⚠️ Falha ao consultar a API - usando os posts salvos no cache")
+    elif new:
+        print(f"✅ {new} post(s) novo(s) - {len(cache)} no cache")
+    return cache
+
+
+def print_posts(posts: list, start: int = 1):
+    """Imprime uma lista de posts"""
+    for i, post in enumerate(posts, start):
+        caption = post.get('caption') or 'Sem legenda'
+        # Truncar legenda se muito longa
+        if len(caption) > 50:
+            caption = caption[:50] + "..."
+        
+        print(f"{i}. ID: {post['id']}")
+        print(f"   Tipo: {post.get('media_type') or 'N/A'}")
+        print(f"   Legenda: {caption}")
+        print(f"   Link: {post.get('permalink') or 'N/A'}")
+        print("-" * 80)
+
+
+def list_posts(page_size: int = 10):
+    """Lista seus posts do Instagram (do cache, 10 por vez)"""
     if not ACCESS_TOKEN or not INSTAGRAM_ACCOUNT_ID:
         print("❌ Configure ACCESS_TOKEN e INSTAGRAM_ACCOUNT_ID no arquivo .env")
         return
     
-    api = InstagramAPI(ACCESS_TOKEN, INSTAGRAM_ACCOUNT_ID)
-    posts = api.get_media_list(limit=10)
+    posts = refresh_media().media
     
     if not posts:
         print("❌ Não foi possível obter posts. Verifique seu token.")
         return
     
-    print("\n📸 Seus posts recentes:\n")
+    print(f"\n📸 Seus posts ({len(posts)}):\n")
     print("-" * 80)
     
-    for i, post in enumerate(posts, 1):
-        caption = post.get('caption', 'Sem legenda')
-        # Truncar legenda se muito longa
-        if len(caption) > 50:
-            caption = caption[:50] + "..."
-        
-        print(f"{i}. ID: {post['id']}")
-        print(f"   Tipo: {post.get('media_type', 'N/A')}")
-        print(f"   Legenda: {caption}")
-        print(f"   Link: {post.get('permalink', 'N/A')}")
-        print("-" * 80)
+    for start in range(0, len(posts), page_size):
+        print_posts(posts[start:start + page_size], start + 1)
+        if start + page_size >= len(posts):
+            break
+        if input("Enter para ver mais, 'q' para voltar: ").strip().lower() == 'q':
+            break
+
+
+def search_posts(text: str = None) -> list:
+    """Busca posts pela legenda (offline, no cache)"""
+    if not ACCESS_TOKEN or not INSTAGRAM_ACCOUNT_ID:
+        print("❌ Configure ACCESS_TOKEN e INSTAGRAM_ACCOUNT_ID no arquivo .env")
+        return []
+    
+    if text is None:
+        text = input("\n🔎 Texto da legenda: ").strip()
+    if not text:
+        return []
+    
+    found = refresh_media().search(text)
+    if not found:
+        print(f"❌ Nenhum post com \"{text}\" na legenda")
+        return []
+    
+    print(f"\n🔎 {len(found)} post(s) com \"{text}\":\n")
+    print("-" * 80)
+    print_posts(found)
+    return found
+
+
+def update_media_cache():
+    """Baixa todos os posts de novo (pega legendas editadas e posts apagados)"""
+    if not ACCESS_TOKEN or not INSTAGRAM_ACCOUNT_ID:
+        print("❌ Configure ACCESS_TOKEN e INSTAGRAM_ACCOUNT_ID no arquivo .env")
+        return
+    
+    cache = refresh_media(full=True)
+    print(f"✅ Cache atualizado: {len(cache)} posts")
 
 
 def add_post():
@@ -67,11 +161,17 @@ def add_post():
     
     print("\n➕ Adicionar post para monitoramento\n")
     
-    post_id = input("ID do post (use 'list' para ver seus posts): ").strip()
+    post_id = input("ID do post ('list' para ver seus posts, ou um trecho da legenda para buscar): ").strip()
     
     if post_id.lower() == 'list':
         list_posts()
         post_id = input("\nAgora digite o ID do post: ").strip()
+    elif post_id and not post_id.isdigit():
+        found = search_posts(post_id)
+        if len(found) == 1 and input("Usar este post? (S/n): ").strip().lower() in ('', 's', 'sim'):
+            post_id = found[0]['id']
+        else:
+            post_id = input("\nAgora digite o ID do post: ").strip()
     
     if not post_id:
         print("❌ ID inválido")
@@ -84,11 +184,17 @@ def add_post():
     comment_reply = input("Resposta ao comentário: ").strip() or None
     dm_message = input("Mensagem de DM: ").strip() or None
     
+    print("\n🎯 Responder só comentários com estas palavras (ex: link, quero, eu)")
+    print("(Deixe em branco para responder todos; acentos e maiúsculas não importam)\n")
+    keywords = [word.strip() for word in input("Palavras-chave (separadas por vírgula): ").split(',') if word.strip()]
+    
     config[post_id] = {
         "comment_reply": comment_reply,
         "dm_message": dm_message,
         "enabled": True
     }
+    if keywords:
+        config[post_id]["keywords"] = keywords
     
     save_config(config)
     print(f"\n✅ Post {post_id} adicionado com sucesso!")
@@ -137,6 +243,8 @@ def generate_code():
         print("❌ Nenhum post configurado")
         return
     
+    print(f"\n💡 O app.py já carrega {CONFIG_FILE} automaticamente, sem reiniciar.")
+    print("   Use este código apenas se quiser fixar os posts no próprio app.py.")
     print("\n📝 Cole este código no seu app.py (substitua MONITORED_POSTS):\n")
     print("MONITORED_POSTS = {")
     
@@ -158,10 +266,11 @@ def test_connection():
     
     print("\n🔍 Testando conexão...\n")
     
-    api = InstagramAPI(ACCESS_TOKEN, INSTAGRAM_ACCOUNT_ID)
+    api = get_api()
     
-    # Testar info da conta
-    info = api.get_account_info()
+    # Info da conta e permissões são independentes: buscadas ao mesmo tempo
+    results = run_concurrently(info=api.get_account_info, perms=api.verify_permissions)
+    info, perms = results['info'], results['perms']
     if info:
         print(f"✅ Conectado como: @{info.get('username', 'N/A')}")
         print(f"   Nome: {info.get('name', 'N/A')}")
@@ -173,7 +282,6 @@ def test_connection():
     
     # Verificar permissões
     print("\n📋 Verificando permissões...")
-    perms = api.verify_permissions()
     
     required_perms = [
         'instagram_basic',
@@ -188,7 +296,143 @@ def test_connection():
         print(f"   {emoji} {perm}: {status}")
 
 
-def main():
+# =============================================================================
+# IMPORTAÇÃO E EXPORTAÇÃO EM MASSA (sem menu, para scripts)
+# =============================================================================
+
+def check_post_ids(post_ids: list, concurrency: int = 8) -> list:
+    """
+    Confere na API se os posts existem
+
+    Os posts da conta vêm do cache de mídias (atualizado antes). Os IDs que
+    não estão nele são consultados em grupos de 50 por chamada, vários
+    grupos ao mesmo tempo; se a API recusar um grupo (algum ID não existe),
+    os IDs dele são consultados um a um.
+
+    Returns:
+        IDs que não existem (ou não puderam ser consultados)
+    """
+    cache = get_media_cache()
+    cache.refresh(get_api(), force=True)
+    unknown = [post_id for post_id in post_ids if cache.get(post_id) is None]
+    if not unknown:
+        return []
+    
+    print(f"🔎 Consultando {len(unknown)} post(s) fora do cache da conta...", file=sys.stderr)
+    api = get_api()
+    
+    def check_group(group: list) -> list:
+        found = api.get_media_many(group)
+        if found is not None:
+            return [post_id for post_id in group if post_id not in found]
+        return [post_id for post_id in group if not api.get_media_details(post_id)]
+    
+    groups = [unknown[start:start + CHECK_GROUP_SIZE] for start in range(0, len(unknown), CHECK_GROUP_SIZE)]
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        return [post_id for missing in pool.map(check_group, groups) for post_id in missing]
+
+
+def import_campaigns(args) -> int:
+    """Importa campanhas de um CSV/JSONL (gravadas de uma vez, no fim)"""
+    fmt = args.format or detect_format(args.file)
+    errors = [] if args.skip_invalid else None
+    imported = {}
+    rows = 0
+    
+    try:
+        stream = sys.stdin if args.file == '-' else open(args.file, 'r', encoding='utf-8', newline='')
+    except OSError as e:
+        print(f"❌ Não foi possível abrir {args.file}: {e}", file=sys.stderr)
+        return 1
+    try:
+        for post_id, campaign in read_campaigns(stream, fmt, errors):
+            imported[post_id] = campaign
+            rows += 1
+    except ValueError as e:
+        print(f"❌ {e} - nada foi gravado (use --skip-invalid para pular linhas inválidas)", file=sys.stderr)
+        return 1
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    
+    for error in (errors or [])[:20]:
+        print(f"⚠️ Ignorada: {error}", file=sys.stderr)
+    if errors and len(errors) > 20:
+        print(f"⚠️ ... e mais {len(errors) - 20} linha(s) inválida(s)", file=sys.stderr)
+    
+    if args.check and imported:
+        if not ACCESS_TOKEN or not INSTAGRAM_ACCOUNT_ID:
+            print("❌ Configure ACCESS_TOKEN e INSTAGRAM_ACCOUNT_ID no arquivo .env para usar --check", file=sys.stderr)
+            return 1
+        missing = check_post_ids(list(imported), args.concurrency)
+        for post_id in missing[:20]:
+            print(f"⚠️ Post {post_id} não encontrado na API", file=sys.stderr)
+        if missing and not args.skip_invalid:
+            print(f"❌ {len(missing)} post(s) não encontrado(s) - nada foi gravado", file=sys.stderr)
+            return 1
+        for post_id in missing:
+            del imported[post_id]
+    
+    config = {} if args.replace else load_config()
+    added = sum(1 for post_id in imported if post_id not in config)
+    config.update(imported)
+    
+    summary = (
+        f"{len(imported)} campanha(s) de {rows} linha(s) válida(s): {added} nova(s), "
+        f"{len(imported) - added} atualizada(s)" + (f", {len(errors)} inválida(s)" if errors else "")
+    )
+    if args.dry_run:
+        print(f"🧪 Simulação: {summary} - nada foi gravado")
+        return 0
+    
+    save_config(config, indent=None if args.compact else 2)
+    print(f"✅ {summary} ({len(config)} no total)")
+    return 0
+
+
+def export_campaigns(args) -> int:
+    """Exporta as campanhas para CSV/JSONL"""
+    fmt = args.format or detect_format(args.file)
+    config = load_config()
+    
+    stream = sys.stdout if args.file == '-' else open(args.file, 'w', encoding='utf-8', newline='')
+    try:
+        written, dropped = write_campaigns(config.items(), stream, fmt)
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+    
+    if dropped:
+        print(f"⚠️ Campos fora do CSV (use JSONL para mantê-los): {', '.join(sorted(dropped))}", file=sys.stderr)
+    if stream is not sys.stdout:
+        print(f"✅ {written} campanha(s) exportada(s) para {args.file}")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Gerencia os posts monitorados (sem argumentos: menu interativo)')
+    subcommands = parser.add_subparsers(dest='command')
+    
+    importer = subcommands.add_parser('import', help='importa campanhas de um CSV ou JSONL')
+    importer.add_argument('file', help='arquivo .csv ou .jsonl (- para ler da entrada padrão)')
+    importer.add_argument('--format', choices=FORMATS, help='formato (padrão: pela extensão, ou jsonl)')
+    importer.add_argument('--replace', action='store_true', help='substitui todas as campanhas (padrão: mescla)')
+    importer.add_argument('--check', action='store_true', help='confere na API se os posts existem')
+    importer.add_argument('--concurrency', type=int, default=8, help='consultas à API ao mesmo tempo (--check)')
+    importer.add_argument('--skip-invalid', action='store_true', help='pula linhas/posts inválidos em vez de abortar')
+    importer.add_argument('--compact', action='store_true', help=f"grava o {CONFIG_FILE} sem indentação (mais rápido)")
+    importer.add_argument('--dry-run', action='store_true', help='só valida, sem gravar')
+    importer.set_defaults(handler=import_campaigns)
+    
+    exporter = subcommands.add_parser('export', help='exporta as campanhas para CSV ou JSONL')
+    exporter.add_argument('file', nargs='?', default='-', help='arquivo .csv ou .jsonl (padrão: saída padrão)')
+    exporter.add_argument('--format', choices=FORMATS, help='formato (padrão: pela extensão, ou jsonl)')
+    exporter.set_defaults(handler=export_campaigns)
+    
+    return parser
+
+
+def menu():
     """Menu principal"""
     while True:
         print("\n" + "=" * 50)
@@ -200,6 +444,8 @@ def main():
         print("4. Ver configuração atual")
         print("5. Gerar código para app.py")
         print("6. Testar conexão com API")
+        print("7. Buscar post pela legenda")
+        print("8. Atualizar cache de posts")
         print("0. Sair\n")
         
         choice = input("Escolha uma opção: ").strip()
@@ -216,6 +462,10 @@ def main():
             generate_code()
         elif choice == '6':
             test_connection()
+        elif choice == '7':
+            search_posts()
+        elif choice == '8':
+            update_media_cache()
         elif choice == '0':
             print("\n👋 Até mais!")
             break
@@ -223,5 +473,13 @@ def main():
             print("❌ Opção inválida")
 
 
+def main(argv: list = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command is None:
+        menu()
+        return 0
+    return args.handler(args)
+
+
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
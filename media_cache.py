@@ -0,0 +1,203 @@
+"""
+Cache de mídias - Lista de posts da conta guardada em disco
+Usado pelo manage_posts.py: listar, buscar e escolher posts sem buscar
+tudo de novo na Graph API a cada ação.
+
+- Dentro do TTL nenhuma requisição é feita
+- Depois do TTL a primeira página é revalidada com o ETag
+  (304 Not Modified = nada mudou, sem baixar a lista)
+- Se mudou, só as mídias novas são buscadas: a paginação para no
+  primeiro post que já está no cache
+- A busca nas legendas é feita offline, no cache
+
+Posts antigos editados ou apagados só aparecem na atualização completa
+(`refresh(api, full=True)`).
+"""
+
+import os
+import json
+import time
+import logging
+import tempfile
+from typing import List, Optional
+
+from triggers import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Arquivo do cache (um bloco por conta) e tempo sem revalidar (segundos)
+CACHE_FILE = 'media_cache.json'
+CACHE_TTL = 300
+
+# Mídias por página na Graph API
+PAGE_SIZE = 50
+
+# Campos guardados de cada mídia
+CACHED_FIELDS = ('id', 'caption', 'media_type', 'permalink', 'timestamp')
+
+
+class MediaCache:
+    """
+    Mídias de uma conta (da mais nova para a mais antiga)
+
+    Args:
+        account_id: Conta dona das mídias
+        path: Arquivo do cache (compartilhado entre contas)
+        ttl: Segundos em que o cache vale sem consultar a API
+    """
+
+    def __init__(self, account_id: str, path: str = CACHE_FILE, ttl: float = CACHE_TTL, page_size: int = PAGE_SIZE):
+        self.account_id = account_id
+        self.path = path
+        self.ttl = ttl
+        self.page_size = page_size
+        self.media: List[dict] = []
+        self.etag: Optional[str] = None
+        self.fetched_at = 0.0
+        self._captions: List[str] = []
+        self._by_id = {}
+        self.load()
+
+    # -------------------------------------------------------------------------
+    # Arquivo
+    # -------------------------------------------------------------------------
+
+    def _read_file(self) -> dict:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Cache de mídias ilegível ({e}) - será refeito")
+            return {}
+
+    def load(self):
+        """Carrega o bloco desta conta do arquivo"""
+        entry = self._read_file().get(self.account_id) or {}
+        self._set_media(entry.get('media') or [])
+        self.etag = entry.get('etag')
+        self.fetched_at = float(entry.get('fetched_at') or 0)
+
+    def save(self):
+        """Grava o cache de forma atômica, preservando as outras contas"""
+        data = self._read_file()
+        data[self.account_id] = {
+            'fetched_at': self.fetched_at,
+            'etag': self.etag,
+            'media': self.media
+        }
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix='.media_cache.', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def _set_media(self, media: List[dict]):
+        self.media = media
+        # Legendas normalizadas uma vez para a busca
+        self._captions = [normalize_text(item.get('caption') or '') for item in media]
+        self._by_id = {item['id']: item for item in media}
+
+    # -------------------------------------------------------------------------
+    # Atualização
+    # -------------------------------------------------------------------------
+
+    @property
+    def age(self) -> float:
+        """Segundos desde a última consulta à API"""
+        return time.time() - self.fetched_at
+
+    @property
+    def fresh(self) -> bool:
+        return bool(self.fetched_at) and self.age < self.ttl
+
+    def refresh(self, api, force: bool = False, full: bool = False) -> Optional[int]:
+        """
+        Atualiza o cache com a Graph API
+
+        Args:
+            api: InstagramAPI da conta
+            force: Revalida mesmo dentro do TTL
+            full: Baixa todas as mídias de novo (pega edições e exclusões)
+
+        Returns:
+            Número de mídias novas (0 = nada mudou) ou None se a API falhou
+            (o cache antigo continua disponível)
+        """
+        if self.fresh and not (force or full):
+            return 0
+
+        known = set() if full else self._by_id.keys()
+        response = api.get_media_page(self.page_size, etag=self.etag if known else None)
+        if response is None:
+            logger.warning("⚠️ Não foi possível atualizar o cache de mídias - usando a versão salva")
+            return None
+
+        if response.status == 304:
+            self.fetched_at = time.time()
+            self.save()
+            return 0
+
+        etag = response.headers.get('ETag')
+        fetched, seen_known = [], False
+        while True:
+            body = response.body or {}
+            for item in body.get('data') or ():
+                seen_known = seen_known or item.get('id') in known
+                fetched.append({field: item.get(field) for field in CACHED_FIELDS})
+            paging = body.get('paging') or {}
+            after = (paging.get('cursors') or {}).get('after')
+            # Paginação para na primeira página que já tem posts conhecidos
+            if seen_known or not paging.get('next') or not after:
+                break
+            response = api.get_media_page(self.page_size, after=after)
+            if response is None:
+                # Guardar só parte das novas deixaria um buraco no cache
+                logger.warning("⚠️ Falha no meio da paginação - usando a versão salva do cache")
+                return None
+
+        fetched_ids = {item['id'] for item in fetched}
+        new = len(fetched_ids - known)
+        if full:
+            media = fetched
+        else:
+            media = fetched + [item for item in self.media if item['id'] not in fetched_ids]
+        self._set_media(media)
+        self.etag = etag
+        self.fetched_at = time.time()
+        self.save()
+        return new
+
+    # -------------------------------------------------------------------------
+    # Consultas (offline)
+    # -------------------------------------------------------------------------
+
+    def get(self, media_id: str) -> Optional[dict]:
+        """Mídia pelo ID (None se não está no cache)"""
+        return self._by_id.get(media_id)
+
+    def search(self, text: str, limit: int = None) -> List[dict]:
+        """
+        Mídias cuja legenda contém todas as palavras do texto
+        (sem diferenciar acentos e maiúsculas), da mais nova para a mais antiga
+        """
+        words = normalize_text(text).split()
+        if not words:
+            return []
+        found = []
+        for item, caption in zip(self.media, self._captions):
+            if all(word in caption for word in words):
+                found.append(item)
+                if limit and len(found) >= limit:
+                    break
+        return found
+
+    def __len__(self):
+        return len(self.media)
@@ -0,0 +1,432 @@
+"""
+Métricas - Contadores, histogramas e gauges no formato de texto do Prometheus
+Registrar um valor custa só uma trava e uma soma em memória; nada é feito
+no disco durante o request.
+
+Com vários workers do gunicorn, cada processo publica periodicamente um
+retrato das suas métricas em um diretório compartilhado. A rota /metrics
+(em qualquer worker) soma os retratos de todos. Os contadores de workers
+que morreram são guardados em um arquivo de arquivo morto, então os totais
+nunca diminuem quando o gunicorn recicla um worker.
+"""
+
+import os
+import json
+import time
+import atexit
+import logging
+import tempfile
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Sequence
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava entre processos
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Limites padrão dos histogramas de latência (segundos)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Content-Type da exposição em texto do Prometheus
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+ARCHIVE_FILE = 'archive.json'
+
+
+class _Metric:
+    """Base das métricas: valores por combinação de labels"""
+
+    kind = ''
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def reset(self):
+        """Zera os valores (processo filho após o fork)"""
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def export(self) -> dict:
+        with self._lock:
+            values = [[list(labels), value] for labels, value in self._values.items()]
+        return {'type': self.kind, 'help': self.help, 'labelnames': list(self.labelnames), 'values': values}
+
+
+class Counter(_Metric):
+    """Contador que só aumenta"""
+
+    kind = 'counter'
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    """
+    Valor instantâneo (somado entre os workers vivos)
+
+    Com `function`, o valor é lido na hora da publicação (ex: tamanho da
+    fila); ela pode retornar um número ou um dicionário labels -> valor.
+    """
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), function: Callable = None):
+        super().__init__(name, help, labelnames)
+        self.function = function
+
+    def set(self, value: float, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def export(self) -> dict:
+        exported = super().export()
+        if self.function is not None:
+            try:
+                value = self.function()
+            except Exception as e:
+                logger.error(f"Erro ao ler a métrica {self.name}: {e}")
+                value = {}
+            items = value.items() if isinstance(value, dict) else [((), value)]
+            exported['values'].extend([list(labels), number] for labels, number in items)
+        return exported
+
+
+class Histogram(_Metric):
+    """
+    Distribuição de valores (latências) em faixas fixas
+
+    Cada série guarda a contagem de cada faixa (não acumulada) e a soma;
+    o acúmulo do formato do Prometheus é feito só na exposição.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._size = len(self.buckets) + 1
+
+    def observe(self, value: float, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [0] * self._size + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def export(self) -> dict:
+        with self._lock:
+            values = [[list(labels), list(series)] for labels, series in self._values.items()]
+        return {
+            'type': self.kind,
+            'help': self.help,
+            'labelnames': list(self.labelnames),
+            'buckets': list(self.buckets),
+            'values': values
+        }
+
+
+def _merge(total: Dict[str, dict], snapshot: Dict[str, dict], gauges: bool = True):
+    """Soma um retrato de métricas ao total (labels -> valor)"""
+    for name, metric in snapshot.items():
+        if metric['type'] == 'gauge' and not gauges:
+            continue
+        merged = total.get(name)
+        if merged is None:
+            merged = total[name] = {key: value for key, value in metric.items() if key != 'values'}
+            merged['values'] = {}
+        elif metric.get('buckets') != merged.get('buckets'):
+            # Limites alterados entre versões: as contagens não são comparáveis
+            continue
+
+        values = merged['values']
+        for labels, value in metric['values']:
+            labels = tuple(labels)
+            current = values.get(labels)
+            if current is None:
+                values[labels] = list(value) if isinstance(value, list) else value
+            elif isinstance(value, list):
+                values[labels] = [a + b for a, b in zip(current, value)]
+            else:
+                values[labels] = current + value
+
+
+def _to_snapshot(total: Dict[str, dict]) -> Dict[str, dict]:
+    """Converte o total (labels em tuplas) de volta para o formato JSON"""
+    return {
+        name: dict(metric, values=[[list(labels), value] for labels, value in metric['values'].items()])
+        for name, metric in total.items()
+    }
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+def _format_labels(labelnames, labels, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labels)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def render(total: Dict[str, dict]) -> str:
+    """Gera a exposição em texto do Prometheus"""
+    lines = []
+    for name in sorted(total):
+        metric = total[name]
+        labelnames = metric['labelnames']
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+
+        for labels, value in sorted(metric['values'].items()):
+            if metric['type'] != 'histogram':
+                lines.append(f"{name}{_format_labels(labelnames, labels)} {_format_value(value)}")
+                continue
+
+            cumulative = 0
+            for bound, count in zip(metric['buckets'] + ['+Inf'], value[:-1]):
+                cumulative += count
+                le = f'le="{bound if bound == "+Inf" else repr(float(bound))}"'
+                lines.append(f"{name}_bucket{_format_labels(labelnames, labels, le)} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labelnames, labels)} {_format_value(value[-1])}")
+            lines.append(f"{name}_count{_format_labels(labelnames, labels)} {cumulative}")
+
+    return '\n'.join(lines) + '\n'
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class Registry:
+    """
+    Conjunto de métricas do processo, publicado em `directory`
+
+    O diretório padrão é único por master do gunicorn (os workers são
+    filhos do mesmo processo), e é resolvido só quando a publicação começa,
+    já dentro do worker.
+    """
+
+    def __init__(self, directory: Optional[str] = None, interval: float = 5.0):
+        self.directory = directory
+        self.interval = interval
+
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self._pid = None
+        self._path = None
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = (), function: Callable = None) -> Gauge:
+        return self._register(Gauge(name, help, labelnames, function))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Valores atuais deste processo"""
+        return {name: metric.export() for name, metric in list(self._metrics.items())}
+
+    def _after_fork(self):
+        """O filho começa do zero (os valores do pai já são publicados por ele)"""
+        for metric in self._metrics.values():
+            metric.reset()
+        self._lock = threading.Lock()
+        self._pid = None
+
+    # -------------------------------------------------------------------------
+    # Publicação entre processos
+    # -------------------------------------------------------------------------
+
+    def _resolve_directory(self) -> str:
+        if self.directory:
+            return self.directory
+        return os.path.join(tempfile.gettempdir(), f"igbot-metrics-{os.getppid()}")
+
+    def start(self):
+        """Inicia a publicação periódica no processo atual (uma vez por PID)"""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+
+        with self._lock:
+            if self._pid == pid:
+                return
+
+            directory = self._resolve_directory()
+            os.makedirs(directory, exist_ok=True)
+            self.directory = directory
+            self._path = os.path.join(directory, f"{pid}.json")
+
+            # Arquivo de um processo morto que tinha o mesmo PID
+            if os.path.exists(self._path):
+                with self._file_lock():
+                    self._archive([self._path])
+
+            threading.Thread(target=self._publish_loop, name='metrics-publisher', daemon=True).start()
+            self._pid = pid
+            atexit.register(self.publish)
+
+    def _publish_loop(self):
+        while True:
+            try:
+                self.publish()
+            except Exception as e:
+                logger.error(f"Erro ao publicar as métricas: {e}")
+            time.sleep(self.interval)
+
+    def publish(self):
+        """Grava o retrato deste processo (substituição atômica)"""
+        if self._pid != os.getpid():
+            return
+        data = json.dumps({'pid': self._pid, 'metrics': self.snapshot()})
+        fd, tmp_path = tempfile.mkstemp(prefix='.metrics.', suffix='.tmp', dir=self.directory)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(data)
+            os.replace(tmp_path, self._path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    @contextmanager
+    def _file_lock(self):
+        """Trava entre processos durante a consolidação dos arquivos"""
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.directory, '.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _read(path: str) -> Optional[dict]:
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            logger.warning(f"⚠️ Métricas ilegíveis em {path} - ignorando")
+            return None
+
+    def _archive(self, paths):
+        """Move os contadores de processos mortos para o arquivo morto (com a trava)"""
+        archive_path = os.path.join(self.directory, ARCHIVE_FILE)
+        archive = self._read(archive_path) or {'metrics': {}}
+        total = {}
+        _merge(total, archive['metrics'])
+        for path in paths:
+            data = self._read(path)
+            if data is not None:
+                _merge(total, data['metrics'], gauges=False)
+
+        fd, tmp_path = tempfile.mkstemp(prefix='.metrics.', suffix='.tmp', dir=self.directory)
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'metrics': _to_snapshot(total)}, f)
+        os.replace(tmp_path, archive_path)
+        for path in paths:
+            os.unlink(path)
+
+    def collect(self) -> Dict[str, dict]:
+        """
+        Soma as métricas de todos os processos
+        Gauges só contam de processos vivos com retrato recente.
+        """
+        self.start()
+        self.publish()
+
+        total = {}
+        with self._file_lock():
+            live = []
+            dead = []
+            for filename in os.listdir(self.directory):
+                stem, ext = os.path.splitext(filename)
+                if ext != '.json' or not stem.isdigit():
+                    continue
+                path = os.path.join(self.directory, filename)
+                (live if _pid_alive(int(stem)) else dead).append(path)
+
+            if dead:
+                self._archive(dead)
+
+            archive = self._read(os.path.join(self.directory, ARCHIVE_FILE))
+            if archive is not None:
+                _merge(total, archive['metrics'])
+
+            fresh_after = time.time() - 3 * self.interval
+            for path in live:
+                data = self._read(path)
+                if data is None:
+                    continue
+                try:
+                    fresh = os.stat(path).st_mtime >= fresh_after
+                except FileNotFoundError:
+                    fresh = False
+                _merge(total, data['metrics'], gauges=fresh)
+
+        # Métricas ainda sem valores também aparecem (com TYPE/HELP)
+        _merge(total, {name: dict(metric, values=[]) for name, metric in self.snapshot().items()})
+        return total
+
+    def render(self) -> str:
+        """Exposição em texto de todas as métricas (todos os workers)"""
+        return render(self.collect())
+
+
+# Registro usado pelo bot inteiro
+REGISTRY = Registry()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=REGISTRY._after_fork)
@@ -0,0 +1,371 @@
+"""
+Outbox - Registro durável das respostas e DMs planejadas
+Cada ação é gravada em SQLite (modo WAL) antes de o webhook ser confirmado
+e marcada como concluída depois do envio. Se o worker morrer no meio do
+caminho, as ações pendentes são reenviadas por outro worker (ou pelo
+próximo processo).
+
+As gravações de todas as threads passam por uma única thread escritora,
+que junta tudo o que chegou enquanto o commit anterior era feito em uma
+só transação (group commit): um fsync serve dezenas de webhooks.
+"""
+
+import os
+import json
+import time
+import queue
+import atexit
+import sqlite3
+import logging
+import threading
+import uuid
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Arquivo padrão do outbox
+OUTBOX_FILE = 'outbox.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    comment_id TEXT PRIMARY KEY,
+    plan TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    owner TEXT,
+    lease_until REAL NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL,
+    finished REAL,
+    replied INTEGER,
+    sent INTEGER
+);
+CREATE INDEX IF NOT EXISTS outbox_pending ON outbox (state, lease_until);
+"""
+
+
+class _Commit:
+    """Aviso de que as operações de um lote chegaram ao disco"""
+
+    __slots__ = ('done', 'ok')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.ok = False
+
+
+class Outbox:
+    """
+    Outbox durável com group commit e reenvio por lease
+
+    Cada ação pendente pertence ao processo que a registrou (um token criado
+    a cada processo, não o PID, que se repete quando o worker reinicia), que
+    renova o lease periodicamente. Ações cujo lease expirou (processo morto) são
+    assumidas por quem fizer a próxima varredura e entregues ao `handler`.
+    """
+
+    def __init__(
+        self,
+        path: str = OUTBOX_FILE,
+        lease_seconds: float = 60,
+        commit_window: float = 0.0,
+        max_batch: int = 500,
+        max_attempts: int = 5,
+        retention: float = 86400
+    ):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.commit_window = commit_window
+        self.max_batch = max(1, max_batch)
+        self.max_attempts = max_attempts
+        self.retention = retention
+
+        self._handler = None
+        self._ops = queue.Queue()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._owner = None
+
+        # Métricas
+        self.commits = 0
+        self.writes = 0
+        self.errors = 0
+        self.replayed = 0
+        self.abandoned = 0
+
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # FULL: cada commit vai para o disco (o custo é dividido pelo lote)
+        conn.execute("PRAGMA synchronous=FULL")
+        return conn
+
+    # -------------------------------------------------------------------------
+    # Ciclo de vida
+    # -------------------------------------------------------------------------
+
+    def start(self, handler: Callable[[dict], bool] = None):
+        """
+        Inicia a thread escritora no processo atual (uma vez por PID)
+
+        Args:
+            handler: Recebe cada ação pendente reenviada; retorna False se
+                não pôde aceitá-la agora (ela volta na próxima varredura)
+        """
+        if handler is not None:
+            self._handler = handler
+        self._ensure_started()
+
+    def _ensure_started(self):
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+
+        with self._lock:
+            if self._pid == pid:
+                return
+
+            # Após um fork a thread do processo pai não existe mais. O dono
+            # das ações é novo a cada processo: um worker que reinicia com o
+            # mesmo PID não renova os leases do processo morto
+            self._owner = f'{pid}-{uuid.uuid4().hex}'
+            self._ops = queue.Queue()
+            threading.Thread(target=self._run, name='outbox-writer', daemon=True).start()
+            self._pid = pid
+            atexit.register(self.flush)
+
+    def flush(self, timeout: float = 5) -> bool:
+        """Espera as operações já enviadas chegarem ao disco"""
+        if self._pid != os.getpid():
+            return True
+        ticket = _Commit()
+        self._ops.put((None, (), ticket))
+        return ticket.done.wait(timeout) and ticket.ok
+
+    def close(self, timeout: float = 5):
+        """
+        Libera as ações pendentes deste processo (chamado depois de drenar
+        a fila), para que outro worker as assuma sem esperar o lease expirar
+        """
+        if self._pid != os.getpid():
+            return
+        self._ops.put((
+            "UPDATE outbox SET owner = NULL, lease_until = 0 WHERE owner = ? AND state = 'pending'",
+            [(self._owner,)],
+            None
+        ))
+        self.flush(timeout)
+
+    # -------------------------------------------------------------------------
+    # Operações
+    # -------------------------------------------------------------------------
+
+    def record(self, plans: List[dict], timeout: float = 5) -> bool:
+        """
+        Registra as ações planejadas e espera elas chegarem ao disco
+
+        Returns:
+            False se a gravação falhou (o webhook não deve ser confirmado)
+        """
+        self._ensure_started()
+        now = time.time()
+        rows = [
+            (str(plan['comment_id']), json.dumps(plan, ensure_ascii=False), self._owner, now + self.lease_seconds, now)
+            for plan in plans if plan.get('comment_id')
+        ]
+        if not rows:
+            return True
+
+        ticket = _Commit()
+        self._ops.put((
+            "INSERT OR IGNORE INTO outbox (comment_id, plan, owner, lease_until, attempts, created) "
+            "VALUES (?, ?, ?, ?, 1, ?)",
+            rows,
+            ticket
+        ))
+
+        if not ticket.done.wait(timeout):
+            logger.error(f"❌ Outbox: gravação não confirmada em {timeout}s")
+            return False
+        return ticket.ok
+
+    def complete(self, comment_id: str, replied: Optional[bool], sent: Optional[bool]):
+        """Marca a ação como concluída (sem esperar o disco)"""
+        if not comment_id:
+            return
+        self._ensure_started()
+        self._ops.put((
+            "UPDATE outbox SET state = 'done', replied = ?, sent = ?, finished = ? WHERE comment_id = ?",
+            [(replied, sent, time.time(), str(comment_id))],
+            None
+        ))
+
+    def cancel(self, comment_id: str):
+        """Remove uma ação que não chegou a ser enfileirada"""
+        if not comment_id:
+            return
+        self._ensure_started()
+        self._ops.put((
+            "DELETE FROM outbox WHERE comment_id = ? AND state = 'pending'",
+            [(str(comment_id),)],
+            None
+        ))
+
+    def release(self, comment_id: str):
+        """Devolve a ação para ser reenviada na próxima varredura"""
+        if not comment_id:
+            return
+        self._ensure_started()
+        self._ops.put((
+            "UPDATE outbox SET owner = NULL, lease_until = 0 WHERE comment_id = ? AND state = 'pending'",
+            [(str(comment_id),)],
+            None
+        ))
+
+    def known(self, comment_ids: List[str]) -> set:
+        """IDs de comentário que já têm uma ação registrada (pendente ou não)"""
+        ids = [str(comment_id) for comment_id in comment_ids]
+        if not ids:
+            return set()
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            found = set()
+            # Limite de parâmetros por consulta do SQLite
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT comment_id FROM outbox WHERE comment_id IN ({','.join('?' * len(chunk))})",
+                    chunk
+                )
+                found.update(row[0] for row in rows)
+            return found
+        finally:
+            conn.close()
+
+    # -------------------------------------------------------------------------
+    # Thread escritora
+    # -------------------------------------------------------------------------
+
+    def _run(self):
+        conn = self._connect()
+        # A primeira varredura acontece já na inicialização
+        next_sweep = time.monotonic()
+
+        while True:
+            try:
+                batch = [self._ops.get(timeout=max(0, next_sweep - time.monotonic()))]
+            except queue.Empty:
+                batch = []
+
+            if batch:
+                # Juntar o que chegou enquanto o commit anterior era feito
+                deadline = time.monotonic() + self.commit_window
+                while len(batch) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    try:
+                        batch.append(self._ops.get(timeout=remaining) if remaining > 0 else self._ops.get_nowait())
+                    except queue.Empty:
+                        break
+                self._commit(conn, batch)
+
+            if time.monotonic() >= next_sweep:
+                try:
+                    self._sweep(conn)
+                except sqlite3.Error as e:
+                    logger.error(f"❌ Outbox: erro na varredura: {e}")
+                next_sweep = time.monotonic() + self.lease_seconds / 3
+
+    def _commit(self, conn: sqlite3.Connection, batch: list):
+        """Executa o lote inteiro em uma transação (um único fsync)"""
+        ok = False
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for sql, rows, _ in batch:
+                if sql is not None:
+                    conn.executemany(sql, rows)
+            conn.execute("COMMIT")
+            ok = True
+        except sqlite3.Error as e:
+            logger.error(f"❌ Outbox: erro ao gravar {len(batch)} operações: {e}")
+            self.errors += 1
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+
+        self.commits += 1
+        self.writes += len(batch)
+        for _, _, ticket in batch:
+            if ticket is not None:
+                ticket.ok = ok
+                ticket.done.set()
+
+    def _sweep(self, conn: sqlite3.Connection):
+        """Renova os leases deste processo e assume as ações abandonadas"""
+        now = time.time()
+        owner = self._owner
+        claimed = []
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "UPDATE outbox SET lease_until = ? WHERE owner = ? AND state = 'pending'",
+                (now + self.lease_seconds, owner)
+            )
+            conn.execute(
+                "DELETE FROM outbox WHERE state != 'pending' AND finished < ?",
+                (now - self.retention,)
+            )
+
+            if self._handler is not None:
+                rows = conn.execute(
+                    "SELECT comment_id, plan, attempts FROM outbox "
+                    "WHERE state = 'pending' AND lease_until < ? LIMIT ?",
+                    (now, self.max_batch)
+                ).fetchall()
+                for comment_id, plan, attempts in rows:
+                    if attempts >= self.max_attempts:
+                        conn.execute(
+                            "UPDATE outbox SET state = 'abandoned', finished = ? WHERE comment_id = ?",
+                            (now, comment_id)
+                        )
+                        logger.error(f"❌ Outbox: comentário {comment_id} abandonado após {attempts} tentativas")
+                        self.abandoned += 1
+                        continue
+                    conn.execute(
+                        "UPDATE outbox SET owner = ?, lease_until = ?, attempts = attempts + 1 WHERE comment_id = ?",
+                        (owner, now + self.lease_seconds, comment_id)
+                    )
+                    claimed.append(json.loads(plan))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        if claimed:
+            logger.info(f"📤 Outbox: reenviando {len(claimed)} ações pendentes")
+
+        for plan in claimed:
+            try:
+                accepted = self._handler(plan)
+            except Exception as e:
+                logger.error(f"Erro ao reenviar ação do comentário {plan.get('comment_id')}: {e}")
+                accepted = False
+            if accepted:
+                self.replayed += 1
+            else:
+                self.release(plan['comment_id'])
+
+    def stats(self) -> dict:
+        """Contadores do outbox"""
+        commits = self.commits
+        return {
+            'commits': commits,
+            'writes': self.writes,
+            'writes_per_commit': round(self.writes / commits, 1) if commits else 0.0,
+            'backlog': self._ops.qsize(),
+            'errors': self.errors,
+            'replayed': self.replayed,
+            'abandoned': self.abandoned
+        }
@@ -0,0 +1,178 @@
+"""
+Índice de Posts - Busca rápida da configuração de cada post
+Compilado uma vez a partir de MONITORED_POSTS, substitui a varredura
+linear de `shortcode in post_id` por consultas em tempo constante
+"""
+
+import re
+from collections import deque
+from typing import Iterable, Iterator, Optional, Tuple
+
+# Extrai o shortcode de um permalink (instagram.com/p/<shortcode>/)
+PERMALINK_PATTERN = re.compile(r'instagram\.com/(?:[\w.]+/)?(?:p|reel|reels|tv)/([A-Za-z0-9_-]+)')
+
+
+def extract_shortcode(value: str) -> Optional[str]:
+    """Retorna o shortcode de um permalink do Instagram (ou None)"""
+    match = PERMALINK_PATTERN.search(value or '')
+    return match.group(1) if match else None
+
+
+class AhoCorasick:
+    """
+    Automato de Aho-Corasick: encontra todas as ocorrências de vários
+    padrões em um texto em uma única passada (tempo linear no texto)
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns = []
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+
+        for pattern in patterns:
+            self._add(pattern)
+        self._build()
+
+    def _add(self, pattern: str):
+        index = len(self.patterns)
+        self.patterns.append(pattern)
+        if not pattern:
+            return
+
+        node = 0
+        for char in pattern:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            node = next_node
+        self._output[node] = self._output[node] + (index,)
+
+    def _build(self):
+        """Calcula os links de falha em largura (BFS)"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def search(self, text: str) -> Iterator[Tuple[int, int]]:
+        """
+        Percorre o texto uma vez
+
+        Yields:
+            (posição final da ocorrência, índice do padrão)
+        """
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        node = 0
+        for position, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for index in output[node]:
+                yield position, index
+
+    def first_pattern(self, text: str) -> Optional[int]:
+        """Menor índice de padrão (ordem de inserção) que aparece no texto"""
+        best = None
+        for _, index in self.search(text):
+            if best is None or index < best:
+                best = index
+        return best
+
+
+class PostIndex:
+    """
+    Índice compilado das configurações de posts
+
+    - Mapa exato: post_id -> configuração
+    - Aliases: shortcode/permalink (campos `shortcode`, `permalink` e `aliases`)
+    - Automato Aho-Corasick para manter a busca por trecho do ID
+    - Cache dos resultados por trecho, inclusive dos IDs não monitorados
+    """
+
+    def __init__(self, posts: dict, cache_size: int = 10000):
+        self._exact = dict(posts)
+        self._aliases = {}
+        self._configs = list(posts.values())
+        self._cache = {}
+        self.cache_size = cache_size
+
+        for key, config in posts.items():
+            for alias in self._aliases_for(key, config):
+                self._aliases.setdefault(alias, config)
+
+        self._matcher = AhoCorasick(posts.keys())
+
+    @staticmethod
+    def _aliases_for(key: str, config: dict) -> Iterator[str]:
+        """Aliases de um post: shortcode, permalink e lista `aliases`"""
+        shortcode = extract_shortcode(key)
+        if shortcode:
+            yield shortcode
+
+        for field in ('shortcode', 'permalink'):
+            value = config.get(field)
+            if value:
+                yield value
+                shortcode = extract_shortcode(value)
+                if shortcode:
+                    yield shortcode
+
+        for alias in config.get('aliases') or ():
+            yield alias
+
+    def lookup(self, post_id: str) -> Optional[dict]:
+        """
+        Retorna a configuração do post (ou None se não monitorado)
+
+        Args:
+            post_id: ID da mídia, shortcode ou permalink
+        """
+        config = self._exact.get(post_id)
+        if config is not None:
+            return config
+
+        config = self._aliases.get(post_id)
+        if config is not None:
+            return config
+
+        # Demais buscas têm o resultado em cache (inclusive o negativo)
+        try:
+            return self._cache[post_id]
+        except KeyError:
+            pass
+
+        shortcode = extract_shortcode(post_id)
+        if shortcode and shortcode in self._aliases:
+            config = self._aliases[shortcode]
+        else:
+            # Busca por trecho do ID, na ordem de MONITORED_POSTS
+            index = self._matcher.first_pattern(post_id)
+            config = self._configs[index] if index is not None else None
+
+        if len(self._cache) >= self.cache_size:
+            self._cache.clear()
+        self._cache[post_id] = config
+        return config
+
+    def items(self) -> Iterator[Tuple[str, dict]]:
+        """Pares (post_id, configuração) indexados"""
+        return iter(self._exact.items())
+
+    def __len__(self):
+        return len(self._exact)
+
+    def __contains__(self, post_id: str):
+        return self.lookup(post_id) is not None
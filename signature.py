@@ -0,0 +1,139 @@
+"""
+Verificação de Assinatura - Confirma que o webhook veio do Meta
+O HMAC-SHA256 com a APP_SECRET é criado uma única vez; cada requisição
+apenas copia esse estado (`hmac.copy()`) e calcula o hash do corpo
+enquanto ele é lido do WSGI
+"""
+
+import hmac
+import hashlib
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_PREFIX = 'sha256='
+
+# Tamanho dos blocos lidos do corpo da requisição
+CHUNK_SIZE = 64 * 1024
+
+# Tamanho máximo aceito para o corpo de um webhook
+MAX_BODY_SIZE = 1024 * 1024
+
+
+class BodyRejected(Exception):
+    """Requisição recusada antes ou durante a leitura do corpo"""
+
+    def __init__(self, status: int, reason: str):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+
+
+class SignatureVerifier:
+    """
+    Verificador de X-Hub-Signature-256 com o HMAC da chave já preparado
+    """
+
+    def __init__(self, secret: str, max_body_size: int = MAX_BODY_SIZE):
+        self.max_body_size = max_body_size
+        self._mac = None
+
+        if secret:
+            self._mac = hmac.new(secret.encode('utf-8'), digestmod=hashlib.sha256)
+        else:
+            logger.warning("APP_SECRET não configurado - pulando verificação de assinatura")
+
+    @property
+    def enabled(self) -> bool:
+        return self._mac is not None
+
+    @staticmethod
+    def _expected_digest(signature: str) -> Optional[bytes]:
+        """Converte o header 'sha256=<hex>' para o digest binário"""
+        if not signature or not signature.startswith(SIGNATURE_PREFIX):
+            return None
+        try:
+            return bytes.fromhex(signature[len(SIGNATURE_PREFIX):])
+        except ValueError:
+            return None
+
+    def verify(self, payload: bytes, signature: str) -> bool:
+        """Verifica a assinatura de um corpo já lido"""
+        if self._mac is None:
+            return True
+
+        expected = self._expected_digest(signature)
+        if expected is None:
+            return False
+
+        mac = self._mac.copy()
+        mac.update(payload)
+        return hmac.compare_digest(mac.digest(), expected)
+
+    def check_headers(self, content_length: Optional[int], signature: str) -> Optional[bytes]:
+        """
+        Validações feitas antes de ler o corpo
+
+        Returns:
+            Digest esperado (None se a verificação está desativada)
+
+        Raises:
+            BodyRejected: sem assinatura válida ou corpo maior que o limite
+        """
+        expected = None
+        if self._mac is not None:
+            expected = self._expected_digest(signature)
+            if expected is None:
+                raise BodyRejected(403, 'assinatura ausente ou malformada')
+
+        if content_length is not None and content_length > self.max_body_size:
+            raise BodyRejected(413, f'corpo de {content_length} bytes excede o limite')
+
+        return expected
+
+    def read_verified(self, stream, content_length: Optional[int], signature: str) -> bytes:
+        """
+        Lê o corpo do stream WSGI calculando o HMAC durante a leitura
+
+        Requisições sem assinatura ou maiores que o limite são recusadas
+        antes de qualquer leitura.
+
+        Args:
+            stream: Stream de entrada (ex: request.stream)
+            content_length: Header Content-Length (None se ausente)
+            signature: Header X-Hub-Signature-256
+
+        Returns:
+            Corpo da requisição
+
+        Raises:
+            BodyRejected: com o status HTTP a ser devolvido
+        """
+        expected = self.check_headers(content_length, signature)
+        mac = self._mac.copy() if self._mac is not None else None
+
+        # Tamanho conhecido (e dentro do limite): uma única leitura, sem concatenação
+        if content_length is not None:
+            body = stream.read(content_length)
+            if mac is not None:
+                mac.update(body)
+        else:
+            chunks = []
+            total = 0
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                total += len(chunk)
+                if total > self.max_body_size:
+                    raise BodyRejected(413, 'corpo excede o limite')
+                if mac is not None:
+                    mac.update(chunk)
+                chunks.append(chunk)
+            body = chunks[0] if len(chunks) == 1 else b''.join(chunks)
+
+        if mac is not None and not hmac.compare_digest(mac.digest(), expected):
+            raise BodyRejected(403, 'assinatura inválida')
+
+        return body
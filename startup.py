@@ -0,0 +1,115 @@
+"""
+Startup - Tempo de inicialização de cada worker
+Mede as etapas do import do app (bibliotecas, clientes, campanhas, rotas) e
+quanto cada worker leva até atender o primeiro request: desde o início do
+import ou, com o `--preload` do gunicorn, desde o fork (o import foi feito
+uma vez só no master).
+
+Os tempos aparecem na rota `/` (`startup`), na métrica
+`igbot_startup_seconds` e em uma linha de log por worker. Passar do
+orçamento (STARTUP_BUDGET_MS) gera um aviso.
+
+Este módulo deve ser o primeiro importado pelo app: o relógio começa no
+import dele.
+"""
+
+import time
+
+# O relógio começa antes de qualquer outro import
+STARTED = time.perf_counter()
+
+import os
+import logging
+import threading
+from typing import Dict, Optional
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+STARTUP_SECONDS = metrics.REGISTRY.histogram(
+    'igbot_startup_seconds',
+    'Tempo de inicialização de cada worker por etapa (import do app e até o primeiro request)',
+    ('phase',),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+
+
+class StartupProfile:
+    """
+    Etapas da inicialização do processo atual
+
+    Args:
+        budget: Segundos até o primeiro request antes do aviso (0 = sem orçamento)
+    """
+
+    def __init__(self, budget: float = 0, started: float = None):
+        self.budget = budget
+        self.started = started if started is not None else time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.preloaded = False
+        self.first_request: Optional[float] = None
+
+        self._last_mark = self.started
+        self._lock = threading.Lock()
+
+    def mark(self, phase: str):
+        """Encerra uma etapa do import (tempo desde a etapa anterior)"""
+        now = time.perf_counter()
+        self.phases[phase] = now - self._last_mark
+        self._last_mark = now
+
+    @property
+    def import_seconds(self) -> float:
+        return sum(self.phases.values())
+
+    def _after_fork(self):
+        """O worker conta a partir do fork; as etapas do import ficam com o master"""
+        self.started = time.perf_counter()
+        self.preloaded = True
+        self.first_request = None
+        self._lock = threading.Lock()
+
+    def request_started(self):
+        """Chamado a cada request; só o primeiro de cada processo é medido"""
+        if self.first_request is not None:
+            return
+        with self._lock:
+            if self.first_request is not None:
+                return
+            self.first_request = time.perf_counter() - self.started
+
+        STARTUP_SECONDS.observe(self.first_request, 'first_request')
+        if not self.preloaded:
+            STARTUP_SECONDS.observe(self.import_seconds, 'import')
+
+        origin = 'do fork' if self.preloaded else 'do import'
+        if self.budget and self.first_request > self.budget:
+            logger.warning(
+                "🐢 Primeiro request %.0f ms depois %s (orçamento: %.0f ms)",
+                self.first_request * 1000, origin, self.budget * 1000,
+                extra={'event': 'first_request'}
+            )
+        else:
+            logger.info(
+                "🚀 Primeiro request %.0f ms depois %s", self.first_request * 1000, origin,
+                extra={'event': 'first_request'}
+            )
+
+    def stats(self) -> dict:
+        """Tempos em milissegundos"""
+        return {
+            'pid': os.getpid(),
+            'phases_ms': {phase: round(seconds * 1000, 1) for phase, seconds in self.phases.items()},
+            'import_ms': round(self.import_seconds * 1000, 1),
+            'preloaded': self.preloaded,
+            'first_request_ms': round(self.first_request * 1000, 1) if self.first_request is not None else None,
+            'budget_ms': round(self.budget * 1000) if self.budget else None
+        }
+
+
+# Perfil do processo (o relógio começa no primeiro import deste módulo)
+PROFILE = StartupProfile(started=STARTED)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=PROFILE._after_fork)
@@ -0,0 +1,426 @@
+"""
+Supressão de DMs - Evita mandar a mesma DM várias vezes para a mesma pessoa
+Guarda quem já recebeu a DM de cada post em filtros de Bloom divididos por
+faixas de tempo: a memória é fixa (independe do número de pessoas) e as
+faixas mais antigas que o cooldown são simplesmente descartadas.
+
+O estado é salvo em arquivo periodicamente. Como filtros de Bloom se
+combinam com um OR bit a bit, cada worker do gunicorn junta o arquivo com
+o que tem em memória a cada sincronização, e todos convergem. O arquivo tem
+uma vaga fixa por faixa de tempo: cada worker lê só as vagas que outro
+mudou e grava só as faixas com DMs novas. Sem nada novo em memória nem no
+arquivo, a sincronização é só um stat.
+"""
+
+import os
+import math
+import time
+import struct
+import atexit
+import hashlib
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava entre processos
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+FILE_MAGIC = b'IGDM2'
+FILE_HEADER = struct.Struct('<QQdI')
+# Por vaga: faixa de tempo guardada e geração (muda a cada gravação da vaga)
+SLOT_HEADER = struct.Struct('<qq')
+EMPTY_SLOT = (-1, 0)
+
+# Bytes combinados por vez na junção com o arquivo (cada trecho sob o lock)
+MERGE_CHUNK = 64 * 1024
+
+
+class BloomFilter:
+    """
+    Filtro de Bloom simples (bits em um bytearray, hashing duplo com blake2b)
+    Pode dizer que contém uma chave que nunca foi adicionada (falso
+    positivo, com a probabilidade configurada), nunca o contrário.
+    """
+
+    def __init__(self, num_bits: int, num_hashes: int, bits: bytes = None):
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.bits = bytearray(bits) if bits is not None else bytearray((num_bits + 7) // 8)
+
+    @staticmethod
+    def parameters(capacity: int, error_rate: float):
+        """Número de bits e de hashes para `capacity` chaves com a taxa de erro dada"""
+        num_bits = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        num_bits = (num_bits + 7) // 8 * 8
+        num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+        return num_bits, num_hashes
+
+    def _positions(self, key: bytes):
+        digest = hashlib.blake2b(key, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key: bytes):
+        bits = self.bits
+        for position in self._positions(key):
+            bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: bytes) -> bool:
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def merge(self, bits: bytes, lock=None):
+        """
+        Combina com outro filtro de mesmo tamanho (OR bit a bit)
+
+        Feito em trechos de MERGE_CHUNK bytes, com o `lock` só durante cada
+        trecho: quem consulta o filtro espera no máximo um trecho, não o
+        filtro inteiro. Trechos sem nenhum bit no outro filtro são pulados.
+        """
+        lock = lock if lock is not None else nullcontext()
+        view = memoryview(bits)
+        for start in range(0, len(self.bits), MERGE_CHUNK):
+            end = start + MERGE_CHUNK
+            other = int.from_bytes(view[start:end], 'little')
+            if not other:
+                continue
+            with lock:
+                current = self.bits[start:end]
+                merged = int.from_bytes(current, 'little') | other
+                self.bits[start:end] = merged.to_bytes(len(current), 'little')
+
+
+class SuppressionIndex:
+    """
+    Índice "já recebeu a DM" por (post, usuário) com janela de cooldown
+
+    A janela é dividida em `buckets` faixas de tempo, cada uma com seu
+    filtro de Bloom dimensionado para `capacity` pessoas. Uma pessoa fica
+    suprimida entre `cooldown` e `cooldown + cooldown/buckets` segundos
+    depois da DM.
+    """
+
+    def __init__(
+        self,
+        cooldown: float,
+        path: Optional[str] = None,
+        capacity: int = 1000000,
+        error_rate: float = 0.001,
+        buckets: int = 4,
+        sync_interval: float = 5.0
+    ):
+        self.cooldown = cooldown
+        self.path = path
+        self.buckets = max(1, buckets)
+        # Vagas no arquivo: as faixas válidas (buckets + 1) e uma de folga
+        self.slots = self.buckets + 2
+        self.bucket_width = cooldown / self.buckets if cooldown > 0 else 0
+        self.num_bits, self.num_hashes = BloomFilter.parameters(capacity, error_rate)
+        self.sync_interval = sync_interval
+
+        self._filters: Dict[int, BloomFilter] = {}
+        self._in_flight = set()
+        self._lock = threading.Lock()
+        # Faixas com DMs novas desde a última gravação e a versão de cada
+        # vaga do arquivo que já está em memória
+        self._dirty_buckets = set()
+        self._slot_versions: Dict[int, tuple] = {}
+        self._file_signature = None
+        self._file_valid = False
+        self._sync_pid = None
+
+        # Métricas
+        self.suppressed = 0
+        self.marked = 0
+        self.syncs = 0
+
+        if self.enabled and self.path:
+            self.sync()
+
+    @property
+    def enabled(self) -> bool:
+        return self.cooldown > 0
+
+    @staticmethod
+    def _key(post_id, user_id) -> bytes:
+        return f"{post_id}:{user_id}".encode('utf-8')
+
+    def _bucket_id(self, now: float) -> int:
+        return int(now // self.bucket_width)
+
+    def _drop_expired(self, now: float):
+        oldest = self._bucket_id(now) - self.buckets
+        for bucket_id in [b for b in self._filters if b < oldest]:
+            del self._filters[bucket_id]
+
+    # -------------------------------------------------------------------------
+    # Consulta
+    # -------------------------------------------------------------------------
+
+    def reserve(self, post_id, user_id) -> bool:
+        """
+        Verifica se a DM pode ser enviada e reserva o envio
+
+        Returns:
+            False se a pessoa já recebeu (ou está recebendo) a DM deste post
+        """
+        if not self.enabled or not user_id:
+            return True
+
+        self._ensure_syncing()
+        key = self._key(post_id, user_id)
+        with self._lock:
+            self._drop_expired(time.time())
+            if key in self._in_flight or any(key in bloom for bloom in self._filters.values()):
+                self.suppressed += 1
+                return False
+            self._in_flight.add(key)
+            return True
+
+    def finish(self, post_id, user_id, sent: bool):
+        """Conclui a reserva; a pessoa só é registrada se a DM foi enviada"""
+        if not self.enabled or not user_id:
+            return
+
+        key = self._key(post_id, user_id)
+        with self._lock:
+            self._in_flight.discard(key)
+            if sent:
+                bucket_id = self._bucket_id(time.time())
+                bloom = self._filters.get(bucket_id)
+                if bloom is None:
+                    bloom = self._filters[bucket_id] = BloomFilter(self.num_bits, self.num_hashes)
+                bloom.add(key)
+                self.marked += 1
+                self._dirty_buckets.add(bucket_id)
+
+    # -------------------------------------------------------------------------
+    # Persistência
+    # -------------------------------------------------------------------------
+
+    def _ensure_syncing(self):
+        """Inicia a sincronização periódica no processo atual (uma vez por PID)"""
+        pid = os.getpid()
+        if not self.path or self._sync_pid == pid:
+            return
+        with self._lock:
+            if self._sync_pid == pid:
+                return
+            threading.Thread(target=self._sync_loop, name='dm-suppression-sync', daemon=True).start()
+            self._sync_pid = pid
+            atexit.register(self.sync)
+
+    def _sync_loop(self):
+        while True:
+            time.sleep(self.sync_interval)
+            try:
+                self.sync()
+            except Exception as e:
+                logger.error(f"Erro ao salvar o índice de DMs: {e}")
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool = True):
+        """Trava entre processos (workers do gunicorn) durante a sincronização"""
+        if fcntl is None:
+            yield
+            return
+        with open(self.path + '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _current_signature(self) -> Optional[tuple]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _slot_header_offset(self, slot: int) -> int:
+        return len(FILE_MAGIC) + FILE_HEADER.size + slot * SLOT_HEADER.size
+
+    def _slot_offset(self, slot: int) -> int:
+        return self._slot_header_offset(self.slots) + slot * (self.num_bits // 8)
+
+    def _read_table(self, f) -> Optional[list]:
+        """Vagas do arquivo [(faixa, geração)] (None se for incompatível)"""
+        header = f.read(self._slot_header_offset(self.slots))
+        header_end = len(FILE_MAGIC) + FILE_HEADER.size
+        if not header.startswith(FILE_MAGIC) or len(header) < header_end:
+            logger.warning(f"⚠️ {self.path} não é um índice de DMs válido - recomeçando o índice")
+            return None
+
+        settings = FILE_HEADER.unpack_from(header, len(FILE_MAGIC))
+        if settings != (self.num_bits, self.num_hashes, self.bucket_width, self.slots):
+            logger.warning(f"⚠️ {self.path} foi criado com outra configuração - recomeçando o índice")
+            return None
+        if len(header) < self._slot_header_offset(self.slots):
+            logger.warning(f"⚠️ {self.path} está incompleto - recomeçando o índice")
+            return None
+        return [SLOT_HEADER.unpack_from(header, self._slot_header_offset(slot)) for slot in range(self.slots)]
+
+    def _load_changed(self, signature: Optional[tuple], now: float) -> bool:
+        """
+        Junta em memória as vagas que mudaram no arquivo desde a última leitura
+
+        Returns:
+            False se o arquivo não existe ou é incompatível (precisa ser recriado)
+        """
+        if signature is None:
+            return False
+        # Arquivo recriado (outro inode): todas as vagas são novas
+        if self._file_signature is None or signature[0] != self._file_signature[0]:
+            self._slot_versions = {}
+
+        size = self.num_bits // 8
+        oldest = self._bucket_id(now) - self.buckets
+        merges = []
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return False
+        with f:
+            table = self._read_table(f)
+            if table is None:
+                return False
+            for slot, version in enumerate(table):
+                if version == self._slot_versions.get(slot):
+                    continue
+                self._slot_versions[slot] = version
+                bucket_id = version[0]
+                if bucket_id < oldest:
+                    continue
+                f.seek(self._slot_offset(slot))
+                bits = f.read(size)
+                if len(bits) != size:
+                    continue
+                with self._lock:
+                    bloom = self._filters.get(bucket_id)
+                    if bloom is None:
+                        self._filters[bucket_id] = BloomFilter(self.num_bits, self.num_hashes, bits)
+                        continue
+                merges.append((bloom, bits))
+
+        # A junção pega o lock por trechos: reserve() não espera o filtro inteiro
+        for bloom, bits in merges:
+            bloom.merge(bits, self._lock)
+        return True
+
+    def _take_dirty(self, now: float, everything: bool = False) -> Dict[int, bytes]:
+        """Cópia das faixas a gravar (as com DMs novas ou, com `everything`, todas)"""
+        with self._lock:
+            self._drop_expired(now)
+            dirty = self._filters if everything else self._dirty_buckets
+            snapshot = {
+                bucket_id: bytes(self._filters[bucket_id].bits)
+                for bucket_id in dirty if bucket_id in self._filters
+            }
+            self._dirty_buckets = set()
+        return snapshot
+
+    def _restore_dirty(self, bucket_ids):
+        with self._lock:
+            self._dirty_buckets.update(bucket_ids)
+
+    def _write_slots(self, filters: Dict[int, bytes]):
+        """Grava só as faixas dadas, cada uma na sua vaga"""
+        versions = {}
+        with open(self.path, 'r+b') as f:
+            for bucket_id, bits in filters.items():
+                slot = bucket_id % self.slots
+                f.seek(self._slot_offset(slot))
+                f.write(bits)
+                versions[slot] = (bucket_id, time.time_ns())
+            # Bits antes das vagas: uma queda no meio não associa bits antigos a uma faixa nova
+            f.flush()
+            os.fsync(f.fileno())
+            for slot, version in versions.items():
+                f.seek(self._slot_header_offset(slot))
+                f.write(SLOT_HEADER.pack(*version))
+            f.flush()
+            os.fsync(f.fileno())
+        self._slot_versions.update(versions)
+
+    def _write_file(self, filters: Dict[int, bytes]):
+        """Recria o arquivo inteiro com as faixas dadas"""
+        table = [EMPTY_SLOT] * self.slots
+        data = [bytes(self.num_bits // 8)] * self.slots
+        for bucket_id, bits in filters.items():
+            slot = bucket_id % self.slots
+            table[slot] = (bucket_id, time.time_ns())
+            data[slot] = bits
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix='.dm_suppression.', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(FILE_MAGIC)
+                f.write(FILE_HEADER.pack(self.num_bits, self.num_hashes, self.bucket_width, self.slots))
+                for version in table:
+                    f.write(SLOT_HEADER.pack(*version))
+                for bits in data:
+                    f.write(bits)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        self._slot_versions = dict(enumerate(table))
+
+    def sync(self):
+        """Traz do arquivo as faixas que outros workers mudaram e grava as que mudaram aqui"""
+        if not self.enabled or not self.path:
+            return
+
+        # Nada novo em memória nem no arquivo: nenhuma trava, leitura ou escrita
+        writing = bool(self._dirty_buckets)
+        if not writing and self._current_signature() == self._file_signature:
+            return
+
+        # Só leitura: outros workers podem ler ao mesmo tempo. Sem arquivo
+        # válido, ele só é (re)criado por quem tem algo a gravar
+        with self._file_lock(exclusive=writing):
+            now = time.time()
+            signature = self._current_signature()
+            if signature != self._file_signature:
+                self._file_valid = self._load_changed(signature, now)
+
+            if writing:
+                # Arquivo ausente ou incompatível: recriado com todas as faixas
+                valid = self._file_valid
+                filters = self._take_dirty(now, everything=not valid)
+                try:
+                    if valid:
+                        self._write_slots(filters)
+                    else:
+                        self._write_file(filters)
+                except BaseException:
+                    self._restore_dirty(filters)
+                    raise
+                self._file_valid = True
+
+            self._file_signature = self._current_signature()
+            self.syncs += 1
+
+    def stats(self) -> dict:
+        """Contadores do índice"""
+        return {
+            'cooldown_hours': round(self.cooldown / 3600, 2),
+            'buckets': len(self._filters),
+            'memory_bytes': len(self._filters) * self.num_bits // 8,
+            'suppressed': self.suppressed,
+            'marked': self.marked,
+            'syncs': self.syncs
+        }
@@ -0,0 +1,235 @@
+"""
+Templates - Respostas e DMs compiladas uma vez por campanha
+Cada texto vira uma lista de trechos fixos ao carregar a configuração;
+para cada comentário só o nome do usuário é inserido entre eles
+(`username.join(trechos)`: uma única string nova por mensagem).
+
+Na compilação também são aplicados:
+- parâmetros de rastreamento nos links (`tracking` da campanha)
+- limite de tamanho de cada tipo de mensagem (truncate_message)
+- a forma de escolher entre as variações (`rotation`)
+"""
+
+import re
+import random
+import logging
+import zlib
+import itertools
+from string import Formatter
+from typing import List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from instagram_api import truncate_message
+
+logger = logging.getLogger(__name__)
+
+# Campo substituído em cada mensagem
+USERNAME_FIELD = 'username'
+# Tamanho máximo de um nome de usuário do Instagram
+USERNAME_MAX_LENGTH = 30
+
+# Limites de tamanho (caracteres) de cada tipo de mensagem
+REPLY_MAX_LENGTH = 2200
+DM_MAX_LENGTH = 1000
+
+# Formas de escolher a variação: aleatória, em rodízio ou fixa por usuário
+ROTATIONS = ('random', 'round_robin', 'user')
+
+# Links que recebem os parâmetros de rastreamento (sem a pontuação final)
+LINK_PATTERN = re.compile(r'https?://[^\s<>"\']+[^\s<>"\'.,;:!?)\]]')
+
+
+class Template:
+    """
+    Um texto compilado: trechos fixos com o nome do usuário entre eles
+
+    `render(username)` devolve a própria string quando não há campos, e
+    só trunca na hora quando o nome do usuário pode estourar o limite.
+    """
+
+    __slots__ = ('source', 'parts', 'max_length', 'render')
+
+    def __init__(self, source: str, parts: List[str], max_length: int):
+        self.source = source
+        self.parts = parts
+        self.max_length = max_length
+
+        if len(parts) == 1:
+            text = parts[0]
+            self.render = lambda username: text
+        elif sum(map(len, parts)) + (len(parts) - 1) * USERNAME_MAX_LENGTH <= max_length:
+            self.render = self._join
+        else:
+            self.render = self._join_truncated
+
+    def _join(self, username: str) -> str:
+        return username[:USERNAME_MAX_LENGTH].join(self.parts)
+
+    def _join_truncated(self, username: str) -> str:
+        return truncate_message(username[:USERNAME_MAX_LENGTH].join(self.parts), self.max_length)
+
+    def __repr__(self):
+        return f"Template({self.source[:40]!r})"
+
+
+def add_tracking(text: str, tracking: dict, **values) -> str:
+    """
+    Acrescenta os parâmetros de rastreamento a cada link do texto
+
+    Os valores podem usar {post_id}, {channel} (reply/dm), {variant} e
+    {link} (posição do link na mensagem, a partir de 1). Parâmetros que o
+    link já tem não são alterados.
+    """
+    counter = itertools.count(1)
+
+    def replace(match) -> str:
+        url = urlsplit(match.group(0))
+        existing = {key for key, _ in parse_qsl(url.query, keep_blank_values=True)}
+        fields = dict(values, link=next(counter))
+        params = [
+            (key, str(value).format(**fields))
+            for key, value in tracking.items()
+            if key not in existing
+        ]
+        if not params:
+            return match.group(0)
+        query = f"{url.query}&{urlencode(params)}" if url.query else urlencode(params)
+        return urlunsplit(url._replace(query=query))
+
+    return LINK_PATTERN.sub(replace, text)
+
+
+def compile_template(text: str, max_length: int, tracking: dict = None, **values) -> Template:
+    """
+    Compila um texto com {username}
+
+    Args:
+        text: Texto da mensagem (`{{` e `}}` para chaves literais)
+        max_length: Tamanho máximo da mensagem final
+        tracking: Parâmetros acrescentados aos links (ver add_tracking)
+        **values: Valores disponíveis nos parâmetros (post_id, channel, variant)
+    """
+    source = text
+    if tracking:
+        try:
+            text = add_tracking(text, tracking, **values)
+        except (KeyError, ValueError, IndexError) as e:
+            logger.warning(f"⚠️ Parâmetros de rastreamento inválidos ({e}) - links sem rastreamento")
+
+    parts = ['']
+    try:
+        for literal, field, spec, conversion in Formatter().parse(text):
+            parts[-1] += literal
+            if field is None:
+                continue
+            if field == USERNAME_FIELD and not spec and not conversion:
+                parts.append('')
+            else:
+                # Campo desconhecido: mantido como está no texto
+                logger.warning(f"⚠️ Campo {{{field}}} desconhecido em {source[:40]!r} - mantido no texto")
+                parts[-1] += '{' + field + ('!' + conversion if conversion else '') + (':' + spec if spec else '') + '}'
+    except ValueError as e:
+        # Chave sem par: o texto é enviado como está
+        logger.warning(f"⚠️ Template inválido ({e}): {source[:40]!r} - enviado sem substituições")
+        parts = [text]
+
+    fixed = sum(map(len, parts))
+    if fixed > max_length:
+        logger.warning(f"⚠️ Mensagem com {fixed} caracteres (limite {max_length}) será truncada: {source[:40]!r}")
+        if len(parts) == 1:
+            parts = [truncate_message(parts[0], max_length)]
+
+    return Template(source, parts, max_length)
+
+
+class Variants:
+    """
+    Variações de uma mensagem e a forma de escolher entre elas
+
+    - random: sorteio a cada comentário (comportamento de sempre)
+    - round_robin: uma de cada vez, em ordem
+    - user: sempre a mesma para o mesmo usuário (ex: teste A/B)
+    """
+
+    __slots__ = ('templates', 'rotation', '_counter')
+
+    def __init__(self, templates: List[Template], rotation: str = 'random'):
+        self.templates = templates
+        self.rotation = rotation if rotation in ROTATIONS else 'random'
+        self._counter = itertools.count()
+
+    def pick(self, key: str = None) -> Template:
+        """Escolhe a variação (key: ID do usuário, para a rotação `user`)"""
+        templates = self.templates
+        if len(templates) == 1:
+            return templates[0]
+        if self.rotation == 'round_robin':
+            return templates[next(self._counter) % len(templates)]
+        if self.rotation == 'user' and key:
+            return templates[zlib.crc32(str(key).encode()) % len(templates)]
+        return random.choice(templates)
+
+    def render(self, username: str, key: str = None) -> str:
+        """Mensagem final para o usuário"""
+        return self.pick(key).render(username)
+
+    def __len__(self):
+        return len(self.templates)
+
+
+def compile_variants(
+    texts,
+    max_length: int,
+    rotation: str = 'random',
+    tracking: dict = None,
+    **values
+) -> Optional[Variants]:
+    """Compila um texto ou uma lista de variações (None se não houver texto)"""
+    if isinstance(texts, str):
+        texts = [texts]
+    texts = [text for text in texts or () if text]
+    if not texts:
+        return None
+    return Variants([
+        compile_template(text, max_length, tracking, variant=index + 1, **values)
+        for index, text in enumerate(texts)
+    ], rotation)
+
+
+def compile_campaign(post_id: str, config: dict) -> dict:
+    """
+    Compila as mensagens de uma campanha
+
+    Returns:
+        Cópia da configuração com `reply_templates` e `dm_templates`
+        (None quando a campanha não tem resposta ou DM)
+    """
+    rotation = config.get('rotation') or 'random'
+    tracking = config.get('tracking') or None
+    return dict(
+        config,
+        reply_templates=compile_variants(
+            config.get('comment_replies'), REPLY_MAX_LENGTH, rotation, tracking,
+            post_id=post_id, channel='reply'
+        ),
+        dm_templates=compile_variants(
+            config.get('dm_message'), DM_MAX_LENGTH, rotation, tracking,
+            post_id=post_id, channel='dm'
+        )
+    )
+
+
+def render(config: dict, field: str, username: str, key: str = None) -> Optional[str]:
+    """
+    Mensagem de um tipo (`reply` ou `dm`) para o usuário
+
+    Configurações não compiladas (ex: montadas fora do CampaignStore) são
+    compiladas na hora.
+    """
+    name = f"{field}_templates"
+    if name not in config:
+        config = compile_campaign('', config)
+    variants = config[name]
+    if variants is None:
+        return None
+    return variants.render(username, key)
@@ -0,0 +1,119 @@
+"""
+Gatilhos - Decide se um comentário pede resposta
+Cada campanha pode listar palavras-chave (`keywords`), expressões regulares
+(`patterns`) e exclusões (`exclude`). Tudo é compilado uma vez por post em
+um único automato de Aho-Corasick (palavras-chave e exclusões) e uma única
+regex combinada, então cada comentário é avaliado em uma passada,
+qualquer que seja o número de regras.
+
+A comparação ignora acentos, maiúsculas, pontuação e espaços repetidos:
+"Quero o LINK!!" e "quero o link" são iguais, e "não" casa com "nao".
+Palavras-chave casam no início de uma palavra: "link" encontra "links",
+mas não "blink".
+"""
+
+import re
+import string
+import logging
+import unicodedata
+from typing import Iterable, List, Optional
+
+from post_index import AhoCorasick
+
+logger = logging.getLogger(__name__)
+
+
+# Pontuação vira espaço (emojis continuam valendo como palavra-chave)
+_PUNCTUATION = str.maketrans(string.punctuation, ' ' * len(string.punctuation))
+
+
+def normalize_text(text: str) -> str:
+    """Texto sem acentos, pontuação e maiúsculas, com espaços simples"""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    if not decomposed.isascii():
+        decomposed = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(decomposed.casefold().translate(_PUNCTUATION).split())
+
+
+def _as_list(value) -> List[str]:
+    if isinstance(value, str):
+        return [value]
+    return [item for item in value or () if item]
+
+
+def _anchored(words: Iterable[str]) -> List[str]:
+    """
+    Palavras normalizadas, com um espaço na frente das que começam com letra
+    ou número (só casam no início de uma palavra; emojis casam em qualquer lugar)
+    """
+    words = [word for word in map(normalize_text, words) if word]
+    return [' ' + word if word[0].isalnum() else word for word in words]
+
+
+class TriggerMatcher:
+    """
+    Regras de um post compiladas
+
+    O comentário é aceito se contém alguma palavra-chave ou casa com
+    alguma regex, e não contém nenhuma exclusão. As regex são aplicadas
+    ao texto já normalizado (sem acentos e pontuação, em minúsculas).
+    """
+
+    __slots__ = ('keywords', 'exclude', 'patterns', '_matcher', '_excluded_from', '_regex')
+
+    def __init__(self, keywords: Iterable[str] = (), patterns: Iterable[str] = (), exclude: Iterable[str] = ()):
+        self.keywords = _anchored(keywords)
+        self.exclude = _anchored(exclude)
+        self.patterns = list(patterns)
+
+        # Um automato só: índices a partir de _excluded_from são exclusões
+        self._matcher = AhoCorasick(self.keywords + self.exclude)
+        self._excluded_from = len(self.keywords)
+
+        valid = []
+        for pattern in self.patterns:
+            try:
+                re.compile(pattern)
+                valid.append(f"(?:{pattern})")
+            except re.error as e:
+                logger.warning(f"⚠️ Regex inválida ignorada nos gatilhos: {pattern!r} ({e})")
+        self._regex = re.compile('|'.join(valid)) if valid else None
+
+    def matches(self, text: str) -> bool:
+        """True se o comentário deve ser respondido"""
+        normalized = ' ' + normalize_text(text)
+        excluded_from = self._excluded_from
+        # Sem exclusões a primeira palavra-chave já decide
+        stop_at_first = not self.exclude
+        found = False
+        for _, index in self._matcher.search(normalized):
+            if index >= excluded_from:
+                return False
+            if stop_at_first:
+                return True
+            found = True
+        if found:
+            return True
+        return self._regex is not None and self._regex.search(normalized) is not None
+
+    def __repr__(self):
+        return f"TriggerMatcher({len(self.keywords)} palavras, {len(self.patterns)} regex, {len(self.exclude)} exclusões)"
+
+
+def compile_trigger(config: dict) -> Optional[TriggerMatcher]:
+    """
+    Compila os gatilhos de uma campanha
+
+    Returns:
+        O matcher, ou None se a campanha responde a todos os comentários
+        (sem `keywords` nem `patterns`; exclusões sozinhas também valem)
+    """
+    keywords = _as_list(config.get('keywords'))
+    patterns = _as_list(config.get('patterns'))
+    exclude = _as_list(config.get('exclude'))
+    if not (keywords or patterns or exclude):
+        return None
+    if not (keywords or patterns):
+        # Só exclusões: qualquer texto serve, menos os excluídos
+        patterns = ['']
+    return TriggerMatcher(keywords, patterns, exclude)
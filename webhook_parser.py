@@ -0,0 +1,73 @@
+"""
+Parser de Webhooks - Extrai apenas os comentários do payload do Meta
+Trabalha direto sobre os bytes recebidos: entregas sem nenhuma mudança
+de comentário são descartadas sem decodificar o JSON
+"""
+
+import json
+from typing import Iterator, List, Optional, Tuple
+
+# Toda mudança de comentário contém este trecho (campo "field": "comments")
+COMMENTS_MARKER = b'"comments"'
+
+
+class InvalidPayload(ValueError):
+    """Corpo do webhook não é um JSON válido"""
+
+
+def iter_comment_changes(data: dict) -> Iterator[Tuple[Optional[str], dict]]:
+    """
+    Percorre um payload já decodificado
+
+    Entradas e mudanças fora do formato (não-objetos, listas que não são
+    listas) são ignoradas: o corpo é assinado pelo Meta, então o webhook
+    ainda é confirmado e não volta a ser entregue
+
+    Yields:
+        (ID da conta da entrada, `value` da mudança de comentário)
+    """
+    if not isinstance(data, dict) or data.get('object') != 'instagram':
+        return
+
+    entries = data.get('entry')
+    if not isinstance(entries, list):
+        return
+
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        changes = entry.get('changes')
+        if not changes or not isinstance(changes, list):
+            continue
+        entry_id = entry.get('id')
+        for change in changes:
+            if not isinstance(change, dict) or change.get('field') != 'comments':
+                continue
+            value = change.get('value') or {}
+            if isinstance(value, dict):
+                yield entry_id, value
+
+
+def parse_comment_changes(raw: bytes) -> List[Tuple[Optional[str], dict]]:
+    """
+    Extrai as mudanças de comentário direto dos bytes do webhook
+
+    Args:
+        raw: Corpo da requisição (bytes)
+
+    Returns:
+        Lista de (ID da conta, `value` do comentário)
+
+    Raises:
+        InvalidPayload: se o corpo contém comentários mas não é JSON válido
+    """
+    # Caminho rápido: sem o marcador não há comentário algum
+    if COMMENTS_MARKER not in raw:
+        return []
+
+    try:
+        data = json.loads(raw)
+    except ValueError as e:
+        raise InvalidPayload(str(e))
+
+    return list(iter_comment_changes(data))